@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+'''
+Benchmark the get_total_variants function against the previous csv.DictReader
+based implementation using a generated <sample>.variants.tsv file.
+'''
+
+import argparse
+import csv
+import os
+import tempfile
+import timeit
+import synthetic
+from ncov.parser.qc import get_total_variants, is_base_masked, \
+    is_indel_triplet, get_fasta_sequence_length
+
+
+def get_total_variants_dictreader(file, reference, mask_start=100, mask_end=50,
+                                  indel=False):
+    '''
+    The csv.DictReader implementation of get_total_variants used as the
+    benchmark baseline.
+    '''
+    counter = counter_snv = counter_indel = 0
+    counter_snv_masked = counter_indel_masked = counter_indel_triplet = 0
+    genome_length = get_fasta_sequence_length(reference)['genome_length']
+    with open(file) as file_p:
+        for data in csv.DictReader(file_p, delimiter='\t'):
+            base_masked = is_base_masked(pos=int(data['POS']),
+                                         end=genome_length,
+                                         mask_start=mask_start,
+                                         mask_end=mask_end)
+            if len(str(data['ALT'])) > 1 and indel:
+                counter += 1
+                counter_indel += 1
+                if is_indel_triplet(data['ALT']):
+                    counter_indel_triplet += 1
+                if base_masked:
+                    counter_indel_masked += 1
+            elif len(str(data['ALT'])) == 1:
+                counter += 1
+                counter_snv += 1
+                if base_masked:
+                    counter_snv_masked += 1
+    return {'total_variants' : counter,
+            'total_snv' : counter_snv,
+            'total_indel' : counter_indel,
+            'total_snv_masked' : counter_snv_masked,
+            'total_indel_masked' : counter_indel_masked,
+            'total_indel_triplet' : counter_indel_triplet,
+            'genome_length' : genome_length}
+
+
+def main():
+    '''
+    Run the benchmark and print the timings.
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark get_total_variants')
+    parser.add_argument('-n', '--variants', default=10000, type=int,
+                        help='number of variants to generate')
+    parser.add_argument('-r', '--repeat', default=5, type=int,
+                        help='number of repetitions')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        var_file = os.path.join(tmpdir, 'sample.variants.tsv')
+        reference = os.path.join(tmpdir, 'reference.fa')
+        synthetic.write_variants(var_file, total=args.variants, genome_length=29903)
+        synthetic.write_reference(reference, length=29903)
+        baseline = get_total_variants_dictreader(var_file, reference, indel=True)
+        current = get_total_variants(var_file, reference, indel=True)
+        for key, value in baseline.items():
+            assert current[key] == value, key
+        timings = {}
+        for name, function in [('dictreader', get_total_variants_dictreader),
+                               ('get_total_variants', get_total_variants)]:
+            timings[name] = min(timeit.repeat(
+                lambda: function(var_file, reference, indel=True),
+                number=1, repeat=args.repeat))
+            print('%s\t%d variants\t%.4f s' % (name, args.variants, timings[name]))
+        print('speedup\t%.1fx' % (timings['dictreader'] / timings['get_total_variants']))
+
+
+if __name__ == '__main__':
+    main()
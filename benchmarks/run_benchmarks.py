@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+'''
+Benchmark suite for the ncov.parser functions.  Inputs are created with the
+seeded generator in synthetic.py, each benchmark records the best wall time
+over several repetitions, the throughput and the peak memory allocated while
+running.  Results are written to a JSON file so runs from different commits
+can be compared.
+'''
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import synthetic
+from ncov.parser.qc import get_coverage_stats, get_total_variants, \
+    count_iupac_in_fasta, import_metadata, create_qc_summary_line, \
+    collect_qc_summary_data
+
+SCALES = {'quick' : {'genome_lengths' : [29903],
+                     'variants' : [10000],
+                     'metadata_samples' : 10000,
+                     'run_samples' : 1000},
+          'full' : {'genome_lengths' : [29903, 1000000],
+                    'variants' : [10000, 50000],
+                    'metadata_samples' : 200000,
+                    'run_samples' : 5000}}
+
+
+def measure(function, repeat=5):
+    '''
+    Run a function repeatedly and return the best wall time in seconds and the
+    peak memory allocated by a single call in bytes.
+    '''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def get_commit():
+    '''
+    Return the current git commit, or None outside of a git repository.
+    '''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(tmpdir, scale='quick', repeat=5, seed=0):
+    '''
+    Generate the inputs and run all benchmarks.
+
+    Arguments:
+        * tmpdir:   directory for the generated inputs
+        * scale:    one of the keys in SCALES
+        * repeat:   number of repetitions per benchmark
+        * seed:     random seed for the generator
+
+    Return Value:
+        Returns a list of dictionaries, one per benchmark
+    '''
+    settings = SCALES[scale]
+    results = []
+
+    def add_result(name, function, items, unit, files=()):
+        seconds, peak = measure(function, repeat=repeat)
+        size = sum(os.path.getsize(file) for file in files)
+        results.append({'name' : name,
+                        'seconds' : seconds,
+                        'items' : items,
+                        'items_per_second' : items / seconds,
+                        'unit' : unit,
+                        'bytes' : size,
+                        'megabytes_per_second' : size / seconds / 1e6,
+                        'peak_memory' : peak})
+        print('%-45s %10.4f s %12.0f %s/s %10.1f KiB peak' % (
+            name, seconds, items / seconds, unit, peak / 1024), file=sys.stderr)
+
+    for genome_length in settings['genome_lengths']:
+        label = '%dbp' % genome_length
+        reference = os.path.join(tmpdir, 'reference_%s.fa' % label)
+        sequence = synthetic.write_reference(reference, length=genome_length, seed=seed)
+        cov_file = os.path.join(tmpdir, 'sample_%s.per_base_coverage.bed' % label)
+        synthetic.write_coverage(cov_file, genome_length=genome_length, seed=seed)
+        for backend in ['list', 'histogram', 'numpy']:
+            add_result('get_coverage_stats[%s,%s]' % (backend, label),
+                       lambda: get_coverage_stats(file=cov_file, backend=backend),
+                       genome_length, 'positions', [cov_file])
+        fasta = os.path.join(tmpdir, 'sample_%s.consensus.fa' % label)
+        synthetic.write_consensus(fasta, 'sample', sequence, seed=seed)
+        add_result('count_iupac_in_fasta[%s]' % label,
+                   lambda: count_iupac_in_fasta(fasta=fasta),
+                   genome_length, 'bases', [fasta])
+        for variants in settings['variants']:
+            var_file = os.path.join(tmpdir, 'sample_%s_%d.variants.tsv' % (label, variants))
+            synthetic.write_variants(var_file, total=variants,
+                                     genome_length=genome_length, seed=seed)
+            add_result('get_total_variants[%d,%s]' % (variants, label),
+                       lambda: get_total_variants(file=var_file, reference=reference,
+                                                  indel=True),
+                       variants, 'variants', [var_file])
+
+    metadata = os.path.join(tmpdir, 'metadata.tsv')
+    samples = ['sample%07d' % i for i in range(settings['metadata_samples'])]
+    synthetic.write_metadata(metadata, samples, seed=seed)
+    add_result('import_metadata[%d]' % len(samples),
+               lambda: import_metadata(file=metadata),
+               len(samples), 'rows', [metadata])
+
+    run_dir = os.path.join(tmpdir, 'run')
+    run = synthetic.generate_run(run_dir, samples=5, seed=seed)
+    sample = os.path.join(run_dir, run['samples'][0])
+    sample_files = [sample + '.variants.tsv', sample + '.qc.csv',
+                    sample + '.per_base_coverage.bed', sample + '.consensus.fa']
+    add_result('create_qc_summary_line',
+               lambda: create_qc_summary_line(var_file=sample_files[0],
+                                              qc_file=sample_files[1],
+                                              cov_file=sample_files[2],
+                                              fasta=sample_files[3],
+                                              meta_file=run['metadata'],
+                                              reference=run['reference']),
+               1, 'samples', sample_files + [run['metadata'], run['reference']])
+
+    summary_dir = os.path.join(tmpdir, 'summaries')
+    synthetic.generate_run(summary_dir, samples=settings['run_samples'],
+                           sample_files=False, seed=seed)
+    summary_files = [os.path.join(summary_dir, file) for file in os.listdir(summary_dir)
+                     if file.endswith('.summary.qc.tsv')]
+    add_result('collect_qc_summary_data[%d]' % len(summary_files),
+               lambda: collect_qc_summary_data(path=summary_dir),
+               len(summary_files), 'files', summary_files)
+    return results
+
+
+def main():
+    '''
+    Run the benchmark suite and write the results to a JSON file.
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark the ncov.parser functions')
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='JSON file to write the results to')
+    parser.add_argument('-s', '--scale', default='quick', choices=sorted(SCALES),
+                        help='size of the generated inputs')
+    parser.add_argument('-r', '--repeat', default=5, type=int,
+                        help='number of repetitions per benchmark')
+    parser.add_argument('--seed', default=0, type=int,
+                        help='random seed for the generated inputs')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = run_benchmarks(tmpdir, scale=args.scale, repeat=args.repeat,
+                                 seed=args.seed)
+    with open(args.output, 'w') as file_p:
+        json.dump({'commit' : get_commit(),
+                   'python' : platform.python_version(),
+                   'platform' : platform.platform(),
+                   'scale' : args.scale,
+                   'seed' : args.seed,
+                   'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'results' : results}, file_p, indent=2)
+
+
+if __name__ == '__main__':
+    main()
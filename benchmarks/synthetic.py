@@ -0,0 +1,206 @@
+'''
+A seeded generator of synthetic ncov-tools output used by the benchmarks.  All
+files follow the layout of the examples in the data directory and the same
+seed always produces the same files.
+'''
+
+import os
+import random
+from ncov.parser.qc import write_qc_summary, write_qc_summary_header
+
+VARIANTS_HEADER = ['REGION', 'POS', 'REF', 'ALT', 'REF_DP', 'REF_RV',
+                   'REF_QUAL', 'ALT_DP', 'ALT_RV', 'ALT_QUAL', 'ALT_FREQ',
+                   'TOTAL_DP', 'PVAL', 'PASS', 'GFF_FEATURE', 'REF_CODON',
+                   'REF_AA', 'ALT_CODON', 'ALT_AA']
+COVERAGE_HEADER = ['reference_name', 'start', 'end', 'amplicon_id', 'pool',
+                   'strand', 'position', 'depth']
+QC_HEADER = ['sample_name', 'pct_N_bases', 'pct_covered_bases',
+             'longest_no_N_run', 'fasta', 'bam', 'qc_pass']
+IUPAC_CODES = 'RYSWKMBDHV'
+
+
+def generate_sequence(length, seed=0):
+    '''
+    Return a random nucleotide sequence.
+    '''
+    rand = random.Random(seed)
+    return ''.join(rand.choices('ACGT', k=length))
+
+
+def write_fasta(file, name, sequence, width=60):
+    '''
+    Write a single record FASTA file.
+    '''
+    with open(file, 'w') as file_p:
+        file_p.write('>%s\n' % name)
+        for i in range(0, len(sequence), width):
+            file_p.write(sequence[i:i + width] + '\n')
+
+
+def write_reference(file, length=29903, seed=0):
+    '''
+    Write a reference FASTA file, returns the reference sequence.
+    '''
+    sequence = generate_sequence(length, seed=seed)
+    write_fasta(file, 'reference', sequence)
+    return sequence
+
+
+def write_consensus(file, sample, reference, n_fraction=0.05, iupac=20,
+                    seed=0):
+    '''
+    Write a consensus FASTA file derived from the reference with runs of N at
+    the ends and in dropped out regions and randomly placed IUPAC codes.
+    '''
+    rand = random.Random(seed)
+    sequence = list(reference)
+    n_bases = int(len(sequence) * n_fraction)
+    runs = [n_bases // 4, n_bases // 4, n_bases - 2 * (n_bases // 4)]
+    sequence[:runs[0]] = 'N' * runs[0]
+    sequence[len(sequence) - runs[1]:] = 'N' * runs[1]
+    start = rand.randint(runs[0], max(runs[0], len(sequence) - runs[1] - runs[2]))
+    sequence[start:start + runs[2]] = 'N' * runs[2]
+    for pos in rand.sample(range(len(sequence)), iupac):
+        sequence[pos] = rand.choice(IUPAC_CODES)
+    write_fasta(file, sample, ''.join(sequence))
+
+
+def write_coverage(file, genome_length=29903, amplicon_size=400, seed=0):
+    '''
+    Write a <sample>.per_base_coverage.bed file with alternating pools of
+    amplicons, each amplicon has a random mean depth and a few drop outs.
+    '''
+    rand = random.Random(seed)
+    with open(file, 'w') as file_p:
+        file_p.write('\t'.join(COVERAGE_HEADER) + '\n')
+        for amplicon, start in enumerate(range(0, genome_length, amplicon_size), 1):
+            end = min(start + amplicon_size, genome_length)
+            mean_depth = 0 if rand.random() < 0.03 else rand.randint(20, 3000)
+            pool = 'nCoV-2019_%d' % (2 - amplicon % 2)
+            prefix = 'reference\t%d\t%d\t%d\t%s\t+\t' % (start, end, amplicon, pool)
+            # bedtools positions count from 1 within each amplicon
+            for position in range(1, end - start + 1):
+                depth = max(0, int(rand.gauss(mean_depth, mean_depth * 0.1)))
+                file_p.write('%s%d\t%d\n' % (prefix, position, depth))
+
+
+def write_variants(file, total=10000, genome_length=29903, seed=0):
+    '''
+    Write a <sample>.variants.tsv file with random SNVs, indels and variants
+    containing N and IUPAC codes.
+    '''
+    rand = random.Random(seed)
+    with open(file, 'w') as file_p:
+        file_p.write('\t'.join(VARIANTS_HEADER) + '\n')
+        for _ in range(total):
+            draw = rand.random()
+            if draw < 0.75:
+                alt = rand.choice('ACGT')
+            elif draw < 0.8:
+                alt = rand.choice('N' + IUPAC_CODES)
+            else:
+                alt = rand.choice('+-') + ''.join(
+                    rand.choices('ACGT', k=rand.randint(1, 9)))
+            file_p.write('\t'.join([
+                'reference', str(rand.randint(1, genome_length)),
+                rand.choice('ACGT'), alt, '10', '5', '60', '200', '100', '60',
+                '0.95', '210', '0', 'TRUE', 'NA', 'NA', 'NA', 'NA', 'NA']) + '\n')
+
+
+def write_qc(file, sample, seed=0):
+    '''
+    Write a <sample>.qc.csv file.
+    '''
+    rand = random.Random(seed)
+    pct_n_bases = round(rand.uniform(0, 50), 2)
+    with open(file, 'w') as file_p:
+        file_p.write(','.join(QC_HEADER) + '\n')
+        file_p.write(','.join([
+            sample, str(pct_n_bases), str(round(100 - pct_n_bases, 2)),
+            str(rand.randint(1000, 29000)), sample + '.consensus.fa',
+            sample + '.mapped.primertrimmed.sorted.bam',
+            'TRUE' if pct_n_bases < 5 else 'FALSE']) + '\n')
+
+
+def write_metadata(file, samples, seed=0):
+    '''
+    Write a metadata.tsv file with a ct value and collection date per sample.
+    '''
+    rand = random.Random(seed)
+    with open(file, 'w') as file_p:
+        file_p.write('sample\tct\tdate\n')
+        for sample in samples:
+            file_p.write('%s\t%.1f\t2020-%02d-%02d\n' % (
+                sample, rand.uniform(12, 38), rand.randint(1, 12),
+                rand.randint(1, 28)))
+
+
+def write_summary(file, sample, seed=0):
+    '''
+    Write a <sample>.summary.qc.tsv file.
+    '''
+    rand = random.Random(seed)
+    summary = {'sample_name' : sample,
+               'pct_n_bases' : round(rand.uniform(0, 50), 2),
+               'pct_covered_bases' : round(rand.uniform(50, 100), 2),
+               'total_variants' : rand.randint(0, 50),
+               'total_snv' : rand.randint(0, 40),
+               'total_snv_masked' : rand.randint(0, 2),
+               'total_indel' : rand.randint(0, 5),
+               'total_indel_masked' : 0,
+               'total_indel_triplet' : rand.randint(0, 2),
+               'total_n' : rand.randint(0, 5000),
+               'total_iupac' : rand.randint(0, 20),
+               'mean_depth' : round(rand.uniform(10, 3000), 1),
+               'median_depth' : rand.randint(10, 3000),
+               'ct' : round(rand.uniform(12, 38), 1),
+               'date' : '2020-%02d-%02d' % (rand.randint(1, 12), rand.randint(1, 28)),
+               'qc_pass' : rand.choice(['TRUE', 'FALSE'])}
+    with open(file, 'w') as file_p:
+        write_qc_summary_header(file_p=file_p)
+        write_qc_summary(summary=summary, file_p=file_p)
+
+
+def generate_run(path, samples=100, genome_length=29903, variants=50,
+                 sample_files=True, summaries=True, seed=0):
+    '''
+    Write a run of samples to a directory.  Each sample has a variants,
+    QC, per base coverage, consensus FASTA and summary file and the run has a
+    single reference and metadata file.  Runs of thousands of samples used
+    for aggregation only need the summary files.
+
+    Arguments:
+        * path:             directory to write the files to
+        * samples:          number of samples
+        * genome_length:    length of the reference genome
+        * variants:         number of variants per sample
+        * sample_files:     write the per sample pipeline output files
+        * summaries:        write the <sample>.summary.qc.tsv files
+        * seed:             random seed
+
+    Return Value:
+        Returns a dictionary with the keys samples (list of sample names),
+        reference and metadata
+    '''
+    os.makedirs(path, exist_ok=True)
+    reference_file = os.path.join(path, 'reference.fa')
+    reference = write_reference(reference_file, length=genome_length, seed=seed)
+    names = ['sample%05d' % i for i in range(samples)]
+    metadata = os.path.join(path, 'metadata.tsv')
+    write_metadata(metadata, names, seed=seed)
+    for i, sample in enumerate(names):
+        prefix = os.path.join(path, sample)
+        sample_seed = seed * 1000003 + i
+        if summaries:
+            write_summary(prefix + '.summary.qc.tsv', sample, seed=sample_seed)
+        if not sample_files:
+            continue
+        write_variants(prefix + '.variants.tsv', total=variants,
+                       genome_length=genome_length, seed=sample_seed)
+        write_qc(prefix + '.qc.csv', sample, seed=sample_seed)
+        write_coverage(prefix + '.per_base_coverage.bed',
+                       genome_length=genome_length, seed=sample_seed)
+        write_consensus(prefix + '.consensus.fa', sample, reference,
+                        seed=sample_seed)
+    return {'samples' : names, 'reference' : reference_file,
+            'metadata' : metadata}
@@ -6,13 +6,30 @@ A script for aggregating sample QC summary files into a single file.
 
 import argparse
 import sys
-from ncov.parser.qc import collect_qc_summary_data, write_qc_summary_header
+from ncov.parser.qc import iter_qc_summary_data
+from ncov.parser.writer import get_summary_writer, FORMATS
 
 parser = argparse.ArgumentParser(description="Tool for aggregating sample QC \
                                  data")
 parser.add_argument('-p', '--path',
                     help='directory to search for <sample>.summary.qc.tsv \
                          files')
+parser.add_argument('-o', '--output', default=None,
+                    help='output file for the aggregated data (default: stdout)')
+parser.add_argument('--format', default=None, choices=FORMATS,
+                    help='output format, columnar uses Parquet when pyarrow is \
+                         installed and .npz otherwise (default: from the \
+                         --output extension, otherwise tsv)')
+parser.add_argument('-t', '--threads', default=None, type=int,
+                    help='number of threads used to read sample files')
+parser.add_argument('--incremental', action='store_true',
+                    help='only read new or changed sample files, requires \
+                         --output and keeps a manifest alongside it')
+parser.add_argument('--merge', nargs='+', default=None, metavar='SUMMARY',
+                    help='merge run summaries that are each sorted by sample \
+                         name, for example the outputs of \
+                         get_run_qc_summary.py --shard, instead of reading \
+                         --path')
 
 if len(sys.argv) == 1:
     parser.print_help(sys.stderr)
@@ -20,8 +37,19 @@ if len(sys.argv) == 1:
 
 args = parser.parse_args()
 
-summary_data = collect_qc_summary_data(path=args.path)
+if args.incremental:
+    if args.output is None:
+        parser.error('--incremental requires --output')
+    from ncov.parser.collect import update_qc_summary
+    update_qc_summary(path=args.path, output=args.output)
+    sys.exit(0)
 
-write_qc_summary_header()
-for summary_line in summary_data:
-    print(summary_line)
+if args.merge:
+    from ncov.parser.collect import merge_qc_summaries
+    summary_data = merge_qc_summaries(args.merge)
+else:
+    summary_data = iter_qc_summary_data(path=args.path, threads=args.threads)
+
+with get_summary_writer(output=args.output, output_format=args.format) as writer:
+    for summary_line in summary_data:
+        writer.write_line(summary_line)
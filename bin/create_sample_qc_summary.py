@@ -8,6 +8,8 @@ import argparse
 import sys
 from ncov.parser.qc import create_qc_summary_line, write_qc_summary, \
 write_qc_summary_header
+from ncov.parser.metrics import MetricsCollector
+from ncov.parser.shard import parse_shard, get_sample_name, is_sample_in_shard
 
 
 parser = argparse.ArgumentParser(description="Tool for summarizing QC data")
@@ -19,18 +21,32 @@ parser.add_argument('-e', '--coverage_dir', \
         help='<sample>.per_base_coverage.bed file to process')
 parser.add_argument('-i', '--indel', action='store_true', \
         help='flag to determine whether to count indels')
+parser.add_argument('--shard', default=None, type=parse_shard, \
+        help='only summarize the sample when it is in shard i/N (0 <= i < N), \
+             samples are assigned by a stable hash of the sample_name in \
+             their QC file')
+parser.add_argument('--metrics_json', '--metrics-json', default=None, \
+        help='write the time, bytes and lines read for each stage to a JSON file')
 
 if len(sys.argv) == 1:
     parser.print_help(sys.stderr)
     sys.exit(1)
 
 args = parser.parse_args()
+qc_file = args.qc_dir + '/' + args.sample + '.qc.csv'
+if args.shard is not None and \
+        not is_sample_in_shard(get_sample_name(qc_file), args.shard):
+    sys.exit(0)
+metrics = None if args.metrics_json is None else MetricsCollector()
 
 qc_line = create_qc_summary_line(
         var_file=args.variants_dir + '/' + args.sample + '.variants.tsv',
-        qc_file=args.qc_dir + '/' + args.sample + '.qc.csv',
+        qc_file=qc_file,
         cov_file=args.coverage_dir + '/' + args.sample + '.per_base_coverage.bed',
-        indel=args.indel)
+        indel=args.indel,
+        metrics=metrics)
 
 write_qc_summary_header()
 write_qc_summary(summary=qc_line)
+if metrics is not None:
+    metrics.write_json(args.metrics_json)
@@ -7,6 +7,11 @@ A Python package for summarizing QC data from the ncov-tools pipeline.
 import argparse
 import sys
 import ncov.parser.qc as qc
+from ncov.parser.coverage import write_amplicon_depth, \
+    write_amplicon_depth_header
+from ncov.parser.metrics import MetricsCollector
+from ncov.parser.cache import get_result_cache
+from ncov.parser.shard import parse_shard, get_sample_name, is_sample_in_shard
 
 parser = argparse.ArgumentParser(description="Tool for summarizing QC data")
 parser.add_argument('-c', '--qc', help='<sample>.qc.csv file to process')
@@ -18,34 +23,89 @@ parser.add_argument('-i', '--indel', action='store_true',
                     help='flag to determine whether to count indels')
 parser.add_argument('-m', '--meta', default=None,
                     help='full path to the metadata file')
+parser.add_argument('--meta_index', action='store_true',
+                    help='build or reuse a SQLite index of the metadata file')
 parser.add_argument('-f', '--fasta', default=None,
                     help='full path to the FASTA consensus file')
+parser.add_argument('--fasta_record', default=None,
+                    help='name of the sample record when --fasta is a \
+                         multi-FASTA file of a run')
 parser.add_argument('-r', '--reference', default=None,
                     help='full path to the reference FASTA file')
 parser.add_argument('--mask_start', default=100,
                     help='number of bases to mask at start of genome')
 parser.add_argument('--mask_end', default=50,
                     help='number of bases to mask at end of genome')
+parser.add_argument('--mask', action='append', default=None,
+                    help='BED or VCF file of additional positions to mask, \
+                         may be given more than once')
+parser.add_argument('--primer_scheme', default=None,
+                    help='primer scheme BED file to count the variants in \
+                         primer sites and amplicon overlap zones')
+parser.add_argument('--amplicon_output', default=None,
+                    help='write the depth of each amplicon and pool to this \
+                         file')
+parser.add_argument('--min_amplicon_depth', default=20, type=float,
+                    help='amplicons with a lower mean depth are flagged as low \
+                         depth in the --amplicon_output file')
+parser.add_argument('--shard', default=None, type=parse_shard,
+                    help='only summarize the sample when it is in shard i/N (0 <= i < N), \
+                         samples are assigned by a stable hash of the \
+                         sample_name in their QC file')
+parser.add_argument('--metrics_json', '--metrics-json', default=None,
+                    help='write the time, bytes and lines read for each \
+                         stage to a JSON file')
+parser.add_argument('--cache_dir', default=None,
+                    help='directory of the result cache, stages whose inputs \
+                         are unchanged are read from the cache (default: the \
+                         NCOV_PARSER_RESULT_CACHE environment variable)')
+parser.add_argument('--cache_size', default=1024, type=float,
+                    help='maximum size of the result cache in MiB, the least \
+                         recently used results are removed')
+parser.add_argument('--hash_inputs', action='store_true',
+                    help='identify input files in the result cache by a hash \
+                         of their contents rather than their modification time')
+parser.add_argument('--no_cache', '--no-cache', action='store_true',
+                    help='do not read or write the result cache')
 if len(sys.argv) == 1:
     parser.print_help(sys.stderr)
     sys.exit(1)
 args = parser.parse_args()
-qc_line = {}
-qc_line.update(qc.get_total_variants(file=args.variants,
-                                  reference=args.reference,
-                                  indel=args.indel,
-                                  mask_start=int(args.mask_start),
-                                  mask_end=int(args.mask_end)))
-qc_line.update(qc.get_qc_data(file=args.qc))
-qc_line.update(qc.get_coverage_stats(file=args.coverage))
-qc_line.update(qc.count_iupac_in_fasta(fasta=args.fasta))
-try:
-    meta_data = qc.import_metadata(file=args.meta)
-    qc_line['ct'] = meta_data[qc_line['sample_name']]['ct']
-    qc_line['date'] = meta_data[qc_line['sample_name']]['date']
-except:
-    qc_line['ct'] = 'NA'
-    qc_line['date'] = 'NA'
+if args.shard is not None and \
+        not is_sample_in_shard(get_sample_name(args.qc), args.shard):
+    sys.exit(0)
+metrics = None if args.metrics_json is None else MetricsCollector()
+cache = None if args.no_cache else \
+    get_result_cache(cache_dir=args.cache_dir,
+                     max_bytes=int(args.cache_size * (1 << 20)),
+                     hash_content=args.hash_inputs)
+qc_line = qc.create_qc_summary_line(var_file=args.variants,
+                                     qc_file=args.qc,
+                                     cov_file=args.coverage,
+                                     meta_file=args.meta,
+                                     indel=args.indel,
+                                     fasta=args.fasta,
+                                     mask_start=int(args.mask_start),
+                                     mask_end=int(args.mask_end),
+                                     mask_files=args.mask,
+                                     primer_scheme=args.primer_scheme,
+                                     fasta_record=args.fasta_record,
+                                     cache=cache,
+                                     reference=args.reference,
+                                     meta_index=args.meta_index or None,
+                                     metrics=metrics,
+                                     amplicons=args.amplicon_output is not None,
+                                     min_amplicon_depth=args.min_amplicon_depth)
 
 qc.write_qc_summary_header()
 qc.write_qc_summary(summary=qc_line)
+if args.amplicon_output is not None:
+    with open(args.amplicon_output, 'w') as file_p:
+        write_amplicon_depth_header(file_p=file_p)
+        write_amplicon_depth(sample=qc_line['sample_name'],
+                             amplicon_depth=qc_line['amplicon_depth'],
+                             file_p=file_p)
+if metrics is not None:
+    metrics.write_json(args.metrics_json)
+if cache is not None:
+    print(cache.format_stats(), file=sys.stderr)
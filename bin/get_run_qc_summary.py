@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+'''
+A script for summarizing the QC data of every sample in a run from a single
+process.
+'''
+
+
+import argparse
+import sys
+from ncov.parser.run import find_sample_files, create_run_qc_summary
+from ncov.parser.writer import get_summary_writer, FORMATS
+from ncov.parser.metrics import MetricsCollector
+from ncov.parser.cache import get_result_cache
+from ncov.parser.shard import parse_shard
+
+parser = argparse.ArgumentParser(description="Tool for summarizing QC data \
+                                 for all samples in a run")
+parser.add_argument('-p', '--path',
+                    help='directory to search for <sample>.variants.tsv files')
+parser.add_argument('-c', '--qc_dir', default=None,
+                    help='directory containing <sample>.qc.csv files \
+                         (default: --path)')
+parser.add_argument('-e', '--coverage_dir', default=None,
+                    help='directory containing <sample>.per_base_coverage.bed \
+                         files (default: --path)')
+parser.add_argument('-d', '--fasta_dir', default=None,
+                    help='directory containing consensus FASTA files \
+                         (default: --path)')
+parser.add_argument('-i', '--indel', action='store_true',
+                    help='flag to determine whether to count indels')
+parser.add_argument('-m', '--meta', default=None,
+                    help='full path to the metadata file')
+parser.add_argument('-r', '--reference', default=None,
+                    help='full path to the reference FASTA file')
+parser.add_argument('--consensus', default=None,
+                    help='multi-FASTA file of the consensus sequences of all \
+                         samples, used instead of the per sample FASTA files')
+parser.add_argument('--mask_start', default=100,
+                    help='number of bases to mask at start of genome')
+parser.add_argument('--mask_end', default=50,
+                    help='number of bases to mask at end of genome')
+parser.add_argument('--mask', action='append', default=None,
+                    help='BED or VCF file of additional positions to mask, \
+                         may be given more than once')
+parser.add_argument('--primer_scheme', default=None,
+                    help='primer scheme BED file to count the variants in \
+                         primer sites and amplicon overlap zones')
+parser.add_argument('--shard', default=None, type=parse_shard,
+                    help='only process the samples of shard i/N (0 <= i < N), \
+                         samples are assigned by a stable hash of the \
+                         sample_name in their QC file')
+parser.add_argument('-w', '--workers', default=None, type=int,
+                    help='number of worker processes (default: number of CPUs)')
+parser.add_argument('-o', '--output', default=None,
+                    help='output file for the run summary (default: stdout)')
+parser.add_argument('--format', default=None, choices=FORMATS,
+                    help='output format, columnar uses Parquet when pyarrow is \
+                         installed and .npz otherwise (default: from the \
+                         --output extension, otherwise tsv)')
+parser.add_argument('--amplicon_output', default=None,
+                    help='write the depth of each amplicon and pool to this \
+                         file')
+parser.add_argument('--min_amplicon_depth', default=20, type=float,
+                    help='amplicons with a lower mean depth are flagged as low \
+                         depth in the --amplicon_output file')
+parser.add_argument('--metrics_json', '--metrics-json', default=None,
+                    help='write the time, bytes and lines read for each \
+                         stage to a JSON file')
+parser.add_argument('--cache_dir', default=None,
+                    help='directory of the result cache, stages whose inputs \
+                         are unchanged are read from the cache (default: the \
+                         NCOV_PARSER_RESULT_CACHE environment variable)')
+parser.add_argument('--cache_size', default=1024, type=float,
+                    help='maximum size of the result cache in MiB, the least \
+                         recently used results are removed')
+parser.add_argument('--hash_inputs', action='store_true',
+                    help='identify input files in the result cache by a hash \
+                         of their contents rather than their modification time')
+parser.add_argument('--no_cache', '--no-cache', action='store_true',
+                    help='do not read or write the result cache')
+
+if len(sys.argv) == 1:
+    parser.print_help(sys.stderr)
+    sys.exit(1)
+
+args = parser.parse_args()
+metrics = None if args.metrics_json is None else MetricsCollector()
+cache = None if args.no_cache else \
+    get_result_cache(cache_dir=args.cache_dir,
+                     max_bytes=int(args.cache_size * (1 << 20)),
+                     hash_content=args.hash_inputs)
+
+samples = find_sample_files(path=args.path,
+                            qc_dir=args.qc_dir,
+                            coverage_dir=args.coverage_dir,
+                            fasta_dir=args.fasta_dir,
+                            shard=args.shard)
+amplicon_file_p = None if args.amplicon_output is None else \
+    open(args.amplicon_output, 'w')
+with get_summary_writer(output=args.output, output_format=args.format) as writer:
+    create_run_qc_summary(samples=samples,
+                          meta_file=args.meta,
+                          indel=args.indel,
+                          mask_start=int(args.mask_start),
+                          mask_end=int(args.mask_end),
+                          mask_files=args.mask,
+                          primer_scheme=args.primer_scheme,
+                          consensus_fasta=args.consensus,
+                          cache=cache,
+                          ordered=True,
+                          reference=args.reference,
+                          workers=args.workers,
+                          writer=writer,
+                          metrics=metrics,
+                          amplicon_file_p=amplicon_file_p,
+                          min_amplicon_depth=args.min_amplicon_depth)
+if amplicon_file_p is not None:
+    amplicon_file_p.close()
+if metrics is not None:
+    metrics.write_json(args.metrics_json)
+if cache is not None:
+    print(cache.format_stats(), file=sys.stderr)
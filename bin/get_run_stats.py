@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+'''
+A script for reporting run level statistics from an aggregated QC summary.
+'''
+
+
+import argparse
+import json
+import sys
+from ncov.parser.runstats import load_run_summary, get_run_stats, \
+    get_date_stats
+
+parser = argparse.ArgumentParser(description="Tool for reporting run level \
+                                 QC statistics")
+parser.add_argument('-s', '--summary',
+                    help='aggregated QC summary file (.tsv, .parquet or .npz)')
+parser.add_argument('-o', '--output', default=None,
+                    help='output JSON file (default: stdout)')
+parser.add_argument('-k', '--iqr_multiple', default=1.5, type=float,
+                    help='multiple of the interquartile range used to flag \
+                         outliers')
+
+if len(sys.argv) == 1:
+    parser.print_help(sys.stderr)
+    sys.exit(1)
+
+args = parser.parse_args()
+
+columns = load_run_summary(args.summary)
+run_stats = {'run' : get_run_stats(columns, k=args.iqr_multiple),
+             'dates' : get_date_stats(columns)}
+if args.output is None:
+    json.dump(run_stats, sys.stdout, indent=2)
+    print()
+else:
+    with open(args.output, 'w') as file_p:
+        json.dump(run_stats, file_p, indent=2)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+'''
+A script for reporting the variants shared by the samples of a run.
+'''
+
+
+import argparse
+import sys
+from ncov.parser.matrix import build_variant_matrix, write_recurrent_variants
+from ncov.parser.run import find_sample_files
+
+parser = argparse.ArgumentParser(description="Tool for reporting recurrent \
+                                 variants across the samples of a run")
+parser.add_argument('-p', '--path',
+                    help='directory containing the <sample>.variants.tsv files')
+parser.add_argument('-i', '--indel', action='store_true',
+                    help='flag to determine whether to include indels')
+parser.add_argument('--min_samples', default=2, type=int,
+                    help='report variants found in at least this many samples')
+parser.add_argument('-o', '--output', default=None,
+                    help='output file for the recurrent variants \
+                         (default: stdout)')
+
+if len(sys.argv) == 1:
+    parser.print_help(sys.stderr)
+    sys.exit(1)
+
+args = parser.parse_args()
+
+samples = find_sample_files(path=args.path, require_qc=False)
+matrix = build_variant_matrix({sample : sample_files['var_file']
+                               for sample, sample_files in samples.items()},
+                              indel=args.indel)
+if args.output is None:
+    write_recurrent_variants(matrix, min_samples=args.min_samples)
+else:
+    with open(args.output, 'w') as file_p:
+        write_recurrent_variants(matrix, min_samples=args.min_samples,
+                                 file_p=file_p)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+'''
+A script for keeping the run QC summary up to date while samples are written.
+'''
+
+
+import argparse
+import sys
+from ncov.parser.cache import get_result_cache
+from ncov.parser.shard import parse_shard
+from ncov.parser.watch import RunWatcher
+
+parser = argparse.ArgumentParser(description="Tool for summarizing QC data \
+                                 for a run as samples complete")
+parser.add_argument('-p', '--path',
+                    help='directory to watch for <sample>.variants.tsv files')
+parser.add_argument('-c', '--qc_dir', default=None,
+                    help='directory containing <sample>.qc.csv files \
+                         (default: --path)')
+parser.add_argument('-e', '--coverage_dir', default=None,
+                    help='directory containing <sample>.per_base_coverage.bed \
+                         files (default: --path)')
+parser.add_argument('-d', '--fasta_dir', default=None,
+                    help='directory containing consensus FASTA files \
+                         (default: --path)')
+parser.add_argument('-i', '--indel', action='store_true',
+                    help='flag to determine whether to count indels')
+parser.add_argument('-m', '--meta', default=None,
+                    help='full path to the metadata file')
+parser.add_argument('-r', '--reference', default=None,
+                    help='full path to the reference FASTA file')
+parser.add_argument('--mask_start', default=100,
+                    help='number of bases to mask at start of genome')
+parser.add_argument('--mask_end', default=50,
+                    help='number of bases to mask at end of genome')
+parser.add_argument('--mask', action='append', default=None,
+                    help='BED or VCF file of additional positions to mask, \
+                         may be given more than once')
+parser.add_argument('--primer_scheme', default=None,
+                    help='primer scheme BED file to count the variants in \
+                         primer sites and amplicon overlap zones')
+parser.add_argument('--shard', default=None, type=parse_shard,
+                    help='only process the samples of shard i/N (0 <= i < N), \
+                         samples are assigned by a stable hash of the \
+                         sample_name in their QC file')
+parser.add_argument('-o', '--output',
+                    help='run summary file, replaced atomically on every update')
+parser.add_argument('--interval', default=10, type=float,
+                    help='maximum number of seconds between polls')
+parser.add_argument('--settle', default=30, type=float,
+                    help='number of seconds the files of a sample must be \
+                         unchanged before they are read')
+parser.add_argument('--once', action='store_true',
+                    help='poll once and exit')
+parser.add_argument('--cache_dir', default=None,
+                    help='directory of the result cache, stages whose inputs \
+                         are unchanged are read from the cache (default: the \
+                         NCOV_PARSER_RESULT_CACHE environment variable)')
+parser.add_argument('--cache_size', default=1024, type=float,
+                    help='maximum size of the result cache in MiB, the least \
+                         recently used results are removed')
+parser.add_argument('--hash_inputs', action='store_true',
+                    help='identify input files in the result cache by a hash \
+                         of their contents rather than their modification time')
+parser.add_argument('--no_cache', '--no-cache', action='store_true',
+                    help='do not read or write the result cache')
+
+if len(sys.argv) == 1:
+    parser.print_help(sys.stderr)
+    sys.exit(1)
+
+args = parser.parse_args()
+if args.output is None:
+    parser.error('--output is required')
+cache = None if args.no_cache else \
+    get_result_cache(cache_dir=args.cache_dir,
+                     max_bytes=int(args.cache_size * (1 << 20)),
+                     hash_content=args.hash_inputs)
+
+watcher = RunWatcher(path=args.path,
+                     output=args.output,
+                     settle=args.settle,
+                     find_options={'qc_dir' : args.qc_dir,
+                                   'coverage_dir' : args.coverage_dir,
+                                   'fasta_dir' : args.fasta_dir,
+                                   'shard' : args.shard},
+                     options={'meta_file' : args.meta,
+                              'indel' : args.indel,
+                              'mask_start' : int(args.mask_start),
+                              'mask_end' : int(args.mask_end),
+                              'mask_files' : args.mask,
+                              'primer_scheme' : args.primer_scheme,
+                              'reference' : args.reference,
+                              'cache' : cache})
+try:
+    watcher.run(interval=args.interval, iterations=1 if args.once else None)
+except KeyboardInterrupt:
+    pass
+if cache is not None:
+    print(cache.format_stats(), file=sys.stderr)
@@ -0,0 +1,278 @@
+'''
+An on-disk cache of the results of each stage of create_qc_summary_line(), so
+a rerun only recomputes the stages whose inputs changed.  For example after a
+metadata fix only the metadata stage of each sample is read again.  Entries
+are stored as JSON files named by the SHA-256 digest of the stage name, the
+identity of the input files and the stage parameters.  The least recently used
+entries are removed once the cache grows beyond its size limit.
+'''
+
+import json
+import os
+from ncov.parser.fileio import get_file_key, write_atomic
+
+# increment when the format of a stage result changes
+CACHE_VERSION = 1
+DEFAULT_CACHE_SIZE = 1 << 30
+# eviction removes entries until the cache is below this fraction of its
+# limit, so the directory is not scanned again on the next write
+EVICT_FRACTION = 0.9
+
+_HASH_CACHE = {}
+# estimated total size of each cache directory in this process
+_CACHE_SIZES = {}
+
+
+def get_content_hash(file, block_size=1 << 20):
+    '''
+    Return the SHA-256 digest of the contents of a file, cached in memory
+    until the file changes.
+    '''
+    import hashlib
+    key = get_file_key(file)
+    digest = _HASH_CACHE.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(file, 'rb') as file_p:
+            for block in iter(lambda: file_p.read(block_size), b''):
+                sha.update(block)
+        digest = _HASH_CACHE[key] = sha.hexdigest()
+    return digest
+
+
+def _to_json(value):
+    '''
+    Convert NumPy scalars in stage results for json.dump().
+    '''
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+class ResultCache:
+    '''
+    A directory of cached stage results with size based least recently used
+    eviction.
+
+    Arguments:
+        * directory:    directory to store the cache entries
+        * max_bytes:    maximum total size of the entries in bytes
+                        (default: 1 GiB)
+        * hash_content: identify input files by a hash of their contents
+                        rather than their path, size and modification time,
+                        so copied or touched files still hit (default: False)
+    '''
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_SIZE,
+                 hash_content=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self.stats = {}
+        self.evictions = 0
+
+    def __getstate__(self):
+        # the counts stay in the process that made them, see pop_stats()
+        return (self.directory, self.max_bytes, self.hash_content)
+
+    def __setstate__(self, state):
+        self.directory, self.max_bytes, self.hash_content = state
+        self.stats = {}
+        self.evictions = 0
+
+    def get_file_identity(self, file):
+        '''
+        Return the identity of an input file used in the cache key, 'missing'
+        when the file cannot be read so the stage reports its own error.
+        '''
+        if file is None:
+            return None
+        try:
+            if self.hash_content:
+                return [os.path.getsize(file), get_content_hash(file)]
+            return list(get_file_key(file))
+        except OSError:
+            return 'missing'
+
+    def get_key(self, stage, files, params):
+        '''
+        Return the cache key of a stage, the SHA-256 digest of the stage name,
+        input file identities and parameters.
+
+        Arguments:
+            * stage:    name of the stage
+            * files:    list of input files, None entries are allowed
+            * params:   dictionary of the stage parameters, values must be
+                        JSON serializable
+
+        Return Value:
+            Returns the key as a hex string
+        '''
+        import hashlib
+        identity = json.dumps([CACHE_VERSION, stage,
+                               [self.get_file_identity(file) for file in files],
+                               params], sort_keys=True)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _get_entry_file(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _count(self, stage, result):
+        counts = self.stats.setdefault(stage, {'hits' : 0, 'misses' : 0})
+        counts[result] += 1
+
+    def get(self, stage, key):
+        '''
+        Return the cached result of a key, None on a miss.  A hit marks the
+        entry as recently used.
+        '''
+        entry_file = self._get_entry_file(key)
+        try:
+            with open(entry_file) as file_p:
+                value = json.load(file_p)
+            os.utime(entry_file)
+        except (OSError, ValueError):
+            self._count(stage, 'misses')
+            return None
+        self._count(stage, 'hits')
+        return value
+
+    def put(self, key, value):
+        '''
+        Store a result and evict the least recently used entries when the
+        cache is over its size limit.  Write failures are ignored as the
+        cache is only an optimization.
+        '''
+        entry_file = self._get_entry_file(key)
+        try:
+            text = json.dumps(value, default=_to_json)
+            os.makedirs(os.path.dirname(entry_file), exist_ok=True)
+            write_atomic(entry_file, lambda file_p: file_p.write(text))
+        except (OSError, TypeError, ValueError):
+            return
+        # the directory is scanned once per process, then sizes are added
+        total = _CACHE_SIZES.get(self.directory)
+        if total is None:
+            total = sum(size for _, size, _ in self.list_entries())
+        else:
+            total += len(text)
+        _CACHE_SIZES[self.directory] = total
+        if total > self.max_bytes:
+            self.evict()
+
+    def get_or_compute(self, stage, files, params, compute):
+        '''
+        Return the cached result of a stage, calling compute() and storing
+        its result on a miss.
+        '''
+        key = self.get_key(stage, files, params)
+        value = self.get(stage, key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def list_entries(self):
+        '''
+        Return a list of (file, size, last used time) tuples of the entries.
+        '''
+        entries = []
+        try:
+            subdirectories = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for subdirectory in subdirectories:
+            path = os.path.join(self.directory, subdirectory)
+            try:
+                names = os.listdir(path)
+            except OSError:
+                continue
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                entry_file = os.path.join(path, name)
+                try:
+                    stat = os.stat(entry_file)
+                except OSError:
+                    continue
+                entries.append((entry_file, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    def evict(self):
+        '''
+        Remove the least recently used entries until the cache is below
+        EVICT_FRACTION of its size limit.
+        '''
+        entries = sorted(self.list_entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        for entry_file, entry_size, _ in entries:
+            if size <= self.max_bytes * EVICT_FRACTION:
+                break
+            try:
+                os.remove(entry_file)
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        _CACHE_SIZES[self.directory] = size
+
+    def pop_stats(self):
+        '''
+        Return the hit and miss counts of each stage and the number of
+        evictions, and reset them.
+        '''
+        stats = {'stages' : self.stats, 'evictions' : self.evictions}
+        self.stats = {}
+        self.evictions = 0
+        return stats
+
+    def add_stats(self, stats):
+        '''
+        Add the counts returned by pop_stats(), for example in a worker
+        process.
+        '''
+        for stage, counts in stats['stages'].items():
+            total = self.stats.setdefault(stage, {'hits' : 0, 'misses' : 0})
+            for result, count in counts.items():
+                total[result] += count
+        self.evictions += stats['evictions']
+
+    def get_totals(self):
+        '''
+        Return the total number of hits, misses and evictions.
+        '''
+        totals = {result : sum(counts[result] for counts in self.stats.values())
+                  for result in ['hits', 'misses']}
+        totals['evictions'] = self.evictions
+        return totals
+
+    def format_stats(self):
+        '''
+        Return a one line description of the hit and miss counts.
+        '''
+        totals = self.get_totals()
+        stages = ', '.join('%s %d/%d' % (stage, counts['hits'],
+                                          counts['hits'] + counts['misses'])
+                           for stage, counts in self.stats.items())
+        return 'result cache: %d hits, %d misses, %d evictions (%s)' % (
+            totals['hits'], totals['misses'], totals['evictions'], stages)
+
+
+def get_result_cache(cache_dir=None, max_bytes=DEFAULT_CACHE_SIZE,
+                     hash_content=False):
+    '''
+    Return a ResultCache for a directory.
+
+    Arguments:
+        * cache_dir:    cache directory (default: the NCOV_PARSER_RESULT_CACHE
+                        environment variable)
+        * max_bytes:    see ResultCache
+        * hash_content: see ResultCache
+
+    Return Value:
+        Returns a ResultCache object, or None when no directory is set
+    '''
+    if cache_dir is None:
+        cache_dir = os.environ.get('NCOV_PARSER_RESULT_CACHE')
+    if not cache_dir:
+        return None
+    return ResultCache(cache_dir, max_bytes=max_bytes, hash_content=hash_content)
@@ -0,0 +1,193 @@
+'''
+Aggregation of the <sample>.summary.qc.tsv files into a single run summary.
+The aggregate can be updated incrementally, a manifest stored alongside the
+output records the size and modification time of each source file so only new
+or changed files are read on subsequent runs.  Run summaries of shards
+processed on separate nodes, each sorted by sample name, are merged with a
+streaming k-way merge.
+'''
+
+import glob
+import json
+import os
+from ncov.parser.fileio import get_file_key, open_input, write_atomic, \
+    COMPRESSED_SUFFIXES
+from ncov.parser.qc import write_qc_summary_header
+from ncov.parser.summary import QC_SUMMARY_COLUMNS
+
+MANIFEST_VERSION = 1
+
+
+def get_manifest_file(output):
+    '''
+    Return the name of the manifest file for an aggregate output file.
+    '''
+    return output + '.manifest.json'
+
+
+def read_summary_rows(file):
+    '''
+    Read the data lines of a summary file, skipping the header.
+
+    Arguments:
+        * file: full path to the summary file
+
+    Return Value:
+        Returns a list of (sample_name, line) tuples, lines do not include the
+        trailing newline
+    '''
+    rows = []
+    with open_input(file) as file_p:
+        for line in file_p:
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('sample_name\t'):
+                continue
+            rows.append((line.split('\t', 1)[0], line))
+    return rows
+
+
+def _read_manifest(manifest_file):
+    '''
+    Read the manifest file, returns None when it does not exist or is not
+    readable.
+    '''
+    try:
+        with open(manifest_file) as file_p:
+            manifest = json.load(file_p)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _get_row_keys(manifest):
+    '''
+    Return the (sample_name, source, index) key of every row of the aggregate
+    in output order, index is the position of the row in its source file.
+    '''
+    return sorted((sample, source, i) for source, entry in manifest['files'].items()
+                  for i, sample in enumerate(entry['samples']))
+
+
+def update_qc_summary(path, output, pattern='.summary.qc.tsv',
+                      manifest_file=None):
+    '''
+    Create or incrementally update the aggregate QC summary file.  Only source
+    files that are new or whose size or modification time changed since the
+    previous update are read, rows for sources that no longer exist are
+    removed.  When the manifest or output is missing the aggregate is rebuilt.
+
+    Arguments:
+        * path:             full path to the <sample>.summary.qc.tsv files
+        * output:           full path to the aggregate output file
+        * pattern:          file pattern for the sample files
+                            (default: .summary.qc.tsv)
+        * manifest_file:    full path to the manifest file
+                            (default: <output>.manifest.json)
+
+    Return Value:
+        Returns a dictionary with the number of source files that were added,
+        updated, removed and unchanged, rows are written in sample order and
+        rows of the same sample from different files are all kept
+    '''
+    if manifest_file is None:
+        manifest_file = get_manifest_file(output)
+    manifest = _read_manifest(manifest_file)
+    rows = {}
+    if not os.path.exists(output):
+        manifest = None
+    elif manifest is not None:
+        # rows are keyed by source so a sample in two files is not overwritten
+        keys = _get_row_keys(manifest)
+        output_rows = read_summary_rows(output)
+        if [sample for sample, _ in output_rows] == [key[0] for key in keys]:
+            rows = {key : line for key, (_, line) in zip(keys, output_rows)}
+        else:
+            manifest = None
+    if manifest is None:
+        manifest = {'version' : MANIFEST_VERSION, 'files' : {}}
+    stats = {'added' : 0, 'updated' : 0, 'removed' : 0, 'unchanged' : 0}
+    sources = {}
+    files = [file for suffix in ('',) + COMPRESSED_SUFFIXES
+             for file in glob.glob(os.path.join(path, '*' + pattern + suffix))]
+    for file in sorted(files):
+        key = get_file_key(file)
+        if key[0] == os.path.abspath(output):
+            continue
+        sources[key[0]] = {'size' : key[1], 'mtime' : key[2]}
+    for source in list(manifest['files']):
+        entry = manifest['files'][source]
+        current = sources.get(source)
+        if current is not None and current['size'] == entry['size'] and \
+                current['mtime'] == entry['mtime']:
+            stats['unchanged'] += 1
+            continue
+        for i, sample in enumerate(entry['samples']):
+            rows.pop((sample, source, i), None)
+        del manifest['files'][source]
+        stats['removed' if current is None else 'updated'] += 1
+    for source, current in sources.items():
+        if source in manifest['files']:
+            continue
+        source_rows = read_summary_rows(source)
+        for i, (sample, line) in enumerate(source_rows):
+            rows[(sample, source, i)] = line
+        manifest['files'][source] = dict(current, samples=[sample for sample, _
+                                                           in source_rows])
+    stats['added'] = len(sources) - stats['unchanged'] - stats['updated']
+
+    def write_output(file_p):
+        write_qc_summary_header(file_p=file_p)
+        for key in sorted(rows):
+            file_p.write(rows[key] + '\n')
+    write_atomic(output, write_output)
+    write_atomic(manifest_file, lambda file_p: json.dump(manifest, file_p))
+    return stats
+
+
+def _iter_sorted_rows(file, file_p):
+    '''
+    A generator of the (sample_name, line) rows of an open shard summary,
+    raises ValueError when the header differs from the current summary
+    columns or the rows are not sorted by sample name.
+    '''
+    header = '\t'.join(QC_SUMMARY_COLUMNS)
+    previous = None
+    for line in file_p:
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        if line.startswith('sample_name\t'):
+            if line != header:
+                raise ValueError('%s has different columns than the current '
+                                 'summary' % file)
+            continue
+        sample = line.split('\t', 1)[0]
+        if previous is not None and sample < previous:
+            raise ValueError('%s is not sorted by sample name, %s follows %s'
+                             % (file, sample, previous))
+        previous = sample
+        yield sample, line
+
+
+def merge_qc_summaries(files):
+    '''
+    A generator to k-way merge run summaries that are each sorted by sample
+    name, for example the outputs of get_run_qc_summary.py --shard.  Only one
+    row of each file is held in memory.
+
+    Arguments:
+        * files:    list of full paths to the sorted summary files
+
+    Return Value:
+        Yields each summary line in sample order without the trailing
+        newline, raises ValueError when an input is not sorted
+    '''
+    import contextlib
+    import heapq
+    with contextlib.ExitStack() as stack:
+        rows = [_iter_sorted_rows(file, stack.enter_context(open_input(file)))
+                for file in files]
+        for _, line in heapq.merge(*rows, key=lambda row: row[0]):
+            yield line
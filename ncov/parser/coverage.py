@@ -0,0 +1,666 @@
+'''
+Depth of coverage calculations for the bedtools <sample>.per_base_coverage.bed
+file.  Rather than holding every depth value in memory, the depths are
+collected into a histogram from which the exact mean, median and percentiles
+are derived, and the breadth of coverage and low coverage regions are
+streamed through a window of the positions of the current amplicon.  When
+NumPy is available the depth column can also be loaded into typed arrays and
+the statistics calculated vectorized.
+'''
+
+import csv
+from array import array
+from ncov.parser.fileio import open_input
+
+
+def get_mean(total, count):
+    '''
+    Return the mean of count int depths summing to total, an int when the
+    mean is integral to match statistics.mean().
+    '''
+    if total % count:
+        return total / count
+    return total // count
+
+
+class DepthHistogram:
+    '''
+    A histogram of depth values.  Depths up to the cap are counted in a dense
+    array indexed by depth, depths above the cap are counted in a dictionary
+    so memory is bound by the number of distinct depths.
+
+    Arguments:
+        * cap:  largest depth stored in the dense array (default: 10000)
+    '''
+    __slots__ = ('cap', 'dense', 'overflow', 'count', 'total')
+
+    def __init__(self, cap=10000):
+        self.cap = cap
+        self.dense = array('Q', bytes(8 * (cap + 1)))
+        self.overflow = {}
+        self.count = 0
+        self.total = 0
+
+    def add(self, depth, n=1):
+        '''
+        Add n occurrences of a depth to the histogram.
+        '''
+        if depth <= self.cap:
+            self.dense[depth] += n
+        else:
+            self.overflow[depth] = self.overflow.get(depth, 0) + n
+        self.count += n
+        self.total += depth * n
+
+    def items(self):
+        '''
+        Generator returning (depth, count) tuples in ascending depth order.
+        '''
+        for depth, count in enumerate(self.dense):
+            if count:
+                yield depth, count
+        for depth in sorted(self.overflow):
+            yield depth, self.overflow[depth]
+
+    def value_at(self, rank):
+        '''
+        Return the depth at the 0-based rank of the sorted depth values.
+        '''
+        if rank < 0 or rank >= self.count:
+            raise IndexError('rank out of range')
+        seen = 0
+        for depth, count in self.items():
+            seen += count
+            if rank < seen:
+                return depth
+
+    def mean(self):
+        '''
+        Return the mean depth, matching statistics.mean().
+        '''
+        if not self.count:
+            raise ValueError('mean requires at least one depth value')
+        return get_mean(self.total, self.count)
+
+    def median(self):
+        '''
+        Return the median depth, matching statistics.median().
+        '''
+        if not self.count:
+            raise ValueError('median requires at least one depth value')
+        middle = self.count // 2
+        if self.count % 2:
+            return self.value_at(middle)
+        return (self.value_at(middle - 1) + self.value_at(middle)) / 2
+
+    def percentile(self, q):
+        '''
+        Return the q-th percentile (0-100) of the depths using linear
+        interpolation between the closest ranks.
+        '''
+        if not self.count:
+            raise ValueError('percentile requires at least one depth value')
+        rank = (self.count - 1) * q / 100
+        lower = int(rank)
+        fraction = rank - lower
+        lower_depth = self.value_at(lower)
+        if not fraction:
+            return lower_depth
+        upper_depth = self.value_at(lower + 1)
+        return lower_depth + (upper_depth - lower_depth) * fraction
+
+
+DEPTH_THRESHOLDS = (1, 10, 20, 100)
+
+
+class GenomeCoverage:
+    '''
+    Count the breadth of coverage and merge the low coverage positions into
+    regions while the <sample>.per_base_coverage.bed file is read.  The
+    bedtools position column counts from 1 within each amplicon, so the genome
+    position is start + position, and a position covered by overlapping
+    amplicons is counted once with its largest depth.  Rows are grouped by
+    amplicon in start order, so once an amplicon starts the positions up to
+    its start are final.  Only the depths of the positions after the current
+    start are kept, a window bounded by the amplicon length.  Positions before
+    an earlier start, from rows out of start order, are counted again.
+
+    Arguments:
+        * min_depth:    positions with a lower depth are low coverage
+                        (default: 20)
+    '''
+    __slots__ = ('min_depth', 'counts', 'total', 'regions', 'start', 'base',
+                 'window', 'region_start', 'region_end')
+
+    def __init__(self, min_depth=20):
+        self.min_depth = min_depth
+        self.counts = dict.fromkeys(DEPTH_THRESHOLDS, 0)
+        self.total = 0
+        self.regions = []
+        self.start = None
+        # window[i] is the depth of genome position base + i, -1 when the
+        # position has no row
+        self.base = 1
+        self.window = array('q')
+        self.region_start = None
+        self.region_end = None
+
+    def add(self, start, position, depths):
+        '''
+        Add the depths of consecutive rows of an amplicon, start and position
+        are the bedtools columns of the first row.
+        '''
+        if start != self.start:
+            if self.start is None or start > self.start:
+                self.flush(start)
+            self.start = start
+        i = start + position - self.base
+        window = self.window
+        if i < 0:
+            # the positions before base were already counted
+            depths = depths[-i:]
+            i = 0
+        overlap = min(max(len(window) - i, 0), len(depths))
+        for j in range(overlap):
+            if depths[j] > window[i + j]:
+                window[i + j] = depths[j]
+        if i > len(window):
+            window.extend([-1] * (i - len(window)))
+        window.extend(depths[overlap:])
+
+    def flush(self, last):
+        '''
+        Count the positions of the window up to last and add them to the low
+        coverage regions.
+        '''
+        from bisect import bisect_left
+        window = self.window
+        count = min(max(last - self.base + 1, 0), len(window))
+        depths = window[:count]
+        del window[:count]
+        base = self.base
+        self.base = max(base + count, last + 1)
+        ordered = sorted(depths)
+        missing = bisect_left(ordered, 0)
+        self.total += count - missing
+        for threshold in DEPTH_THRESHOLDS:
+            self.counts[threshold] += count - bisect_left(ordered, threshold)
+        if count == missing:
+            return
+        region_start = self.region_start
+        region_end = self.region_end
+        if ordered[missing] >= self.min_depth:
+            # no low coverage positions, a position closes the open region
+            if region_start is not None:
+                self.regions.append((region_start, region_end))
+                self.region_start = self.region_end = None
+            return
+        min_depth = self.min_depth
+        for position, depth in enumerate(depths, start=base):
+            if depth < 0:
+                continue
+            if depth >= min_depth:
+                if region_start is not None:
+                    self.regions.append((region_start, region_end))
+                    region_start = None
+            # a gap in the positions closes the region
+            elif region_start is not None and position == region_end + 1:
+                region_end = position
+            else:
+                if region_start is not None:
+                    self.regions.append((region_start, region_end))
+                region_start = region_end = position
+        self.region_start = region_start
+        self.region_end = region_end
+
+    def close(self):
+        '''
+        Count the remaining positions and close the open region, call after
+        the last row.
+        '''
+        self.flush(self.base + len(self.window))
+        if self.region_start is not None:
+            self.regions.append((self.region_start, self.region_end))
+            self.region_start = self.region_end = None
+
+
+def add_coverage_rows(coverage, rows, start_index, position_index, depth_index):
+    '''
+    A generator adding the rows of the <sample>.per_base_coverage.bed file to
+    a GenomeCoverage in blocks of consecutive positions, yielding the int
+    depth and the row for the other statistics.  The coverage is closed after
+    the last row.
+
+    Arguments:
+        * coverage:         a GenomeCoverage object
+        * rows:             iterable of the split rows, lists or
+                            dictionaries
+        * start_index:      index or key of the start column
+        * position_index:   index or key of the position column
+        * depth_index:      index or key of the depth column
+    '''
+    block_start = None
+    block_position = next_position = 0
+    block = []
+    for data in rows:
+        depth = int(data[depth_index])
+        start = data[start_index]
+        position = int(data[position_index])
+        if position != next_position or start != block_start:
+            if block:
+                coverage.add(int(block_start), block_position, block)
+            block_start = start
+            block_position = position
+            block = []
+        block.append(depth)
+        next_position = position + 1
+        yield depth, data
+    if block:
+        coverage.add(int(block_start), block_position, block)
+    coverage.close()
+
+
+def get_genome_coverage_numpy(position, depth, min_depth=20):
+    '''
+    Return the breadth of coverage counts and the low coverage regions from
+    NumPy arrays, see GenomeCoverage.
+
+    Arguments:
+        * position:     int64 array of genome positions, positions covered by
+                        overlapping amplicons may repeat
+        * depth:        int64 array of depths
+        * min_depth:    positions with a lower depth are low coverage
+                        (default: 20)
+
+    Return Value:
+        Returns a tuple of the dictionary of the number of positions with a
+        depth of at least each of DEPTH_THRESHOLDS, the number of positions
+        and a list of (start, end) low coverage regions
+    '''
+    import numpy as np
+    # sort by position then depth and keep the largest depth of each position
+    order = np.lexsort((depth, position))
+    position = position[order]
+    last = np.concatenate((position[1:] != position[:-1], [True]))
+    position = position[last]
+    depth = depth[order][last]
+    counts = {threshold : int(np.count_nonzero(depth >= threshold))
+              for threshold in DEPTH_THRESHOLDS}
+    low = depth < min_depth
+    # a region continues when both positions are low and adjacent
+    joined = low[1:] & low[:-1] & (np.diff(position) == 1)
+    starts = low & np.concatenate(([True], ~joined))
+    ends = low & np.concatenate((~joined, [True]))
+    return counts, int(position.size), \
+        list(zip(position[starts].tolist(), position[ends].tolist()))
+
+
+def get_coverage_breadth(counts, total, regions):
+    '''
+    Create the breadth of coverage summary values.
+
+    Arguments:
+        * counts:   dictionary of the number of positions with a depth of at
+                    least each of DEPTH_THRESHOLDS
+        * total:    total number of genome positions
+        * regions:  list of (start, end) low coverage regions
+
+    Return Value:
+        Returns a dictionary with the keys pct_depth_<threshold>x for each
+        threshold, low_coverage_regions (regions formatted as start-end
+        separated by ';') and total_low_coverage_regions
+    '''
+    breadth = {'pct_depth_%dx' % threshold :
+               round(100 * counts[threshold] / total, 2) if total else 'NA'
+               for threshold in DEPTH_THRESHOLDS}
+    breadth['low_coverage_regions'] = ';'.join(['%d-%d' % region
+                                                for region in regions])
+    breadth['total_low_coverage_regions'] = len(regions)
+    return breadth
+
+
+def load_depth_histogram(file, cap=10000, amplicon_depth=None, coverage=None):
+    '''
+    Read the depth column of the <sample>.per_base_coverage.bed file into a
+    DepthHistogram.
+
+    Arguments:
+        * file:             a string containing the filename and path to the
+                            <sample>.per_base_coverage.bed file
+        * cap:              largest depth stored in the dense array
+                            (default: 10000)
+        * amplicon_depth:   an AmpliconDepth object the depths are also added
+                            to in the same pass (default: None)
+        * coverage:         a GenomeCoverage object the depths are also
+                            added to in the same pass, it is closed after the
+                            last position (default: None)
+
+    Return Value:
+        Function returns a DepthHistogram object
+    '''
+    histogram = DepthHistogram(cap=cap)
+    with open_input(file) as file_p:
+        cov_reader = csv.reader(file_p, delimiter='\t')
+        header = next(cov_reader)
+        depth_index = header.index('depth')
+        if amplicon_depth is None and coverage is None:
+            for data in cov_reader:
+                histogram.add(int(data[depth_index]))
+            return histogram
+        if amplicon_depth is not None:
+            amplicon_index = header.index('amplicon_id')
+            pool_index = header.index('pool')
+        if coverage is None:
+            rows = ((int(data[depth_index]), data) for data in cov_reader)
+        else:
+            rows = add_coverage_rows(coverage, cov_reader,
+                                     header.index('start'),
+                                     header.index('position'), depth_index)
+        for depth, data in rows:
+            histogram.add(depth)
+            if amplicon_depth is not None:
+                amplicon_depth.add(data[amplicon_index], data[pool_index], depth)
+    return histogram
+
+
+def get_coverage_stats_histogram(file, cap=10000, amplicons=False,
+                                 min_amplicon_depth=20, low_coverage_depth=20):
+    '''
+    Calculate the mean and median depth of coverage using a DepthHistogram,
+    memory use is bound by the number of distinct depth values rather than
+    the length of the genome.
+
+    Arguments:
+        * file:                 a string containing the filename and path to
+                                the <sample>.per_base_coverage.bed file
+        * cap:                  largest depth stored in the dense array
+                                (default: 10000)
+        * amplicons:            also calculate the per amplicon and per pool
+                                depth (default: False)
+        * min_amplicon_depth:   see get_amplicon_stats() (default: 20)
+        * low_coverage_depth:   see GenomeCoverage (default: 20)
+
+    Return Value:
+        Function returns a dictionary with the following keys:
+            * mean_depth
+            * median_depth
+            * the keys of get_coverage_breadth()
+            * amplicon_depth (only when amplicons is True)
+    '''
+    amplicon_depth = AmpliconDepth() if amplicons else None
+    coverage = GenomeCoverage(min_depth=low_coverage_depth)
+    histogram = load_depth_histogram(file=file, cap=cap,
+                                     amplicon_depth=amplicon_depth,
+                                     coverage=coverage)
+    stats = {"mean_depth" : round(histogram.mean(), 1),
+             "median_depth" : round(histogram.median(), 1)}
+    stats.update(get_coverage_breadth(coverage.counts, coverage.total,
+                                      coverage.regions))
+    if amplicons:
+        stats['amplicon_depth'] = amplicon_depth.get_stats(min_amplicon_depth)
+    return stats
+
+
+def load_coverage_arrays(file, amplicons=False):
+    '''
+    Load the genome position (start + position) and depth columns of the
+    <sample>.per_base_coverage.bed file into NumPy integer arrays.  The file is read in bulk and split on
+    whitespace rather than parsed line by line, so fields must not contain
+    spaces.
+
+    Arguments:
+        * file:         a string containing the filename and path to the
+                        <sample>.per_base_coverage.bed file
+        * amplicons:    also return the amplicon_id and pool columns as NumPy
+                        bytes arrays (default: False)
+
+    Return Value:
+        Function returns a tuple of NumPy int64 arrays (position, depth),
+        followed by the amplicon_id and pool arrays when amplicons is True
+    '''
+    import numpy as np
+    with open_input(file, 'rb') as file_p:
+        header = file_p.readline().split()
+        fields = file_p.read().split()
+    columns = len(header)
+    if len(fields) % columns:
+        raise ValueError('inconsistent number of columns in %s' % file)
+    rows = len(fields) // columns
+
+    def parse_column(name):
+        # NumPy parses the joined column in C rather than int() per value
+        values = np.fromstring(b' '.join(fields[header.index(name)::columns]),
+                               dtype=np.int64, sep=' ')
+        if values.size != rows:
+            raise ValueError('invalid %s values in %s' % (name.decode(), file))
+        return values
+
+    position = parse_column(b'start') + parse_column(b'position')
+    depth = parse_column(b'depth')
+    if amplicons:
+        return position, depth, \
+            np.array(fields[header.index(b'amplicon_id')::columns]), \
+            np.array(fields[header.index(b'pool')::columns])
+    return position, depth
+
+
+def get_coverage_stats_numpy(file, amplicons=False, min_amplicon_depth=20,
+                             low_coverage_depth=20):
+    '''
+    Calculate the mean and median depth of coverage using NumPy arrays.  The
+    mean is calculated from the integer sum and the median from a partial
+    sort, so the results match the statistics module exactly.
+
+    Arguments:
+        * file:                 a string containing the filename and path to
+                                the <sample>.per_base_coverage.bed file
+        * amplicons:            also calculate the per amplicon and per pool
+                                depth (default: False)
+        * min_amplicon_depth:   see get_amplicon_stats() (default: 20)
+        * low_coverage_depth:   see GenomeCoverage (default: 20)
+
+    Return Value:
+        Function returns a dictionary with the following keys:
+            * mean_depth
+            * median_depth
+            * the keys of get_coverage_breadth()
+            * amplicon_depth (only when amplicons is True)
+    '''
+    import numpy as np
+    arrays = load_coverage_arrays(file=file, amplicons=amplicons)
+    position, depth = arrays[:2]
+    if not depth.size:
+        raise ValueError('no depth values found in %s' % file)
+    mean_depth = get_mean(int(depth.sum()), depth.size)
+    middle = depth.size // 2
+    if depth.size % 2:
+        median_depth = int(np.partition(depth, middle)[middle])
+    else:
+        lower, upper = np.partition(depth, [middle - 1, middle])[middle - 1:middle + 1]
+        median_depth = (int(lower) + int(upper)) / 2
+    stats = {"mean_depth" : round(mean_depth, 1),
+             "median_depth" : round(median_depth, 1)}
+    stats.update(get_coverage_breadth(*get_genome_coverage_numpy(
+        position, depth, min_depth=low_coverage_depth)))
+    if amplicons:
+        stats['amplicon_depth'] = get_amplicon_stats_numpy(
+            amplicon_ids=arrays[2], pools=arrays[3], depth=depth,
+            min_depth=min_amplicon_depth)
+    return stats
+
+
+AMPLICON_DEPTH_COLUMNS = ['sample_name', 'level', 'pool', 'amplicon_id',
+                          'positions', 'mean_depth', 'median_depth',
+                          'low_depth_amplicons']
+
+
+def _get_median(depths):
+    '''
+    Return the median of a sorted sequence of depths, matching
+    statistics.median().
+    '''
+    middle = len(depths) // 2
+    if len(depths) % 2:
+        return depths[middle]
+    return (depths[middle - 1] + depths[middle]) / 2
+
+
+class AmpliconDepth:
+    '''
+    Group the depths of the <sample>.per_base_coverage.bed file by amplicon
+    while the file is read.  Each amplicon is assigned a group index on first
+    sight and its depths are appended to a typed array, so rows are not stored
+    as dictionaries.  Rows of an amplicon are usually contiguous, the group of
+    the previous row is checked before the index lookup.
+    '''
+    __slots__ = ('index', 'keys', 'depths', '_last_key', '_last_depths')
+
+    def __init__(self):
+        self.index = {}
+        self.keys = []
+        self.depths = []
+        self._last_key = None
+        self._last_depths = None
+
+    def add(self, amplicon_id, pool, depth):
+        '''
+        Add the depth of a position within an amplicon.
+        '''
+        key = (amplicon_id, pool)
+        if key != self._last_key:
+            group = self.index.get(key)
+            if group is None:
+                group = self.index[key] = len(self.keys)
+                self.keys.append(key)
+                self.depths.append(array('Q'))
+            self._last_key = key
+            self._last_depths = self.depths[group]
+        self._last_depths.append(depth)
+
+    def get_stats(self, min_depth=20):
+        '''
+        Return the per amplicon and per pool depth statistics, see
+        get_amplicon_stats().
+        '''
+        groups = []
+        for (amplicon_id, pool), depths in zip(self.keys, self.depths):
+            depths = sorted(depths)
+            groups.append((amplicon_id, pool, len(depths), sum(depths),
+                           _get_median(depths)))
+        pool_depths = {}
+        for (_, pool), depths in zip(self.keys, self.depths):
+            pool_depths.setdefault(pool, array('Q')).extend(depths)
+        pools = [(pool, len(depths), sum(depths), _get_median(sorted(depths)))
+                 for pool, depths in pool_depths.items()]
+        return get_amplicon_stats(groups, pools, min_depth=min_depth)
+
+
+def get_amplicon_stats(groups, pools, min_depth=20):
+    '''
+    Create the per amplicon and per pool depth statistics from the group
+    totals.
+
+    Arguments:
+        * groups:       list of (amplicon_id, pool, positions, total depth,
+                        median depth) tuples in file order
+        * pools:        list of (pool, positions, total depth, median depth)
+                        tuples in file order
+        * min_depth:    amplicons with a mean depth below this value are
+                        flagged as low depth (default: 20)
+
+    Return Value:
+        Returns a dictionary with the keys amplicons and pools, each a list of
+        dictionaries with the keys of AMPLICON_DEPTH_COLUMNS except
+        sample_name and level
+    '''
+    amplicons = []
+    low_depth = {}
+    for amplicon_id, pool, positions, total, median in groups:
+        mean = total / positions
+        low = int(mean < min_depth)
+        low_depth[pool] = low_depth.get(pool, 0) + low
+        amplicons.append({'pool' : pool,
+                          'amplicon_id' : amplicon_id,
+                          'positions' : positions,
+                          'mean_depth' : round(mean, 1),
+                          'median_depth' : round(median, 1),
+                          'low_depth_amplicons' : low})
+    return {'amplicons' : amplicons,
+            'pools' : [{'pool' : pool,
+                        'amplicon_id' : 'NA',
+                        'positions' : positions,
+                        'mean_depth' : round(total / positions, 1),
+                        'median_depth' : round(median, 1),
+                        'low_depth_amplicons' : low_depth[pool]}
+                       for pool, positions, total, median in pools]}
+
+
+def get_amplicon_stats_numpy(amplicon_ids, pools, depth, min_depth=20):
+    '''
+    Calculate the per amplicon and per pool depth statistics from NumPy
+    arrays, groups are formed with np.unique and the medians taken from a
+    single sort of the depths by group.
+
+    Arguments:
+        * amplicon_ids: array of amplicon ids for each position
+        * pools:        array of pool names for each position
+        * depth:        int64 array of depths
+        * min_depth:    see get_amplicon_stats() (default: 20)
+
+    Return Value:
+        Returns a dictionary, see get_amplicon_stats()
+    '''
+    import numpy as np
+
+    def group_stats(keys):
+        # group numbers in order of first appearance in the file
+        _, first, inverse = np.unique(keys, return_index=True,
+                                      return_inverse=True)
+        rank = np.empty_like(first)
+        rank[np.argsort(first)] = np.arange(first.size)
+        group = rank[inverse.ravel()]
+        counts = np.bincount(group, minlength=first.size)
+        ordered = depth[np.lexsort((depth, group))]
+        starts = np.cumsum(counts) - counts
+        totals = np.add.reduceat(ordered, starts)
+        lower = ordered[starts + (counts - 1) // 2]
+        upper = ordered[starts + counts // 2]
+        # odd groups have an int median like statistics.median()
+        medians = [int(low) if count % 2 else (int(low) + int(high)) / 2
+                   for count, low, high in zip(counts, lower, upper)]
+        return np.sort(first), counts.tolist(), totals.tolist(), medians
+
+    groups = [(amplicon_ids[i].decode(), pools[i].decode(), count, total,
+               median)
+              for i, count, total, median in zip(*group_stats(
+                  np.char.add(np.char.add(amplicon_ids, b'\t'), pools)))]
+    pool_stats = [(pools[i].decode(), count, total, median)
+                  for i, count, total, median in zip(*group_stats(pools))]
+    return get_amplicon_stats(groups, pool_stats, min_depth=min_depth)
+
+
+def write_amplicon_depth(sample, amplicon_depth, file_p=None):
+    '''
+    Write the per amplicon and per pool depth statistics as tab-separated
+    rows, see AMPLICON_DEPTH_COLUMNS.
+
+    Arguments:
+        * sample:           name of the sample
+        * amplicon_depth:   dictionary returned by get_amplicon_stats()
+        * file_p:           open file handle to write to (default: stdout)
+    '''
+    for level in ['amplicons', 'pools']:
+        for row in amplicon_depth[level]:
+            row = dict(row, sample_name=sample, level=level[:-1])
+            print('\t'.join([str(row[column]) for column in
+                             AMPLICON_DEPTH_COLUMNS]), file=file_p)
+
+
+def write_amplicon_depth_header(file_p=None):
+    '''
+    Write the header of the amplicon depth table.
+
+    Arguments:
+        * file_p:   open file handle to write to (default: stdout)
+    '''
+    print('\t'.join(AMPLICON_DEPTH_COLUMNS), file=file_p)
@@ -0,0 +1,311 @@
+'''
+A lightweight FASTA reader working directly on bytes.  This avoids importing
+Biopython and building sequence objects when only lengths or base counts are
+required.
+
+A run may write the consensus sequences of all samples to one multi-FASTA
+file.  Single records of an uncompressed file are read through a
+samtools-compatible .fai index and a memory map of the file, so the cost of
+reading one sample does not grow with the number of records.
+'''
+
+import os
+from ncov.parser.fileio import add_io, get_file_key, is_gzip, open_input, \
+    write_atomic
+
+IUPAC_CODES = 'RYSWKMBDHV'
+BASE_CLASSES = 'ACGTN' + IUPAC_CODES
+BASE_CLASSES = BASE_CLASSES + BASE_CLASSES.lower()
+
+_INDEXED_FASTA_CACHE = {}
+
+
+def read_fasta(fasta):
+    '''
+    A generator to read the records of a FASTA file.  Whitespace within the
+    sequence lines is removed and any data before the first header is ignored.
+
+    Arguments:
+        * fasta:    full path to the FASTA file
+
+    Return Value:
+        Yields a tuple (name, sequence) for each record where name is a string
+        containing the first word of the header and sequence is a bytes object
+    '''
+    name = None
+    lines = []
+    with open_input(fasta, 'rb') as file_p:
+        for line in file_p:
+            if line.startswith(b'>'):
+                if name is not None:
+                    yield name, b''.join(lines)
+                header = line[1:].split(None, 1)
+                name = header[0].decode() if header else ''
+                lines = []
+            elif name is not None:
+                lines.append(b''.join(line.split()))
+    if name is not None:
+        yield name, b''.join(lines)
+
+
+def get_record_lengths(fasta):
+    '''
+    Return the length of every record in a FASTA file.
+
+    Arguments:
+        * fasta:    full path to the FASTA file
+
+    Return Value:
+        Returns a list of (name, length) tuples in file order
+    '''
+    return [(name, len(sequence)) for name, sequence in read_fasta(fasta)]
+
+
+def count_bases(sequence):
+    '''
+    Count the occurrences of each base class in a sequence.  Upper and lower
+    case bases are counted separately, characters that are not a nucleotide
+    or IUPAC code are counted as "other".
+
+    Arguments:
+        * sequence: a bytes object containing the sequence
+
+    Return Value:
+        Returns a dictionary keyed by each of A, C, G, T, N, the IUPAC codes
+        RYSWKMBDHV and their lower case equivalents, as well as "other" and
+        "length"
+    '''
+    composition = {base : sequence.count(base.encode()) for base in BASE_CLASSES}
+    composition['length'] = len(sequence)
+    composition['other'] = composition['length'] - sum(
+        composition[base] for base in BASE_CLASSES)
+    return composition
+
+
+def count_fasta_composition(fasta):
+    '''
+    Count the base composition of every record in a FASTA file.
+
+    Arguments:
+        * fasta:    full path to the FASTA file
+
+    Return Value:
+        Returns a dictionary containing the following keys:
+            * records:  list of (name, composition) tuples, see count_bases()
+            * total:    composition summed across all records
+    '''
+    records = []
+    total = dict.fromkeys(list(BASE_CLASSES) + ['length', 'other'], 0)
+    for name, sequence in read_fasta(fasta):
+        composition = count_bases(sequence)
+        for base, count in composition.items():
+            total[base] += count
+        records.append((name, composition))
+    return {'records' : records, 'total' : total}
+
+
+def build_fasta_index(fasta):
+    '''
+    Build the .fai index of an uncompressed FASTA file in a single pass.
+
+    Arguments:
+        * fasta:    full path to the FASTA file
+
+    Return Value:
+        Returns a list of (name, length, offset, line_bases, line_width)
+        tuples in file order, where offset is the byte offset of the first
+        base and line_bases and line_width are the number of bases and bytes
+        of the first sequence line, as in samtools faidx
+    '''
+    records = []
+    record = None
+    offset = 0
+    lines = 0
+    with open(fasta, 'rb') as file_p:
+        for lines, line in enumerate(file_p, start=1):
+            if line.startswith(b'>'):
+                if record is not None:
+                    records.append(tuple(record))
+                header = line[1:].split(None, 1)
+                record = [header[0].decode() if header else '', 0,
+                          offset + len(line), 0, 0]
+            elif record is not None:
+                bases = len(b''.join(line.split()))
+                if not record[3]:
+                    record[3] = len(line.rstrip(b'\r\n'))
+                    record[4] = len(line)
+                record[1] += bases
+            offset += len(line)
+    add_io(offset, lines)
+    if record is not None:
+        records.append(tuple(record))
+    return records
+
+
+def write_fasta_index(records, file):
+    '''
+    Atomically write a .fai index file.
+
+    Arguments:
+        * records:  list of index records from build_fasta_index()
+        * file:     full path to the .fai file
+    '''
+    def write_records(file_p):
+        for record in records:
+            file_p.write('\t'.join(str(value) for value in record) + '\n')
+    write_atomic(file, write_records)
+
+
+def read_fasta_index(fasta):
+    '''
+    Return the .fai index of an uncompressed FASTA file.  The <fasta>.fai file
+    is used when it is at least as new as the FASTA file, otherwise the index
+    is built and written next to the FASTA file when the directory is
+    writable.
+
+    Arguments:
+        * fasta:    full path to the FASTA file
+
+    Return Value:
+        Returns a list of index records, see build_fasta_index()
+    '''
+    index_file = fasta + '.fai'
+    try:
+        if os.path.getmtime(index_file) >= os.path.getmtime(fasta):
+            with open(index_file) as file_p:
+                return [(data[0],) + tuple(int(value) for value in data[1:5])
+                        for data in (line.rstrip('\r\n').split('\t')
+                                     for line in file_p if line.strip())]
+    except (OSError, ValueError, IndexError):
+        pass
+    records = build_fasta_index(fasta)
+    try:
+        write_fasta_index(records, index_file)
+    except OSError:
+        pass
+    return records
+
+
+class IndexedFasta:
+    '''
+    Random access to the records of an uncompressed FASTA file through its
+    .fai index and a read only memory map.
+
+    Arguments:
+        * fasta:    full path to the FASTA file
+    '''
+    __slots__ = ('fasta', 'records', '_index', '_file_p', '_map')
+
+    def __init__(self, fasta):
+        import mmap
+        self.fasta = fasta
+        self._file_p = open(fasta, 'rb')
+        try:
+            if is_gzip(self._file_p):
+                raise ValueError('%s is compressed, an index requires an '
+                                 'uncompressed FASTA file' % fasta)
+            self.records = read_fasta_index(fasta)
+            self._map = None
+            if os.fstat(self._file_p.fileno()).st_size:
+                self._map = mmap.mmap(self._file_p.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+        except:
+            self._file_p.close()
+            raise
+        self._index = {}
+        for record in self.records:
+            self._index.setdefault(record[0], record)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def get_length(self, name):
+        '''
+        Return the length of a record, raises KeyError for an unknown name.
+        '''
+        return self._index[name][1]
+
+    def get_sequence(self, name):
+        '''
+        Return the sequence of a record as bytes with whitespace removed,
+        raises KeyError for an unknown name.
+        '''
+        offset = self._index[name][2]
+        end = self._map.find(b'>', offset)
+        if end < 0:
+            end = len(self._map)
+        data = self._map[offset:end]
+        add_io(len(data), data.count(b'\n'))
+        return b''.join(data.split())
+
+    def close(self):
+        '''
+        Close the memory map and file.
+        '''
+        if self._map is not None:
+            self._map.close()
+        self._file_p.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def get_indexed_fasta(fasta):
+    '''
+    Return an IndexedFasta for a FASTA file, kept open and cached until the
+    file changes so a run of samples maps the file once per process.
+    '''
+    key = get_file_key(fasta)
+    indexed = _INDEXED_FASTA_CACHE.get(key)
+    if indexed is None:
+        for old_key in [old_key for old_key in _INDEXED_FASTA_CACHE
+                        if old_key[0] == key[0]]:
+            _INDEXED_FASTA_CACHE.pop(old_key).close()
+        indexed = _INDEXED_FASTA_CACHE[key] = IndexedFasta(fasta)
+    return indexed
+
+
+def get_fasta_record(fasta, name):
+    '''
+    Return the sequence of one record of a FASTA file.  Uncompressed files are
+    read through the index, compressed files are scanned.
+
+    Arguments:
+        * fasta:    full path to the FASTA file
+        * name:     first word of the record header
+
+    Return Value:
+        Returns the sequence as bytes, raises KeyError when there is no record
+        with the name
+    '''
+    with open(fasta, 'rb') as file_p:
+        compressed = is_gzip(file_p)
+    if not compressed:
+        return get_indexed_fasta(fasta).get_sequence(name)
+    for record_name, sequence in read_fasta(fasta):
+        if record_name == name:
+            return sequence
+    raise KeyError(name)
+
+
+def get_fasta_record_length(fasta, name):
+    '''
+    Return the length of one record of a FASTA file, see get_fasta_record().
+    '''
+    with open(fasta, 'rb') as file_p:
+        compressed = is_gzip(file_p)
+    if not compressed:
+        return get_indexed_fasta(fasta).get_length(name)
+    return len(get_fasta_record(fasta, name))
+
+
+def clear_indexed_fasta_cache():
+    '''
+    Close and remove all entries from the in-process indexed FASTA cache.
+    '''
+    for indexed in _INDEXED_FASTA_CACHE.values():
+        indexed.close()
+    _INDEXED_FASTA_CACHE.clear()
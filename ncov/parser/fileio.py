@@ -0,0 +1,262 @@
+'''
+Helper functions for accessing the input files of the ncov-tools pipeline.
+'''
+
+import contextlib
+import io
+import os
+
+
+def get_file_key(file):
+    '''
+    Return the key identifying the current version of a file, used to detect
+    when cached results derived from the file are stale.
+
+    Arguments:
+        * file: full path to the file
+
+    Return Value:
+        Returns a tuple (path, size, mtime) where path is the absolute path and
+        mtime is in nanoseconds
+    '''
+    path = os.path.abspath(file)
+    stat = os.stat(path)
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def write_atomic(file, write):
+    '''
+    Write a file by calling write() with an open file handle on a temporary
+    file that is moved into place once complete, so readers never see a
+    partially written file.
+
+    Arguments:
+        * file:     full path to the file
+        * write:    function called with the open file handle
+    '''
+    tmp_file = '%s.%d.tmp' % (file, os.getpid())
+    with open(tmp_file, 'w') as file_p:
+        write(file_p)
+    os.replace(tmp_file, file)
+
+
+class IOCounter:
+    '''
+    The number of bytes and lines read by a stage, see count_io().  Bytes of
+    compressed files are counted after decompression.
+    '''
+    __slots__ = ('bytes_read', 'rows')
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.rows = 0
+
+    def add(self, bytes_read, rows):
+        '''
+        Add bytes and lines read without open_input(), for example from a
+        memory map.
+        '''
+        self.bytes_read += bytes_read
+        self.rows += rows
+
+
+# counter of the running count_io() context, None when reads are not counted
+_IO_COUNTER = None
+
+
+@contextlib.contextmanager
+def count_io():
+    '''
+    Count the bytes and lines read through open_input() and add_io() within
+    the context.  Results served from memory or a cache read nothing and are
+    not counted.  The counts of a nested context are added to the enclosing
+    one on exit.
+
+    Return Value:
+        A context manager returning an IOCounter
+    '''
+    global _IO_COUNTER
+    previous = _IO_COUNTER
+    counter = _IO_COUNTER = IOCounter()
+    try:
+        yield counter
+    finally:
+        _IO_COUNTER = previous
+        if previous is not None:
+            previous.add(counter.bytes_read, counter.rows)
+
+
+def add_io(bytes_read, rows):
+    '''
+    Add bytes and lines read without open_input() to the counter of the
+    running count_io() context, if any.
+    '''
+    if _IO_COUNTER is not None:
+        _IO_COUNTER.add(bytes_read, rows)
+
+
+class _CountingReader(io.BufferedIOBase):
+    '''
+    A binary file handle counting the bytes and lines read from another.  The
+    wrapped handle is not closed.
+    '''
+    def __init__(self, file_p, counter):
+        super().__init__()
+        self._file_p = file_p
+        self._counter = counter
+
+    def _count(self, data):
+        self._counter.bytes_read += len(data)
+        self._counter.rows += data.count(b'\n')
+        return data
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._count(self._file_p.read(size))
+
+    def read1(self, size=-1):
+        read1 = getattr(self._file_p, 'read1', self._file_p.read)
+        return self._count(read1(size))
+
+    def readline(self, size=-1):
+        return self._count(self._file_p.readline(size))
+
+
+COMPRESSED_SUFFIXES = ('.gz', '.bgz')
+GZIP_MAGIC = b'\x1f\x8b'
+BUFFER_SIZE = 1 << 20
+
+
+def get_decompress_threads(threads=None):
+    '''
+    Return the number of threads used to decompress gzip input, set with the
+    NCOV_PARSER_DECOMPRESS_THREADS environment variable when not given.
+
+    Arguments:
+        * threads:  number of threads, None to read the environment variable
+
+    Return Value:
+        Returns an integer, values below 2 decompress in the current thread
+    '''
+    if threads is None:
+        try:
+            threads = int(os.environ.get('NCOV_PARSER_DECOMPRESS_THREADS', 1))
+        except ValueError:
+            threads = 1
+    return threads
+
+
+def is_gzip(file_p):
+    '''
+    Return True when a binary buffered file handle starts with the gzip magic
+    number, the file position is not changed.
+    '''
+    return file_p.peek(2)[:2] == GZIP_MAGIC
+
+
+@contextlib.contextmanager
+def _open_pigz(file, threads, buffer_size):
+    '''
+    Decompress a gzip file with a pigz subprocess.
+    '''
+    import subprocess
+    process = subprocess.Popen(['pigz', '-dc', '-p', str(threads), file],
+                               stdout=subprocess.PIPE, bufsize=buffer_size)
+    try:
+        yield process.stdout
+    finally:
+        process.stdout.close()
+        if process.wait() not in (0, -13):
+            # -13 (SIGPIPE) when the file was not read to the end
+            raise OSError('pigz failed to decompress %s' % file)
+
+
+def _open_gzip(file, raw, threads, buffer_size):
+    '''
+    Return a binary file handle decompressing a gzip or bgzip file.  The isal
+    package is used when installed, with threads either isal or pigz
+    decompress in the background, otherwise the gzip module is used.
+    '''
+    if threads > 1:
+        try:
+            from isal import igzip_threaded
+            raw.close()
+            return igzip_threaded.open(file, 'rb', threads=threads,
+                                       block_size=buffer_size)
+        except ImportError:
+            pass
+        import shutil
+        if shutil.which('pigz'):
+            raw.close()
+            return _open_pigz(file, threads, buffer_size)
+    try:
+        from isal.igzip import IGzipFile as GzipFile
+    except ImportError:
+        from gzip import GzipFile
+    return io.BufferedReader(GzipFile(fileobj=raw, mode='rb'), buffer_size)
+
+
+@contextlib.contextmanager
+def open_input(file, mode='r', buffer_size=BUFFER_SIZE, threads=None):
+    '''
+    Open an input file for reading, gzip and bgzip compressed files are
+    detected from their content and decompressed transparently.  Within a
+    count_io() context the bytes and lines read are counted.
+
+    Arguments:
+        * file:         full path to the file
+        * mode:         'r' for text or 'rb' for bytes (default: 'r')
+        * buffer_size:  size of the read buffer in bytes (default: 1 MiB)
+        * threads:      number of decompression threads, see
+                        get_decompress_threads() (default: None)
+
+    Return Value:
+        A context manager returning a file handle
+    '''
+    if mode not in ('r', 'rb'):
+        raise ValueError('invalid mode: %s' % mode)
+    raw = open(file, 'rb', buffering=buffer_size)
+    try:
+        if is_gzip(raw):
+            file_p = _open_gzip(file, raw, get_decompress_threads(threads),
+                                buffer_size)
+        else:
+            file_p = raw
+        with file_p as binary:
+            if _IO_COUNTER is not None:
+                binary = _CountingReader(binary, _IO_COUNTER)
+            if mode == 'rb':
+                yield binary
+            else:
+                with io.TextIOWrapper(binary) as text:
+                    yield text
+    finally:
+        raw.close()
+
+
+def find_input(file):
+    '''
+    Return the first of file, file.gz and file.bgz that exists.
+
+    Arguments:
+        * file: full path to the uncompressed file
+
+    Return Value:
+        Returns the path of the existing file or None
+    '''
+    for suffix in ('',) + COMPRESSED_SUFFIXES:
+        if os.path.exists(file + suffix):
+            return file + suffix
+    return None
+
+
+def strip_compressed_suffix(file):
+    '''
+    Return the file name without a trailing .gz or .bgz suffix.
+    '''
+    for suffix in COMPRESSED_SUFFIXES:
+        if file.endswith(suffix):
+            return file[:-len(suffix)]
+    return file
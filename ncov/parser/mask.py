@@ -0,0 +1,167 @@
+'''
+Masking of genome positions.  The masked ends of the genome and any number of
+BED or VCF mask files (for example problematic sites or primer regions) are
+compiled once per reference into a bitmap with one entry per position, each
+bit of an entry is one mask source.  Variants are then classified with a
+single lookup.  Mask files are assumed to refer to a single record reference,
+the chromosome column is not checked.
+'''
+
+import os
+from array import array
+from ncov.parser.fileio import get_file_key, open_input, strip_compressed_suffix
+from ncov.parser.reference import get_reference_info
+
+ENDS_SOURCE = 'ends'
+
+_MASK_CACHE = {}
+
+
+def read_mask_intervals(file):
+    '''
+    Read the masked intervals of a BED or VCF file.  BED intervals are 0-based
+    half open, a VCF record masks the positions of its REF allele.
+
+    Arguments:
+        * file: full path to the .bed or .vcf file, optionally gzip compressed
+
+    Return Value:
+        Returns a list of (first, last) 1-based inclusive positions
+    '''
+    vcf = strip_compressed_suffix(file).lower().endswith('.vcf')
+    intervals = []
+    with open_input(file) as file_p:
+        for line in file_p:
+            if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                continue
+            data = line.rstrip('\r\n').split('\t')
+            if vcf:
+                first = int(data[1])
+                intervals.append((first, first + max(len(data[3]), 1) - 1))
+            else:
+                intervals.append((int(data[1]) + 1, int(data[2])))
+    return intervals
+
+
+def get_mask_source_name(file):
+    '''
+    Return the source name of a mask file, the file name without the
+    directory and .bed/.vcf and compression suffixes.
+    '''
+    name = os.path.basename(strip_compressed_suffix(file))
+    for suffix in ['.bed', '.vcf']:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+class PositionMask:
+    '''
+    A bitmap of masked positions, entry i holds the mask sources of position
+    i as bits in the order of sources.
+
+    Arguments:
+        * length:   number of positions
+        * sources:  list of mask source names
+    '''
+    __slots__ = ('length', 'sources', 'bits', 'outside')
+
+    def __init__(self, length, sources):
+        self.length = length
+        self.sources = list(sources)
+        # the smallest unsigned type with a bit for every source, the sizes
+        # of 'L' and 'Q' are platform dependent so they are checked
+        typecode = next((typecode for typecode in 'BHILQ'
+                         if array(typecode).itemsize * 8 >= len(self.sources)),
+                        None)
+        if typecode is None:
+            raise ValueError('at most %d mask sources are supported, got %d'
+                             % (array('Q').itemsize * 8, len(self.sources)))
+        self.bits = array(typecode, bytes(array(typecode).itemsize * (length + 1)))
+        # sources of positions outside of the bitmap
+        self.outside = 0
+
+    def add(self, source, first, last):
+        '''
+        Mask the positions first to last (1-based, inclusive) for a source.
+        '''
+        bit = 1 << self.sources.index(source)
+        first = max(first, 1)
+        last = min(last, self.length)
+        bits = self.bits
+        for position in range(first, last + 1):
+            bits[position] |= bit
+
+    def get(self, position):
+        '''
+        Return the mask bits of a position, 0 when unmasked.
+        '''
+        if 0 < position <= self.length:
+            return self.bits[position]
+        return self.outside
+
+    def get_sources(self, bits):
+        '''
+        Return the list of source names of mask bits.
+        '''
+        return [source for i, source in enumerate(self.sources) if bits >> i & 1]
+
+
+def compile_mask(reference=None, mask_start=100, mask_end=50, mask_files=()):
+    '''
+    Compile the masked ends of the genome and the mask files into a
+    PositionMask.  The ends are only masked when the reference is given,
+    positions past the end of the genome are masked as ends.  Masks are
+    cached by the reference, mask settings and mask files.
+
+    Arguments:
+        * reference:    full path to the reference FASTA file (default: None)
+        * mask_start:   bases to mask at beginning of genome (default: 100)
+        * mask_end:     bases to mask at end of genome (default: 50)
+        * mask_files:   list of BED or VCF mask files (default: none)
+
+    Return Value:
+        Returns a PositionMask object with the sources 'ends' and the name of
+        each mask file, see get_mask_source_name(), a number is appended to
+        repeated names
+    '''
+    key = (None if reference is None else get_file_key(reference),
+           int(mask_start), int(mask_end),
+           tuple(get_file_key(file) for file in mask_files))
+    mask = _MASK_CACHE.get(key)
+    if mask is not None:
+        return mask
+    genome_length = 0
+    if reference is not None:
+        reference_info = get_reference_info(reference=reference,
+                                            mask_start=mask_start,
+                                            mask_end=mask_end)
+        genome_length = reference_info['genome_length']
+        mask_lower, mask_upper = reference_info['mask_boundaries']
+    intervals = {}
+    for file in mask_files:
+        source = name = get_mask_source_name(file)
+        suffix = 1
+        while source in intervals or source == ENDS_SOURCE:
+            suffix += 1
+            source = '%s_%d' % (name, suffix)
+        intervals[source] = read_mask_intervals(file)
+    length = max([genome_length] + [last for source in intervals.values()
+                                    for _, last in source])
+    mask = PositionMask(length, [ENDS_SOURCE] + list(intervals))
+    if genome_length > 0:
+        mask.add(ENDS_SOURCE, 1, mask_lower - 1)
+        mask.add(ENDS_SOURCE, mask_upper + 1, length)
+        mask.outside = 1
+    for source, source_intervals in intervals.items():
+        for first, last in source_intervals:
+            mask.add(source, first, last)
+    _MASK_CACHE[key] = mask
+    return mask
+
+
+def clear_mask_cache():
+    '''
+    Remove all entries from the in-process mask cache.
+    '''
+    _MASK_CACHE.clear()
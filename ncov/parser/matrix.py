@@ -0,0 +1,248 @@
+'''
+A sparse sample by variant matrix of a run, used to find recurrent variants
+and likely contamination.  Every <sample>.variants.tsv file is read once,
+each (POS, REF, ALT) allele is interned to an integer variant id and the
+matrix is kept in compressed sparse row (CSR) arrays: the variant ids of
+sample i are indices[indptr[i]:indptr[i + 1]] with their ALT_FREQ in data.
+The transposed, column oriented arrays are built on the first query by
+variant.
+'''
+
+import sys
+from array import array
+from ncov.parser.fileio import open_input
+
+
+class VariantMatrix:
+    '''
+    A sparse sample by variant matrix in CSR arrays.
+
+    Arguments:
+        * samples:  list of sample names, one per row
+        * variants: list of (POS, REF, ALT) tuples, one per variant id
+        * indptr:   array of row offsets into indices and data
+        * indices:  array of variant ids, sorted within each row
+        * data:     array of the ALT_FREQ of each entry, NaN when the
+                    variants file has no ALT_FREQ column
+    '''
+    __slots__ = ('samples', 'variants', 'indptr', 'indices', 'data',
+                 '_variant_ids', '_column_indptr', '_column_indices')
+
+    def __init__(self, samples, variants, indptr, indices, data):
+        self.samples = samples
+        self.variants = variants
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self._variant_ids = None
+        self._column_indptr = None
+        self._column_indices = None
+
+    @property
+    def shape(self):
+        '''
+        The number of samples and variants.
+        '''
+        return len(self.samples), len(self.variants)
+
+    def get_variant_id(self, pos, ref, alt):
+        '''
+        Return the id of a variant, None when no sample has the variant.
+        '''
+        if self._variant_ids is None:
+            self._variant_ids = {variant : i for i, variant in enumerate(self.variants)}
+        return self._variant_ids.get((int(pos), ref, alt))
+
+    def get_sample_variants(self, sample):
+        '''
+        Return the list of (POS, REF, ALT) variants of a sample.
+        '''
+        row = self.samples.index(sample)
+        return [self.variants[i] for i in
+                self.indices[self.indptr[row]:self.indptr[row + 1]]]
+
+    def get_site_counts(self):
+        '''
+        Return an array with the number of samples having each variant.
+        '''
+        counts = array('l', bytes(array('l').itemsize * len(self.variants)))
+        for i in self.indices:
+            counts[i] += 1
+        return counts
+
+    def _build_columns(self):
+        '''
+        Build the column oriented (CSC) arrays from the row arrays.
+        '''
+        counts = self.get_site_counts()
+        column_indptr = array('l', [0])
+        total = 0
+        for count in counts:
+            total += count
+            column_indptr.append(total)
+        column_indices = array('l', bytes(array('l').itemsize * total))
+        fill = array('l', column_indptr[:-1])
+        # rows are visited in order so each column lists its samples in order
+        indptr = self.indptr
+        indices = self.indices
+        for row in range(len(self.samples)):
+            for i in indices[indptr[row]:indptr[row + 1]]:
+                column_indices[fill[i]] = row
+                fill[i] += 1
+        self._column_indptr = column_indptr
+        self._column_indices = column_indices
+
+    def get_variant_samples(self, pos, ref, alt):
+        '''
+        Return the list of samples sharing a variant.
+        '''
+        variant_id = self.get_variant_id(pos, ref, alt)
+        if variant_id is None:
+            return []
+        if self._column_indptr is None:
+            self._build_columns()
+        start = self._column_indptr[variant_id]
+        end = self._column_indptr[variant_id + 1]
+        return [self.samples[row] for row in self._column_indices[start:end]]
+
+    def get_recurrent_variants(self, min_samples=2):
+        '''
+        Return the variants found in at least min_samples samples.
+
+        Arguments:
+            * min_samples:  minimum number of samples (default: 2)
+
+        Return Value:
+            Returns a list of ((POS, REF, ALT), total samples) tuples ordered
+            by decreasing number of samples and position
+        '''
+        counts = self.get_site_counts()
+        recurrent = [(self.variants[i], count) for i, count in enumerate(counts)
+                     if count >= min_samples]
+        recurrent.sort(key=lambda item: (-item[1], item[0]))
+        return recurrent
+
+    def get_unique_variants(self):
+        '''
+        Return the variants found in a single sample.
+
+        Return Value:
+            Returns a dictionary keyed by sample name of the list of
+            (POS, REF, ALT) variants no other sample has, samples without
+            unique variants are not included
+        '''
+        counts = self.get_site_counts()
+        unique = {}
+        indptr = self.indptr
+        indices = self.indices
+        for row, sample in enumerate(self.samples):
+            variants = [self.variants[i] for i in
+                        indices[indptr[row]:indptr[row + 1]] if counts[i] == 1]
+            if variants:
+                unique[sample] = variants
+        return unique
+
+
+def read_sample_variants(file, indel=True):
+    '''
+    Read the distinct variants of a <sample>.variants.tsv file, the same
+    variants are counted as in get_total_variants().
+
+    Arguments:
+        * file:     full path to the <sample>.variants.tsv file
+        * indel:    boolean to determine whether to include indels
+                    (default: True)
+
+    Return Value:
+        Returns a dictionary of (POS, REF, ALT) to ALT_FREQ, the first record
+        of a repeated variant is kept
+    '''
+    variants = {}
+    with open_input(file) as file_p:
+        header = file_p.readline().rstrip('\r\n').split('\t')
+        if not {'POS', 'REF', 'ALT'}.issubset(header):
+            # an empty file or one without the columns has no variants
+            return variants
+        pos_index = header.index('POS')
+        ref_index = header.index('REF')
+        alt_index = header.index('ALT')
+        freq_index = header.index('ALT_FREQ') if 'ALT_FREQ' in header else None
+        max_split = max(pos_index, ref_index, alt_index,
+                        -1 if freq_index is None else freq_index) + 1
+        for line in file_p:
+            data = line.rstrip('\r\n').split('\t', max_split)
+            if len(data) < max_split:
+                continue
+            alt = data[alt_index]
+            if len(alt) != 1 and not (len(alt) > 1 and indel):
+                continue
+            key = (int(data[pos_index]), data[ref_index], alt)
+            if key in variants:
+                continue
+            try:
+                variants[key] = float(data[freq_index])
+            except (TypeError, ValueError):
+                variants[key] = float('nan')
+    return variants
+
+
+def build_variant_matrix(var_files, indel=True):
+    '''
+    Build the sparse variant matrix of a run, reading each variants file
+    once.
+
+    Arguments:
+        * var_files:    dictionary of sample name to the full path of the
+                        <sample>.variants.tsv file, rows are in the order of
+                        the dictionary
+        * indel:        boolean to determine whether to include indels
+                        (default: True)
+
+    Return Value:
+        Returns a VariantMatrix object, files that cannot be read are
+        reported on stderr and skipped
+    '''
+    variant_ids = {}
+    variants = []
+    samples = []
+    indptr = array('l', [0])
+    indices = array('l')
+    data = array('f')
+    for sample, file in var_files.items():
+        try:
+            sample_variants = read_sample_variants(file, indel=indel)
+        except Exception as err:
+            print('Unable to process sample %s: %s' % (sample, err),
+                  file=sys.stderr)
+            continue
+        row = []
+        for variant, freq in sample_variants.items():
+            variant_id = variant_ids.get(variant)
+            if variant_id is None:
+                variant_id = variant_ids[variant] = len(variants)
+                variants.append(variant)
+            row.append((variant_id, freq))
+        row.sort()
+        indices.extend(variant_id for variant_id, _ in row)
+        data.extend(freq for _, freq in row)
+        indptr.append(len(indices))
+        samples.append(sample)
+    return VariantMatrix(samples, variants, indptr, indices, data)
+
+
+def write_recurrent_variants(matrix, min_samples=2, file_p=None):
+    '''
+    Write the recurrent variants of a run as a tab separated table with the
+    columns pos, ref, alt, total_samples and samples (comma separated).
+
+    Arguments:
+        * matrix:       a VariantMatrix object
+        * min_samples:  minimum number of samples (default: 2)
+        * file_p:       open file handle to write to (default: stdout)
+    '''
+    print('\t'.join(['pos', 'ref', 'alt', 'total_samples', 'samples']),
+          file=file_p)
+    for (pos, ref, alt), count in matrix.get_recurrent_variants(min_samples):
+        print('\t'.join([str(pos), ref, alt, str(count),
+                         ','.join(matrix.get_variant_samples(pos, ref, alt))]),
+              file=file_p)
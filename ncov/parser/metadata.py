@@ -0,0 +1,199 @@
+'''
+Access to the run metadata file.  The metadata file is loaded once per process
+and memoized using the path and modification time of the file, a persistent
+SQLite index can also be built so a single sample can be looked up without
+reading the whole file.
+'''
+
+import csv
+import os
+from ncov.parser.fileio import get_file_key, open_input
+
+_METADATA_CACHE = {}
+_INDEX_CONNECTIONS = {}
+
+
+def _read_metadata(file, sample_id, ct_id, date_id, delimiter):
+    '''
+    Generator returning (sample, ct, date) tuples from the metadata file.
+    '''
+    with open_input(file) as file_p:
+        meta_reader = csv.reader(file_p, delimiter=delimiter)
+        header = next(meta_reader)
+        sample_index = header.index(sample_id)
+        ct_index = header.index(ct_id)
+        date_index = header.index(date_id)
+        for line in meta_reader:
+            if line:
+                yield line[sample_index], line[ct_index], line[date_index]
+
+
+def load_metadata(file, sample_id='sample', ct_id='ct', date_id='date',
+                  delimiter='\t'):
+    '''
+    Import the metadata file, the result is memoized and only re-read when
+    the file changes.
+
+    Arguments:
+        * file:         full path to the metadata file
+        * sample_id:    the column label representing the sample name
+                        (default: 'sample')
+        * ct_id:        the column label representing the ct value
+                        (default: 'ct')
+        * date_id:      the column label representing the date value
+                        (default: 'date')
+        * delimiter:    the file delimiter in the text file (default: '\t')
+
+    Return Value:
+        Returns a dictionary keyed by sample name, each value is a dictionary
+        with the keys ct and date
+    '''
+    key = get_file_key(file) + (sample_id, ct_id, date_id, delimiter)
+    data = _METADATA_CACHE.get(key)
+    if data is None:
+        data = {sample : {'ct' : ct, 'date' : date} for sample, ct, date in
+                _read_metadata(file, sample_id, ct_id, date_id, delimiter)}
+        for old_key in [old_key for old_key in _METADATA_CACHE
+                        if old_key[0] == key[0]]:
+            del _METADATA_CACHE[old_key]
+        _METADATA_CACHE[key] = data
+    return data
+
+
+def get_index_file(file):
+    '''
+    Return the default name of the SQLite index for a metadata file.
+    '''
+    return file + '.sqlite'
+
+
+def build_metadata_index(file, index_file=None, sample_id='sample', ct_id='ct',
+                         date_id='date', delimiter='\t'):
+    '''
+    Build a SQLite index of the metadata file.  The index records the size and
+    modification time of the metadata file so a stale index is not used.
+
+    Arguments:
+        * file:         full path to the metadata file
+        * index_file:   full path to the index file
+                        (default: <file>.sqlite)
+        * sample_id:    the column label representing the sample name
+                        (default: 'sample')
+        * ct_id:        the column label representing the ct value
+                        (default: 'ct')
+        * date_id:      the column label representing the date value
+                        (default: 'date')
+        * delimiter:    the file delimiter in the text file (default: '\t')
+
+    Return Value:
+        Returns the path to the index file
+    '''
+    import sqlite3
+    if index_file is None:
+        index_file = get_index_file(file)
+    path, size, mtime = get_file_key(file)
+    tmp_file = '%s.%d.tmp' % (index_file, os.getpid())
+    connection = sqlite3.connect(tmp_file)
+    try:
+        connection.execute('CREATE TABLE source (path TEXT, size INTEGER, '
+                           'mtime INTEGER, columns TEXT)')
+        connection.execute('INSERT INTO source VALUES (?, ?, ?, ?)',
+                           (path, size, mtime,
+                            '\t'.join([sample_id, ct_id, date_id, delimiter])))
+        connection.execute('CREATE TABLE metadata (sample TEXT PRIMARY KEY, '
+                           'ct TEXT, date TEXT)')
+        connection.executemany('INSERT OR REPLACE INTO metadata VALUES (?, ?, ?)',
+                               _read_metadata(file, sample_id, ct_id, date_id,
+                                              delimiter))
+        connection.commit()
+    finally:
+        connection.close()
+    _close_index(index_file)
+    os.replace(tmp_file, index_file)
+    return index_file
+
+
+def _close_index(index_file):
+    '''
+    Close the cached connection to an index file.
+    '''
+    connection = _INDEX_CONNECTIONS.pop(index_file, None)
+    if connection is not None:
+        connection.close()
+
+
+def _get_index_connection(file, index_file, columns):
+    '''
+    Return a connection to the index file, returns None when the index does
+    not exist or does not match the current metadata file.
+    '''
+    if not os.path.exists(index_file):
+        return None
+    import sqlite3
+    connection = _INDEX_CONNECTIONS.get(index_file)
+    if connection is None:
+        connection = sqlite3.connect(index_file)
+        _INDEX_CONNECTIONS[index_file] = connection
+    try:
+        source = connection.execute('SELECT path, size, mtime, columns '
+                                    'FROM source').fetchone()
+    except sqlite3.Error:
+        _close_index(index_file)
+        return None
+    if source is None or tuple(source) != get_file_key(file) + ('\t'.join(columns),):
+        return None
+    return connection
+
+
+def get_sample_metadata(file, sample, index=None, index_file=None,
+                        sample_id='sample', ct_id='ct', date_id='date',
+                        delimiter='\t'):
+    '''
+    Return the metadata for a single sample.  When an up to date SQLite index
+    exists the sample is looked up in the index, otherwise the memoized
+    metadata file is used.
+
+    Arguments:
+        * file:         full path to the metadata file
+        * sample:       name of the sample
+        * index:        None to use an existing index if it is up to date,
+                        True to build the index when it is missing or stale,
+                        False to never use an index (default: None)
+        * index_file:   full path to the index file
+                        (default: <file>.sqlite)
+        * sample_id:    the column label representing the sample name
+                        (default: 'sample')
+        * ct_id:        the column label representing the ct value
+                        (default: 'ct')
+        * date_id:      the column label representing the date value
+                        (default: 'date')
+        * delimiter:    the file delimiter in the text file (default: '\t')
+
+    Return Value:
+        Returns a dictionary with the keys ct and date, raises a KeyError when
+        the sample is not in the metadata file
+    '''
+    if index is not False:
+        if index_file is None:
+            index_file = get_index_file(file)
+        columns = [sample_id, ct_id, date_id, delimiter]
+        connection = _get_index_connection(file, index_file, columns)
+        if connection is None and index:
+            build_metadata_index(file, index_file, *columns)
+            connection = _get_index_connection(file, index_file, columns)
+        if connection is not None:
+            row = connection.execute('SELECT ct, date FROM metadata WHERE '
+                                     'sample = ?', (sample,)).fetchone()
+            if row is None:
+                raise KeyError(sample)
+            return {'ct' : row[0], 'date' : row[1]}
+    return load_metadata(file, sample_id, ct_id, date_id, delimiter)[sample]
+
+
+def clear_metadata_cache():
+    '''
+    Remove all memoized metadata and close any open index connections.
+    '''
+    _METADATA_CACHE.clear()
+    for index_file in list(_INDEX_CONNECTIONS):
+        _close_index(index_file)
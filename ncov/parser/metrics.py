@@ -0,0 +1,65 @@
+'''
+Optional instrumentation of the QC summary stages.  A metrics callback passed
+to create_qc_summary_line() receives one record per stage with the wall time,
+the number of bytes and lines the stage read, counted while it runs with
+ncov.parser.fileio.count_io().  Stages served from the result cache or an
+in-memory cache read nothing.  When no callback is given no measurements are
+taken.
+'''
+
+import json
+
+
+def create_stage_record(stage, seconds, counter):
+    '''
+    Create the metrics record for a stage.
+
+    Arguments:
+        * stage:    name of the stage
+        * seconds:  wall time of the stage in seconds
+        * counter:  a ncov.parser.fileio.IOCounter of the reads of the stage
+
+    Return Value:
+        Returns a dictionary with the keys stage, seconds, bytes_read and rows
+    '''
+    return {'stage' : stage,
+            'seconds' : seconds,
+            'bytes_read' : counter.bytes_read,
+            'rows' : counter.rows}
+
+
+class MetricsCollector:
+    '''
+    A metrics callback that keeps every stage record, pass an instance as the
+    metrics argument of create_qc_summary_line().
+    '''
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def get_totals(self):
+        '''
+        Return the total seconds, bytes read, rows and number of samples for
+        each stage.
+        '''
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['stage'], {'seconds' : 0.0,
+                                                        'bytes_read' : 0,
+                                                        'rows' : 0,
+                                                        'samples' : 0})
+            total['seconds'] += record['seconds']
+            total['bytes_read'] += record['bytes_read']
+            total['rows'] += record['rows']
+            total['samples'] += 1
+        return totals
+
+    def write_json(self, file):
+        '''
+        Write the stage records and totals to a JSON file.
+        '''
+        with open(file, 'w') as file_p:
+            json.dump({'records' : self.records,
+                       'totals' : self.get_totals()}, file_p, indent=2)
@@ -0,0 +1,163 @@
+'''
+Index of the primer binding sites and amplicon overlap zones of a primer
+scheme BED file, for example the ARTIC nCoV-2019.primer.bed.  Both are stored
+as sorted, merged interval arrays so a variant position is classified with a
+binary search.  The index is built once per scheme file and cached, so a run
+of samples reads the scheme once.
+'''
+
+from bisect import bisect_right
+from ncov.parser.fileio import get_file_key, open_input
+
+_PRIMER_CACHE = {}
+
+
+def read_primer_scheme(file):
+    '''
+    Read the primers of a primer scheme BED file.  The amplicon of a primer is
+    taken from names of the form <scheme>_<amplicon>_<LEFT|RIGHT>[_alt<n>].
+
+    Arguments:
+        * file: full path to the primer scheme BED file
+
+    Return Value:
+        Returns a list of dictionaries with the keys start and end (1-based,
+        inclusive), name, amplicon and side, amplicon and side are None when
+        the name does not follow the convention
+    '''
+    primers = []
+    with open_input(file) as file_p:
+        for line in file_p:
+            if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                continue
+            data = line.rstrip('\r\n').split('\t')
+            name = data[3] if len(data) > 3 else ''
+            amplicon = side = None
+            fields = name.split('_')
+            for i, field in enumerate(fields[1:], 1):
+                if field.upper() in ('LEFT', 'RIGHT'):
+                    amplicon = '_'.join(fields[:i])
+                    side = field.upper()
+                    break
+            primers.append({'start' : int(data[1]) + 1,
+                            'end' : int(data[2]),
+                            'name' : name,
+                            'amplicon' : amplicon,
+                            'side' : side})
+    return primers
+
+
+def merge_intervals(intervals):
+    '''
+    Merge overlapping and adjacent 1-based inclusive intervals.
+
+    Arguments:
+        * intervals:    iterable of (start, end) tuples
+
+    Return Value:
+        Returns a tuple of the sorted lists of starts and ends of the merged
+        intervals
+    '''
+    starts = []
+    ends = []
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def get_amplicon_overlaps(amplicons):
+    '''
+    Return the regions covered by more than one amplicon.
+
+    Arguments:
+        * amplicons:    iterable of (start, end) tuples, 1-based inclusive
+
+    Return Value:
+        Returns a list of (start, end) tuples
+    '''
+    events = []
+    for start, end in amplicons:
+        events.append((start, 1))
+        events.append((end + 1, -1))
+    overlaps = []
+    depth = 0
+    overlap_start = None
+    # ends sort before starts at the same position
+    for position, change in sorted(events):
+        depth += change
+        if depth > 1 and overlap_start is None:
+            overlap_start = position
+        elif depth <= 1 and overlap_start is not None:
+            overlaps.append((overlap_start, position - 1))
+            overlap_start = None
+    return overlaps
+
+
+class PrimerIndex:
+    '''
+    Sorted interval arrays of the primer sites and amplicon overlap zones of
+    a primer scheme.
+
+    Arguments:
+        * primers:  list of primers as returned by read_primer_scheme()
+    '''
+    __slots__ = ('primer_starts', 'primer_ends', 'overlap_starts',
+                 'overlap_ends')
+
+    def __init__(self, primers):
+        self.primer_starts, self.primer_ends = \
+            merge_intervals((primer['start'], primer['end']) for primer in primers)
+        amplicons = {}
+        for primer in primers:
+            if primer['amplicon'] is None:
+                continue
+            start, end = amplicons.get(primer['amplicon'],
+                                       (primer['start'], primer['end']))
+            amplicons[primer['amplicon']] = (min(start, primer['start']),
+                                             max(end, primer['end']))
+        self.overlap_starts, self.overlap_ends = \
+            merge_intervals(get_amplicon_overlaps(amplicons.values()))
+
+    def in_primer_site(self, position):
+        '''
+        Return True when a position is inside a primer binding site.
+        '''
+        i = bisect_right(self.primer_starts, position) - 1
+        return i >= 0 and position <= self.primer_ends[i]
+
+    def in_amplicon_overlap(self, position):
+        '''
+        Return True when a position is covered by more than one amplicon.
+        '''
+        i = bisect_right(self.overlap_starts, position) - 1
+        return i >= 0 and position <= self.overlap_ends[i]
+
+
+def load_primer_index(file):
+    '''
+    Return the PrimerIndex of a primer scheme BED file, the index is cached
+    until the file changes.
+
+    Arguments:
+        * file: full path to the primer scheme BED file
+
+    Return Value:
+        Returns a PrimerIndex object
+    '''
+    key = get_file_key(file)
+    index = _PRIMER_CACHE.get(key)
+    if index is None:
+        index = PrimerIndex(read_primer_scheme(file))
+        _PRIMER_CACHE[key] = index
+    return index
+
+
+def clear_primer_cache():
+    '''
+    Remove all entries from the in-process primer index cache.
+    '''
+    _PRIMER_CACHE.clear()
@@ -4,11 +4,21 @@ generated file contains a header line and a data line with pre-defined columns.
 '''
 
 import re
-import statistics
-import glob
 import csv
-from Bio import SeqIO
-
+import os
+import time
+from ncov.parser.fileio import count_io, open_input, strip_compressed_suffix
+from ncov.parser.coverage import get_coverage_stats_histogram, \
+    get_coverage_stats_numpy, get_coverage_breadth, AmpliconDepth, \
+    GenomeCoverage, add_coverage_rows
+from ncov.parser.reference import get_reference_info
+from ncov.parser.mask import compile_mask
+from ncov.parser.primer import load_primer_index
+from ncov.parser.metadata import get_sample_metadata
+from ncov.parser.metrics import create_stage_record
+from ncov.parser.fasta import count_fasta_composition, get_record_lengths, \
+    count_bases, get_fasta_record, get_fasta_record_length, IUPAC_CODES
+from ncov.parser.summary import QCSummary, QC_SUMMARY_COLUMNS, format_value
 
 def get_qc_data(file):
     '''
@@ -21,7 +31,7 @@ def get_qc_data(file):
     Return Value:
         * dict: returns a dictionary with keys "sample_name", "pct_covered_bases", "qc_pass"
     '''
-    with open(file) as file_p:
+    with open_input(file) as file_p:
         qc_reader = csv.DictReader(file_p, delimiter=',')
         for line in qc_reader:
             sample_name = line['sample_name']
@@ -36,7 +46,7 @@ def get_qc_data(file):
 
 
 def get_total_variants(file, reference, mask_start=100, mask_end=50,
-                       indel=False):
+                       indel=False, mask_files=None, primer_scheme=None):
     '''
     A function that parses the iVar variants file and returns the total number
     of variants.
@@ -48,6 +58,10 @@ def get_total_variants(file, reference, mask_start=100, mask_end=50,
         * mask_start:   bases to mask at beginning of genome (default: 100)
         * mask_end:     bases to mask at end of genome (default: 50)
         * indel:        a boolean to determine whether to process indels
+        * mask_files:   list of BED or VCF files of additional positions to
+                        mask, see ncov.parser.mask (default: None)
+        * primer_scheme:    full path to the primer scheme BED file, see
+                            ncov.parser.primer (default: None)
 
     Returns:
         Function returns a dictionary containing the following keys:
@@ -56,59 +70,146 @@ def get_total_variants(file, reference, mask_start=100, mask_end=50,
             * total_indel:          total number of indel variants in the file
             * total_snv_masked:     total number of masked SNVs
             * total_indel_masked:   total number of masked indels
+            * total_indel_triplet:  total number of indels with a length
+                                    divisible by 3
+            * total_variant_n:      total number of variants with an N
+            * total_variant_iupac:  total number of variants with an IUPAC
+                                    code
             * genome_length:        length of genome sequence in FASTA file
+            * masked_by_source:     dictionary keyed by mask source ('ends'
+                                    and the mask file names) of the number
+                                    of masked SNVs and indels, a variant can
+                                    be masked by more than one source
+            * total_variant_primer_site:        total number of variants in a
+                                                primer binding site, only
+                                                with a primer scheme
+            * total_variant_amplicon_overlap:   total number of variants in
+                                                an amplicon overlap zone,
+                                                only with a primer scheme
     '''
     counter = 0
     counter_snv = 0
     counter_indel = 0
     counter_snv_masked = 0
     counter_indel_masked = 0
-    genome_length = 0
     counter_indel_triplet = 0
+    counter_n = 0
+    counter_iupac = 0
     try:
-        for record in SeqIO.parse(reference, 'fasta'):
-            genome_length = len(str(record.seq))
+        genome_length = get_reference_info(reference=reference,
+                                           mask_start=mask_start,
+                                           mask_end=mask_end)['genome_length']
     except:
         genome_length = 0
-    with open(file) as file_p:
-        variant_reader = csv.DictReader(file_p, delimiter='\t')
-        for data in variant_reader:
-            base_masked = is_base_masked(pos=int(data['POS']),
-                                         end=genome_length,
-                                         mask_start=mask_start,
-                                         mask_end=mask_end)
-            if indel:
-                if len(str(data['ALT'])) > 1:
-                    counter += 1
-                    counter_indel += 1
-                    if is_indel_triplet(data['ALT']):
-                        counter_indel_triplet += 1
-                    if genome_length > 0:
-                        if base_masked:
-                            counter_indel_masked += 1
-                elif len(str(data['ALT'])) == 1:
-                    counter += 1
-                    counter_snv += 1
-                    if genome_length > 0:
-                        if base_masked:
-                            counter_snv_masked += 1
-            elif not indel:
-                if len(str(data['ALT'])) == 1:
-                    counter += 1
-                    counter_snv += 1
-                    if genome_length > 0:
-                        if base_masked:
-                            counter_snv_masked += 1
-                else:
-                    continue
-    file_p.close()
-    return {'total_variants' : counter,
-            'total_snv' : counter_snv,
-            'total_indel' : counter_indel,
-            'total_snv_masked' : counter_snv_masked,
-            'total_indel_masked' : counter_indel_masked,
-            'total_indel_triplet' : counter_indel_triplet,
-            'genome_length' : genome_length}
+        reference = None
+    # the ends are only masked when the genome length is known
+    mask = compile_mask(reference=reference if genome_length > 0 else None,
+                        mask_start=mask_start, mask_end=mask_end,
+                        mask_files=mask_files or ())
+    mask_bits = mask.bits
+    mask_length = mask.length
+    mask_outside = mask.outside
+    # number of masked variants for each combination of mask sources
+    masked_snv = {}
+    masked_indel = {}
+    counter_primer_site = 0
+    counter_amplicon_overlap = 0
+    primers = None
+    if primer_scheme is not None:
+        from bisect import bisect_right
+        primers = load_primer_index(primer_scheme)
+        primer_starts = primers.primer_starts
+        primer_ends = primers.primer_ends
+        overlap_starts = primers.overlap_starts
+        overlap_ends = primers.overlap_ends
+    iupac_codes = frozenset('RYSWKMBDHV')
+    with open_input(file) as file_p:
+        header = file_p.readline().rstrip('\r\n').split('\t')
+        if 'POS' in header and 'ALT' in header:
+            pos_index = header.index('POS')
+            alt_index = header.index('ALT')
+            lines = file_p
+        else:
+            # an empty file or one without the columns has no variants
+            pos_index = alt_index = 0
+            lines = ()
+        max_split = max(pos_index, alt_index) + 1
+        for line in lines:
+            data = line.rstrip('\r\n').split('\t', max_split)
+            if len(data) < max_split:
+                continue
+            alt = data[alt_index]
+            alt_length = len(alt)
+            if alt_length == 1:
+                counter_snv += 1
+                pos = int(data[pos_index])
+                bits = mask_bits[pos] if 0 < pos <= mask_length else mask_outside
+                if bits:
+                    counter_snv_masked += 1
+                    masked_snv[bits] = masked_snv.get(bits, 0) + 1
+            elif alt_length > 1 and indel:
+                counter_indel += 1
+                pos = int(data[pos_index])
+                bits = mask_bits[pos] if 0 < pos <= mask_length else mask_outside
+                if bits:
+                    counter_indel_masked += 1
+                    masked_indel[bits] = masked_indel.get(bits, 0) + 1
+                # ignore the leading +/- when checking for a triplet
+                if alt[0] in '+-':
+                    alt_length -= 1
+                if alt_length > 0 and not alt_length % 3:
+                    counter_indel_triplet += 1
+            else:
+                continue
+            counter += 1
+            if primers is not None:
+                i = bisect_right(primer_starts, pos) - 1
+                if i >= 0 and pos <= primer_ends[i]:
+                    counter_primer_site += 1
+                i = bisect_right(overlap_starts, pos) - 1
+                if i >= 0 and pos <= overlap_ends[i]:
+                    counter_amplicon_overlap += 1
+            alt = alt.upper()
+            if 'N' in alt:
+                counter_n += 1
+            if not iupac_codes.isdisjoint(alt):
+                counter_iupac += 1
+    variants = {'total_variants' : counter,
+                'total_snv' : counter_snv,
+                'total_indel' : counter_indel,
+                'total_snv_masked' : counter_snv_masked,
+                'total_indel_masked' : counter_indel_masked,
+                'total_indel_triplet' : counter_indel_triplet,
+                'total_variant_n' : counter_n,
+                'total_variant_iupac' : counter_iupac,
+                'genome_length' : genome_length,
+                'masked_by_source' : get_masked_by_source(mask, masked_snv,
+                                                          masked_indel)}
+    if primers is not None:
+        variants['total_variant_primer_site'] = counter_primer_site
+        variants['total_variant_amplicon_overlap'] = counter_amplicon_overlap
+    return variants
+
+
+def get_masked_by_source(mask, masked_snv, masked_indel):
+    '''
+    Return the number of masked SNVs and indels for each mask source.
+
+    Arguments:
+        * mask:         the PositionMask used to classify the variants
+        * masked_snv:   dictionary of mask bits to the number of SNVs
+        * masked_indel: dictionary of mask bits to the number of indels
+
+    Return Value:
+        Returns a dictionary keyed by source name, each value is a dictionary
+        with the keys snv and indel
+    '''
+    masked = {source : {'snv' : 0, 'indel' : 0} for source in mask.sources}
+    for variant_type, counts in [('snv', masked_snv), ('indel', masked_indel)]:
+        for bits, count in counts.items():
+            for source in mask.get_sources(bits):
+                masked[source][variant_type] += count
+    return masked
 
 
 def import_metadata(file, sample_id='sample', ct_id='ct', date_id='date',
@@ -130,7 +231,7 @@ def import_metadata(file, sample_id='sample', ct_id='ct', date_id='date',
         Returns a dictionary containing metadata
     '''
     try:
-        with open(file) as file_p:
+        with open_input(file) as file_p:
             data = {}
             meta_reader = csv.DictReader(file_p, delimiter=delimiter)
             for line in meta_reader:
@@ -157,7 +258,7 @@ def import_ct_data(file, sample_id='sample', ct_id='ct', delimiter='\t'):
         The function returns a dictionary with {"sample" : "ct"}
     '''
     try:
-        with open(file) as file_p:
+        with open_input(file) as file_p:
             data = {}
             ct_reader = csv.DictReader(file_p, delimiter=delimiter)
             for line in ct_reader:
@@ -197,47 +298,57 @@ def is_variant_iupac(variant):
     return re.search(iupac_codes, variant)
 
 
-def count_iupac_in_fasta(fasta):
+def count_iupac_in_fasta(fasta, record=None):
     '''
     Count the number of IUPAC occurrences, not including [Nn], in the consensus
-    FASTA file.
+    FASTA file.  Counts are summed across all records in the file unless a
+    record is given.
 
     Arguments:
         * fasta:    FASTA reference file
+        * record:   name of the record to count, for example the sample in a
+                    multi-FASTA file of a run, read through the .fai index
+                    (default: None)
 
     Return Value:
         The function returns an integer representing the number of IUPAC code
         occurrences in the FASTA file.  Note that Ns were not considered.
     '''
-    iupac_codes = '[RYSWKMBDHV]'
     try:
-        for record in SeqIO.parse(fasta, 'fasta'):
-            iupac_count = re.subn(iupac_codes, repl='', string=str(record.seq))[1]
-            n_count = re.subn('[Nn]', repl='', string=str(record.seq))[1]
-            consensus_length = len(str(record.seq))
-        return {'total_n' : n_count,
-                'total_iupac' : iupac_count,
-                'consensus_length' : consensus_length}
+        if record is not None:
+            total = count_bases(get_fasta_record(fasta, record))
+        else:
+            composition = count_fasta_composition(fasta)
+            if not composition['records']:
+                raise ValueError('no records found in %s' % fasta)
+            total = composition['total']
+        return {'total_n' : total['N'] + total['n'],
+                'total_iupac' : sum(total[base] for base in IUPAC_CODES),
+                'consensus_length' : total['length']}
     except:
         return {'total_n' : 'NA',
                 'total_iupac' : 'NA',
                 'consensus_length' : 'NA'}
 
 
-def get_fasta_sequence_length(fasta):
+def get_fasta_sequence_length(fasta, record=None):
     '''
     Return the length of the genome in the FASTA sequence file.
 
     Arguments:
-        * fasta: full path to the FASTA reference genome file
+        * fasta:    full path to the FASTA reference genome file
+        * record:   name of the record, read from the .fai index, the last
+                    record is used when not given (default: None)
 
     Return Value:
         Returns an integer representing the lenght of the reference genome
         from the FASTA file.
     '''
     try:
-        for record in SeqIO.parse(fasta, 'fasta'):
-            seq_length = len(record.seq)
+        if record is not None:
+            seq_length = get_fasta_record_length(fasta, record)
+        else:
+            seq_length = get_record_lengths(fasta)[-1][1]
         return {'genome_length' : seq_length}
     except:
         return {'genome_length' : 'NA'}
@@ -294,34 +405,90 @@ def is_indel_triplet(variant, size=3):
         return not len(variant) % size
 
 
-def get_coverage_stats(file):
+def get_coverage_stats(file, backend=None, amplicons=False,
+                       min_amplicon_depth=20, low_coverage_depth=20):
     '''
     A function to calculate the depth of coverage across the genome from the
     bedtools <sample>.per_base_coverage.bed file.
 
     Arguments:
-        * file: a string containing the filename and path to the
-                <sample>.per_sample_coverage.bed file
+        * file:     a string containing the filename and path to the
+                    <sample>.per_sample_coverage.bed file
+        * backend:  method used to calculate the statistics, one of 'list'
+                    (hold all depth values in a list), 'histogram' (stream
+                    the depth values into a histogram) or 'numpy' (load the
+                    depth values into a NumPy array, falls back to 'list' when
+                    NumPy is not installed) (default: the
+                    NCOV_PARSER_COVERAGE_BACKEND environment variable,
+                    otherwise 'list')
+        * amplicons:    also calculate the depth of each amplicon and pool
+                        from the amplicon_id and pool columns in the same
+                        pass (default: False)
+        * min_amplicon_depth:   amplicons with a lower mean depth are counted
+                                as low depth (default: 20)
+        * low_coverage_depth:   contiguous positions with a lower depth are
+                                reported as low coverage regions (default: 20)
 
     Return Value:
         Function returns a dictionary with the following keys:
             * mean_depth
             * median_depth
-    '''
+            * pct_depth_1x, pct_depth_10x, pct_depth_20x, pct_depth_100x:
+              percentage of genome positions with at least the given depth,
+              a position in overlapping amplicons is counted once with its
+              largest depth
+            * low_coverage_regions: the low coverage regions as start-end
+              genome positions separated by ';'
+            * total_low_coverage_regions
+            * amplicon_depth (only when amplicons is True), a dictionary with
+              the keys amplicons and pools, see
+              ncov.parser.coverage.get_amplicon_stats()
+    '''
+    if backend is None:
+        backend = os.environ.get('NCOV_PARSER_COVERAGE_BACKEND', 'list')
+    if backend == 'numpy':
+        try:
+            return get_coverage_stats_numpy(file=file, amplicons=amplicons,
+                                            min_amplicon_depth=min_amplicon_depth,
+                                            low_coverage_depth=low_coverage_depth)
+        except ImportError:
+            backend = 'list'
+    if backend == 'histogram':
+        return get_coverage_stats_histogram(file=file, amplicons=amplicons,
+                                            min_amplicon_depth=min_amplicon_depth,
+                                            low_coverage_depth=low_coverage_depth)
+    elif backend != 'list':
+        raise ValueError('unknown coverage backend: %s' % backend)
+    # statistics is slow to import and only needed by this backend
+    import statistics
     depth = []
-    with open(file) as file_p:
+    amplicon_depth = AmpliconDepth() if amplicons else None
+    coverage = GenomeCoverage(min_depth=low_coverage_depth)
+    with open_input(file) as file_p:
         cov_reader = csv.DictReader(file_p, delimiter='\t')
-        for data in cov_reader:
-            depth.append(int(data['depth']))
+        for value, data in add_coverage_rows(coverage, cov_reader, 'start',
+                                             'position', 'depth'):
+            depth.append(value)
+            if amplicon_depth is not None:
+                amplicon_depth.add(data['amplicon_id'], data['pool'], value)
     file_p.close()
     mean_depth = round(statistics.mean(depth), 1)
+    depth.sort()
     median_depth = round(statistics.median(depth), 1)
-    return {"mean_depth" : mean_depth, "median_depth" : median_depth}
+    stats = {"mean_depth" : mean_depth, "median_depth" : median_depth}
+    stats.update(get_coverage_breadth(coverage.counts, coverage.total,
+                                      coverage.regions))
+    if amplicon_depth is not None:
+        stats['amplicon_depth'] = amplicon_depth.get_stats(min_amplicon_depth)
+    return stats
 
 
 def create_qc_summary_line(var_file, qc_file, cov_file, meta_file=None,
                            indel=True, fasta=None, mask_start=100,
-                           mask_end=50, reference=None):
+                           mask_end=50, reference=None, meta_index=None,
+                           metrics=None, amplicons=False,
+                           min_amplicon_depth=20, mask_files=None,
+                           primer_scheme=None, fasta_record=None, cache=None):
     '''
     A function that aggregates the different QC data into a single sample
     dictionary entry.
@@ -335,9 +502,32 @@ def create_qc_summary_line(var_file, qc_file, cov_file, meta_file=None,
         * reference:    full path to the reference FASTA genome file
         * indel:        boolean to determine whether to use indels in variant
                         count (default: True)
+        * meta_index:   None to use an up to date SQLite index of the metadata
+                        file when one exists, True to build the index, False
+                        to always read the metadata file (default: None)
+        * metrics:      a callback receiving a dictionary with the keys
+                        sample, stage, seconds, bytes_read and rows for each
+                        stage, see ncov.parser.metrics (default: None)
+        * amplicons:    add the per amplicon and per pool depth to the
+                        summary under the key amplicon_depth, see
+                        get_coverage_stats() (default: False)
+        * min_amplicon_depth:   see get_coverage_stats() (default: 20)
+        * mask_files:   list of BED or VCF files of additional positions to
+                        mask, see get_total_variants() (default: None)
+        * primer_scheme:    full path to the primer scheme BED file to count
+                            the variants in primer sites and amplicon overlap
+                            zones, see get_total_variants() (default: None)
+        * fasta_record: name of the sample record when fasta is a multi-FASTA
+                        file of a run, see count_iupac_in_fasta()
+                        (default: None)
+        * cache:        a ncov.parser.cache.ResultCache to reuse the results
+                        of stages whose input files and parameters are
+                        unchanged (default: None)
 
     Return Value:
-        Return an aggregate dictionary containing the following keys:
+        Return a QCSummary record with typed values for the columns in
+        QC_SUMMARY_COLUMNS, missing values are None.  The record can be used
+        as a dictionary containing the following keys:
             * total_variants
             * total_snv
             * total_indel
@@ -352,30 +542,80 @@ def create_qc_summary_line(var_file, qc_file, cov_file, meta_file=None,
             * ct
             * date
             * qc_pass
+            * the breadth of coverage columns
+            * total_variant_primer_site
+            * total_variant_amplicon_overlap
+    '''
+    summary = QCSummary()
+    stages = [('variants', [var_file, reference, primer_scheme] +
+               list(mask_files or ()),
+               {'indel' : indel, 'mask_start' : mask_start, 'mask_end' : mask_end},
+               lambda: get_total_variants(file=var_file,
+                                          indel=indel,
+                                          reference=reference,
+                                          mask_start=mask_start,
+                                          mask_end=mask_end,
+                                          mask_files=mask_files,
+                                          primer_scheme=primer_scheme)),
+              ('qc', [qc_file], {}, lambda: get_qc_data(file=qc_file)),
+              ('coverage', [cov_file],
+               {'amplicons' : amplicons, 'min_amplicon_depth' : min_amplicon_depth},
+               lambda: get_coverage_stats(file=cov_file, amplicons=amplicons,
+                                          min_amplicon_depth=min_amplicon_depth)),
+              ('fasta', [fasta], {'record' : fasta_record},
+               lambda: count_iupac_in_fasta(fasta=fasta, record=fasta_record)),
+              # the sample name is only known once the qc stage has run
+              ('metadata', [meta_file],
+               lambda: {'sample' : summary['sample_name'], 'index' : meta_index},
+               lambda: get_summary_metadata(file=meta_file,
+                                            sample=summary['sample_name'],
+                                            index=meta_index))]
+    def run_stage(name, files, params, stage):
+        if cache is None:
+            return stage()
+        if callable(params):
+            params = params()
+        return cache.get_or_compute(name, files, params, stage)
+    if metrics is None:
+        for stage in stages:
+            summary.update(run_stage(*stage))
+        return summary
+    records = []
+    for name, files, params, stage in stages:
+        start = time.perf_counter()
+        with count_io() as counter:
+            summary.update(run_stage(name, files, params, stage))
+        records.append(create_stage_record(stage=name,
+                                           seconds=time.perf_counter() - start,
+                                           counter=counter))
+    # the sample name is only known once the qc stage has run
+    for record in records:
+        record['sample'] = summary['sample_name']
+        metrics(record)
+    return summary
+
+
+def get_summary_metadata(file, sample, index=None):
+    '''
+    Return the ct and collection date of a sample from the metadata file,
+    missing values are 'NA'.
+
+    Arguments:
+        * file:     full path to the 'metadata.tsv' file
+        * sample:   name of the sample
+        * index:    see get_sample_metadata() (default: None)
+
+    Return Value:
+        Returns a dictionary with the keys ct and date
     '''
-    summary = {}
-    summary.update(get_total_variants(file=var_file,
-                                      indel=indel,
-                                      reference=reference,
-                                      mask_start=mask_start,
-                                      mask_end=mask_end))
-    summary.update(get_qc_data(file=qc_file))
-    summary.update(get_coverage_stats(file=cov_file))
-    summary.update(count_iupac_in_fasta(fasta=fasta))
-
-    # import the ct and collection date from the metadata file
     try:
-        #meta_data = import_ct_data(file=meta_file)
-        meta_data = import_metadata(file=meta_file)
-        summary['ct'] = meta_data[summary['sample_name']]['ct']
-        summary['date'] = meta_data[summary['sample_name']]['date']
+        meta_data = get_sample_metadata(file=file, sample=sample, index=index)
+        return {'ct' : meta_data['ct'], 'date' : meta_data['date']}
     except:
-        summary['ct'] = 'NA'
-        summary['date'] = 'NA'
-    return summary
+        return {'ct' : 'NA', 'date' : 'NA'}
 
 
-def write_qc_summary(summary):
+def write_qc_summary(summary, file_p=None):
     '''
     A function to write the QC data line to output in the order:
     * sample name
@@ -393,65 +633,112 @@ def write_qc_summary(summary):
     * cycle threshold
     * collection date
     * iVar QC pass
+    * % bases with a depth of at least 1x, 10x, 20x and 100x
+    * low coverage regions
+    * total low coverage regions
+    * total variants in primer sites
+    * total variants in amplicon overlap zones
 
     Arguments:
         * summary:  dictionary containing the keys sample_name, pct_n_bases,
                     pct_covered_bases, total_variants, total_snv, total_indel,
                     total_n, total_iupac, mean_depth, median_depth, ct, date,
-                    qc_pass
+                    qc_pass and the breadth of coverage columns, missing
+                    columns are written as 'NA'
+        * file_p:   open file handle to write to (default: stdout)
 
     Return Value:
         None
     '''
-    summary_line = '\t'.join([
-        summary['sample_name'],
-        str(summary['pct_n_bases']),
-        str(summary['pct_covered_bases']),
-        str(summary['total_variants']),
-        str(summary['total_snv']),
-        str(summary['total_snv_masked']),
-        str(summary['total_indel']),
-        str(summary['total_indel_masked']),
-        str(summary['total_indel_triplet']),
-        str(summary['total_n']),
-        str(summary['total_iupac']),
-        str(summary['mean_depth']),
-        str(summary['median_depth']),
-        str(summary['ct']),
-        str(summary['date']),
-        str(summary['qc_pass'])])
-    print(summary_line)
-
-
-def write_qc_summary_header(header=['sample_name',
-                                    'pct_n_bases',
-                                    'pct_covered_bases',
-                                    'total_variants',
-                                    'total_snv',
-                                    'total_snv_masked',
-                                    'total_indel',
-                                    'total_indel_masked',
-                                    'total_indel_triplet',
-                                    'total_n',
-                                    'total_iupac',
-                                    'mean_depth',
-                                    'median_depth',
-                                    'ct',
-                                    'date',
-                                    'qc_pass']):
+    if isinstance(summary, QCSummary):
+        summary_line = '\t'.join(summary.to_row())
+    else:
+        summary_line = '\t'.join([format_value(summary.get(column))
+                                  for column in QC_SUMMARY_COLUMNS])
+    print(summary_line, file=file_p)
+
+
+def write_qc_summary_header(header=QC_SUMMARY_COLUMNS,
+                            file_p=None):
     '''
     Write the header for the QC summary data
 
     Arguments:
         * header: a list containing the column header
+        * file_p: open file handle to write to (default: stdout)
 
     Return Value:
         None
     '''
-    print('\t'.join(header))
+    print('\t'.join(header), file=file_p)
+
 
+def _iter_files(path, pattern):
+    '''
+    A generator returning the files in path matching "*" + pattern, with or
+    without a .gz or .bgz suffix, in name order so the output is the same on
+    every run.  Only the matching names are held in memory, not the files.
+    '''
+    from fnmatch import fnmatch
+    with os.scandir(path) as entries:
+        names = [entry.name for entry in entries
+                 if not entry.name.startswith('.') and
+                 fnmatch(strip_compressed_suffix(entry.name), '*' + pattern)]
+    for name in sorted(names):
+        yield os.path.join(path, name)
+
+
+def _read_qc_summary_lines(file):
+    '''
+    Return the data lines of a sample summary file, only the first line is
+    checked for the header.
+    '''
+    with open_input(file) as file_p:
+        lines = [line.rstrip() for line in file_p]
+    if lines and lines[0].startswith('sample_name\t'):
+        del lines[0]
+    return lines
 
-def collect_qc_summary_data(path, pattern='.summary.qc.tsv'):
+
+def iter_qc_summary_data(path, pattern='.summary.qc.tsv', threads=None):
+    '''
+    A generator to stream the individual sample based QC summary data.  Only a
+    single file, or a bounded number of files when using threads, is held in
+    memory at any time.
+
+    Arguments:
+        * path:     full path to the <sample>.summary.qc.tsv files
+        * pattern:  file pattern for the sample files (default: .summary.qc.tsv)
+        * threads:  number of threads used to read files concurrently, useful
+                    on slow shared filesystems (default: None, read files
+                    sequentially)
+
+    Return Value:
+        Yields each summary line without the trailing newline
+    '''
+    files = _iter_files(path, pattern)
+    if not threads:
+        for file in files:
+            with open_input(file) as file_p:
+                line = file_p.readline()
+                if line and not line.startswith('sample_name\t'):
+                    yield line.rstrip()
+                for line in file_p:
+                    yield line.rstrip()
+        return
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+        for file in files:
+            pending.append(executor.submit(_read_qc_summary_lines, file))
+            if len(pending) >= 2 * threads:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def collect_qc_summary_data(path, pattern='.summary.qc.tsv', threads=None):
     '''
     An aggregation function to collect individual sample based QC summary data
     and create a single file with all samples.
@@ -459,17 +746,11 @@ def collect_qc_summary_data(path, pattern='.summary.qc.tsv'):
     Arguments:
         * path:     full path to the <sample>.summary.qc.tsv files
         * pattern:  file pattern for the sample files (default: .summary.qc.tsv)
+        * threads:  number of threads used to read files concurrently
+                    (default: None, read files sequentially)
 
     Return Value:
         data: a list containing the summary line data
     '''
-    files = glob.glob(path + "/*" + pattern)
-    data = []
-    for file in files:
-        with open(file) as file_p:
-            for line in file_p:
-                # skip the header
-                if re.match("^sample_name\tpct_n_bases\tpct_covered_bases", line):
-                    continue
-                data.append(line.rstrip())
-    return data
+    return list(iter_qc_summary_data(path=path, pattern=pattern,
+                                     threads=threads))
@@ -0,0 +1,127 @@
+'''
+A cache of reference genome information.  The reference FASTA is the same for
+every sample in a run, so it is parsed once per process and optionally stored
+in a JSON sidecar file that is reused by later processes.  Entries are keyed
+by the path, size and modification time of the reference file.
+'''
+
+import json
+import os
+from ncov.parser.fasta import get_record_lengths
+from ncov.parser.fileio import get_file_key
+
+_REFERENCE_CACHE = {}
+
+
+def get_mask_boundaries(genome_length, mask_start=100, mask_end=50, start=1):
+    '''
+    Return the first and last unmasked positions of the genome, positions
+    outside this window are masked by is_base_masked().
+
+    Arguments:
+        * genome_length:    length of the genome
+        * mask_start:       bases to mask at beginning of genome (default: 100)
+        * mask_end:         bases to mask at end of genome (default: 50)
+        * start:            start position of the genome (default: 1)
+
+    Return Value:
+        Returns a tuple (first unmasked position, last unmasked position)
+    '''
+    return (int(start) + int(mask_start), int(genome_length) - int(mask_end))
+
+
+def _get_sidecar_file(key, cache_dir):
+    '''
+    Return the name of the sidecar file for a reference key.
+    '''
+    import hashlib
+    digest = hashlib.sha1(key[0].encode()).hexdigest()
+    return os.path.join(cache_dir, digest + '.reference.json')
+
+
+def _read_sidecar(key, cache_dir):
+    '''
+    Read a reference entry from the sidecar file, returns None when the file
+    does not exist or was created from a different version of the reference.
+    '''
+    try:
+        with open(_get_sidecar_file(key, cache_dir)) as file_p:
+            entry = json.load(file_p)
+    except (OSError, ValueError):
+        return None
+    if entry.get('key') != list(key):
+        return None
+    entry['record_lengths'] = [tuple(record) for record in entry['record_lengths']]
+    return entry
+
+
+def _write_sidecar(key, cache_dir, entry):
+    '''
+    Write a reference entry to the sidecar file, failures are ignored as the
+    sidecar is only an optimization.
+    '''
+    sidecar = _get_sidecar_file(key, cache_dir)
+    tmp_file = '%s.%d.tmp' % (sidecar, os.getpid())
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_file, 'w') as file_p:
+            json.dump(dict(entry, key=list(key)), file_p)
+        os.replace(tmp_file, sidecar)
+    except OSError:
+        pass
+
+
+def get_reference_info(reference, mask_start=100, mask_end=50, cache_dir=None):
+    '''
+    Return the genome length, record lengths and mask boundaries of a
+    reference FASTA file.  Results are cached in memory and, when a cache
+    directory is given, in a JSON sidecar file.  As with the previous
+    implementation of get_total_variants(), the genome length is the length of
+    the last record in the file.
+
+    Arguments:
+        * reference:    full path to the reference FASTA file
+        * mask_start:   bases to mask at beginning of genome (default: 100)
+        * mask_end:     bases to mask at end of genome (default: 50)
+        * cache_dir:    directory to store sidecar files (default: the
+                        NCOV_PARSER_REFERENCE_CACHE environment variable,
+                        otherwise no sidecar is used)
+
+    Return Value:
+        Returns a dictionary containing the following keys:
+            * genome_length:    length of the last record in the FASTA file
+            * record_lengths:   list of (name, length) tuples
+            * mask_boundaries:  tuple of the first and last unmasked positions
+    '''
+    if cache_dir is None:
+        cache_dir = os.environ.get('NCOV_PARSER_REFERENCE_CACHE')
+    key = get_file_key(reference)
+    entry = _REFERENCE_CACHE.get(key)
+    if entry is None:
+        if cache_dir:
+            entry = _read_sidecar(key, cache_dir)
+        if entry is None:
+            record_lengths = get_record_lengths(reference)
+            genome_length = record_lengths[-1][1] if record_lengths else 0
+            entry = {'genome_length' : genome_length,
+                     'record_lengths' : record_lengths,
+                     'mask_boundaries' : {}}
+        _REFERENCE_CACHE[key] = entry
+    mask_key = '%d,%d' % (int(mask_start), int(mask_end))
+    if mask_key not in entry['mask_boundaries']:
+        entry['mask_boundaries'][mask_key] = get_mask_boundaries(
+            genome_length=entry['genome_length'],
+            mask_start=mask_start,
+            mask_end=mask_end)
+        if cache_dir:
+            _write_sidecar(key, cache_dir, entry)
+    return {'genome_length' : entry['genome_length'],
+            'record_lengths' : entry['record_lengths'],
+            'mask_boundaries' : tuple(entry['mask_boundaries'][mask_key])}
+
+
+def clear_reference_cache():
+    '''
+    Remove all entries from the in-process reference cache.
+    '''
+    _REFERENCE_CACHE.clear()
@@ -0,0 +1,232 @@
+'''
+Run level processing of the ncov-tools output.  Rather than launching one
+interpreter per sample, all samples in a run are discovered from a directory
+and summarized from a single process using a pool of worker processes.
+'''
+
+import os
+import glob
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ncov.parser.qc import create_qc_summary_line, write_qc_summary, \
+    write_qc_summary_header
+from ncov.parser.metrics import MetricsCollector
+from ncov.parser.coverage import write_amplicon_depth, \
+    write_amplicon_depth_header
+from ncov.parser.fileio import find_input, strip_compressed_suffix, \
+    COMPRESSED_SUFFIXES
+from ncov.parser.shard import get_sample_name, is_sample_in_shard
+
+
+def find_sample_files(path, qc_dir=None, coverage_dir=None, fasta_dir=None,
+                      variants_pattern='.variants.tsv',
+                      qc_pattern='.qc.csv',
+                      coverage_pattern='.per_base_coverage.bed',
+                      fasta_patterns=('.primertrimmed.consensus.fa',
+                                      '.consensus.fa'),
+                      shard=None, require_qc=True):
+    '''
+    Find the set of files for each sample in a run.  Samples are identified
+    by the <sample>.variants.tsv files in the path, a sample is only returned
+    when both the <sample>.qc.csv and <sample>.per_base_coverage.bed files
+    exist unless require_qc is False.  The consensus FASTA file is optional.  Each file may also be gzip
+    or bgzip compressed with a .gz or .bgz suffix.
+
+    Arguments:
+        * path:             directory containing the <sample>.variants.tsv
+                            files
+        * qc_dir:           directory containing the <sample>.qc.csv files
+                            (default: path)
+        * coverage_dir:     directory containing the
+                            <sample>.per_base_coverage.bed files
+                            (default: path)
+        * fasta_dir:        directory containing the consensus FASTA files
+                            (default: path)
+        * variants_pattern: file suffix for the variants files
+        * qc_pattern:       file suffix for the QC files
+        * coverage_pattern: file suffix for the per base coverage files
+        * fasta_patterns:   file suffixes for the consensus FASTA files, in
+                            order of preference
+        * shard:            only return the samples of a shard, see
+                            parse_shard(), samples are assigned by the
+                            sample_name of their QC file (default: None, all
+                            samples)
+        * require_qc:       only return the samples with both the QC and per
+                            base coverage files, when False missing files are
+                            None (default: True)
+
+    Return Value:
+        Returns a dictionary keyed by the file name prefix of each sample in
+        the order of the sample_name of the QC files, as in the summary, each
+        value is a dictionary with the keys var_file, qc_file, cov_file and
+        fasta
+    '''
+    qc_dir = path if qc_dir is None else qc_dir
+    coverage_dir = path if coverage_dir is None else coverage_dir
+    fasta_dir = path if fasta_dir is None else fasta_dir
+    samples = {}
+    names = {}
+    var_files = [file for suffix in ('',) + COMPRESSED_SUFFIXES
+                 for file in glob.glob(os.path.join(path, '*' + variants_pattern + suffix))]
+    for var_file in sorted(var_files):
+        sample = os.path.basename(strip_compressed_suffix(var_file))[:-len(variants_pattern)]
+        if sample in samples:
+            continue
+        qc_file = find_input(os.path.join(qc_dir, sample + qc_pattern))
+        cov_file = find_input(os.path.join(coverage_dir, sample + coverage_pattern))
+        if require_qc and (qc_file is None or cov_file is None):
+            continue
+        name = sample if qc_file is None else get_sample_name(qc_file, sample)
+        if not is_sample_in_shard(name, shard):
+            continue
+        fasta = None
+        for fasta_pattern in fasta_patterns:
+            fasta = find_input(os.path.join(fasta_dir, sample + fasta_pattern))
+            if fasta is not None:
+                break
+        samples[sample] = {'var_file' : var_file,
+                           'qc_file' : qc_file,
+                           'cov_file' : cov_file,
+                           'fasta' : fasta}
+        names[sample] = name
+    return {sample : samples[sample] for sample in
+            sorted(samples, key=lambda sample: (names[sample], sample))}
+
+
+def _summarize_sample(sample_files, options, metrics=False):
+    '''
+    Worker function to create the QC summary for a single sample, this must
+    be defined at the module level to be passed to the process pool.  The
+    stage metrics and result cache statistics are collected in the worker and
+    returned with the summary so they can be passed to the parent process.
+    '''
+    cache = options.get('cache')
+    if not metrics:
+        summary = create_qc_summary_line(**sample_files, **options)
+        records = []
+    else:
+        collector = MetricsCollector()
+        summary = create_qc_summary_line(**sample_files, **options,
+                                         metrics=collector)
+        records = collector.records
+    return summary, records, None if cache is None else cache.pop_stats()
+
+
+def create_run_qc_summary(samples, file_p=None, meta_file=None, indel=True,
+                          mask_start=100, mask_end=50, reference=None,
+                          workers=None, writer=None, metrics=None,
+                          amplicon_file_p=None, min_amplicon_depth=20,
+                          mask_files=None, primer_scheme=None,
+                          consensus_fasta=None, cache=None, ordered=False):
+    '''
+    Create the QC summary for all samples in a run.  Samples are distributed
+    across a process pool and each summary line is written as soon as the
+    sample completes, so the rows are not in a fixed order unless ordered is
+    set.
+
+    Arguments:
+        * samples:      dictionary of sample files as returned by
+                        find_sample_files()
+        * file_p:       open file handle to write to (default: stdout)
+        * meta_file:    full path to the 'metadata.tsv' file
+        * indel:        boolean to determine whether to use indels in variant
+                        count (default: True)
+        * mask_start:   bases to mask at beginning of genome (default: 100)
+        * mask_end:     bases to mask at end of genome (default: 50)
+        * reference:    full path to the reference FASTA genome file
+        * workers:      number of worker processes, a value of 1 processes
+                        the samples in the current process
+                        (default: number of CPUs)
+        * writer:       a summary writer from
+                        ncov.parser.writer.get_summary_writer(), when given
+                        the summaries are written with the writer rather than
+                        to file_p and the writer is not closed
+        * metrics:      a callback receiving the stage metrics of each
+                        sample, see create_qc_summary_line() (default: None)
+        * amplicon_file_p:  open file handle to write the per amplicon and
+                            per pool depth table to (default: None)
+        * min_amplicon_depth:   amplicons with a lower mean depth are counted
+                                as low depth (default: 20)
+        * mask_files:   list of BED or VCF files of additional positions to
+                        mask (default: None)
+        * primer_scheme:    full path to the primer scheme BED file
+                            (default: None)
+        * consensus_fasta:  full path to a multi-FASTA file of the consensus
+                            sequences of all samples, each sample is read
+                            from the record named after the sample through
+                            the .fai index (default: None)
+        * cache:        a ncov.parser.cache.ResultCache, the hit and miss
+                        counts of the workers are added to it (default: None)
+        * ordered:      write the rows in the order of samples, completed
+                        samples are held until the samples before them are
+                        written, find_sample_files() returns the samples in
+                        sample_name order (default: False)
+
+    Return Value:
+        Returns the number of samples written
+    '''
+    options = {'meta_file' : meta_file,
+               'indel' : indel,
+               'mask_start' : mask_start,
+               'mask_end' : mask_end,
+               'reference' : reference,
+               'amplicons' : amplicon_file_p is not None,
+               'min_amplicon_depth' : min_amplicon_depth,
+               'mask_files' : mask_files,
+               'primer_scheme' : primer_scheme,
+               'cache' : cache}
+    if consensus_fasta is not None:
+        samples = {sample : dict(sample_files, fasta=consensus_fasta,
+                                 fasta_record=sample)
+                   for sample, sample_files in samples.items()}
+    if writer is None:
+        write_qc_summary_header(file_p=file_p)
+        write_summary = lambda summary: write_qc_summary(summary=summary,
+                                                         file_p=file_p)
+    else:
+        write_summary = writer.write
+    if amplicon_file_p is not None:
+        write_amplicon_depth_header(file_p=amplicon_file_p)
+    total = 0
+    if workers == 1:
+        for sample, sample_files in samples.items():
+            try:
+                summary, records, cache_stats = _summarize_sample(
+                    sample_files, options, metrics is not None)
+            except Exception as err:
+                print('Unable to process sample %s: %s' % (sample, err),
+                      file=sys.stderr)
+                continue
+            write_summary(summary)
+            if amplicon_file_p is not None:
+                write_amplicon_depth(sample=summary['sample_name'],
+                                     amplicon_depth=summary['amplicon_depth'],
+                                     file_p=amplicon_file_p)
+            for record in records:
+                metrics(record)
+            if cache_stats is not None:
+                cache.add_stats(cache_stats)
+            total += 1
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_summarize_sample, sample_files, options,
+                                   metrics is not None):
+                   sample for sample, sample_files in samples.items()}
+        for future in (futures if ordered else as_completed(futures)):
+            try:
+                summary, records, cache_stats = future.result()
+            except Exception as err:
+                print('Unable to process sample %s: %s' % (futures[future], err),
+                      file=sys.stderr)
+                continue
+            write_summary(summary)
+            if amplicon_file_p is not None:
+                write_amplicon_depth(sample=summary['sample_name'],
+                                     amplicon_depth=summary['amplicon_depth'],
+                                     file_p=amplicon_file_p)
+            for record in records:
+                metrics(record)
+            if cache_stats is not None:
+                cache.add_stats(cache_stats)
+            total += 1
+    return total
@@ -0,0 +1,239 @@
+'''
+Run level statistics over an aggregated QC summary.  The summary is loaded
+into typed NumPy columns with a single bulk read and all statistics are
+calculated vectorized, so runs of tens of thousands of samples can be
+summarized interactively.  Requires NumPy.
+'''
+
+from ncov.parser.writer import read_summary, MISSING_INT
+
+# columns reported in the run and date summaries
+STATS_COLUMNS = ['pct_n_bases',
+                 'pct_covered_bases',
+                 'total_variants',
+                 'total_n',
+                 'mean_depth',
+                 'median_depth',
+                 'ct',
+                 'pct_depth_20x']
+QUANTILES = [0, 0.25, 0.5, 0.75, 1]
+
+
+def load_run_summary(file):
+    '''
+    Load an aggregated QC summary into NumPy columns, see
+    ncov.parser.writer.read_summary().
+
+    Arguments:
+        * file: full path to the .tsv, .parquet or .npz summary file
+
+    Return Value:
+        Returns a dictionary of NumPy arrays keyed by column name
+    '''
+    return read_summary(file)
+
+
+def get_values(columns, column):
+    '''
+    Return a column as a float64 array with missing values as NaN.
+
+    Arguments:
+        * columns:  dictionary of NumPy arrays from load_run_summary()
+        * column:   name of the column
+
+    Return Value:
+        Returns a NumPy float64 array
+    '''
+    import numpy as np
+    values = columns[column]
+    if values.dtype.kind in 'iu':
+        return np.where(values == MISSING_INT, np.nan, values).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def get_distribution(values):
+    '''
+    Return the number of values, mean and quantiles of an array, missing
+    values are ignored.
+
+    Arguments:
+        * values:   NumPy float64 array
+
+    Return Value:
+        Returns a dictionary with the keys n, mean, min, q25, median, q75 and
+        max, statistics are None when there are no values
+    '''
+    import numpy as np
+    values = values[~np.isnan(values)]
+    names = ['min', 'q25', 'median', 'q75', 'max']
+    if not values.size:
+        return dict({'n' : 0, 'mean' : None}, **dict.fromkeys(names))
+    quantiles = np.quantile(values, QUANTILES)
+    return dict({'n' : int(values.size), 'mean' : float(values.mean())},
+                **{name : float(value) for name, value in zip(names, quantiles)})
+
+
+def get_outliers(values, k=1.5):
+    '''
+    Flag outliers using Tukey's fences, values more than k times the
+    interquartile range below the first or above the third quartile.
+
+    Arguments:
+        * values:   NumPy float64 array, missing values are never outliers
+        * k:        multiple of the interquartile range (default: 1.5)
+
+    Return Value:
+        Returns a NumPy boolean array
+    '''
+    import numpy as np
+    present = ~np.isnan(values)
+    if not present.any():
+        return np.zeros(values.shape, dtype=bool)
+    q25, q75 = np.quantile(values[present], [0.25, 0.75])
+    fence = k * (q75 - q25)
+    return present & ((values < q25 - fence) | (values > q75 + fence))
+
+
+def get_rank(values):
+    '''
+    Return the ranks of an array with ties given their average rank.
+    '''
+    import numpy as np
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    # first index of each run of equal values
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    counts = np.diff(np.append(starts, values.size))
+    average = starts + (counts - 1) / 2
+    ranks = np.empty(values.size, dtype=np.float64)
+    ranks[order] = np.repeat(average, counts)
+    return ranks
+
+
+def get_correlation(x, y):
+    '''
+    Return the Pearson and Spearman correlation of two columns over the
+    samples where both values are present.
+
+    Arguments:
+        * x:    NumPy float64 array
+        * y:    NumPy float64 array
+
+    Return Value:
+        Returns a dictionary with the keys n, pearson and spearman, the
+        correlations are None with fewer than 3 samples or a constant column
+    '''
+    import numpy as np
+    present = ~np.isnan(x) & ~np.isnan(y)
+    x = x[present]
+    y = y[present]
+    correlation = {'n' : int(x.size), 'pearson' : None, 'spearman' : None}
+    if x.size < 3 or x.std() == 0 or y.std() == 0:
+        return correlation
+    correlation['pearson'] = float(np.corrcoef(x, y)[0, 1])
+    correlation['spearman'] = float(np.corrcoef(get_rank(x), get_rank(y))[0, 1])
+    return correlation
+
+
+def get_group_medians(groups, values, total):
+    '''
+    Return the median of the values in each group using a single sort,
+    missing values are ignored.
+
+    Arguments:
+        * groups:   NumPy integer array of group numbers
+        * values:   NumPy float64 array
+        * total:    number of groups
+
+    Return Value:
+        Returns a NumPy float64 array with NaN for groups without values
+    '''
+    import numpy as np
+    present = ~np.isnan(values)
+    groups = groups[present]
+    values = values[present]
+    order = np.lexsort((values, groups))
+    groups = groups[order]
+    values = values[order]
+    counts = np.bincount(groups, minlength=total)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(total, np.nan)
+    has_values = counts > 0
+    lower = values[(starts + (counts - 1) // 2)[has_values]]
+    upper = values[(starts + counts // 2)[has_values]]
+    medians[has_values] = (lower + upper) / 2
+    return medians
+
+
+def get_run_stats(columns, k=1.5):
+    '''
+    Calculate the run level statistics.
+
+    Arguments:
+        * columns:  dictionary of NumPy arrays from load_run_summary()
+        * k:        multiple of the interquartile range for outliers
+                    (default: 1.5)
+
+    Return Value:
+        Returns a dictionary with the keys:
+            * samples:      number of samples
+            * qc_pass:      number of samples with qc_pass TRUE
+            * pass_rate:    fraction of samples passing QC
+            * columns:      the distribution of each column in STATS_COLUMNS,
+                            see get_distribution()
+            * n_vs_ct:      correlation of pct_n_bases with ct, see
+                            get_correlation()
+            * outliers:     dictionary of column name to the list of sample
+                            names that are outliers for the column
+    '''
+    samples = columns['sample_name'].size
+    passed = int((columns['qc_pass'] == 'TRUE').sum())
+    stats = {'samples' : samples,
+             'qc_pass' : passed,
+             'pass_rate' : passed / samples if samples else None,
+             'columns' : {},
+             'outliers' : {}}
+    for column in STATS_COLUMNS:
+        if column not in columns:
+            continue
+        values = get_values(columns, column)
+        stats['columns'][column] = get_distribution(values)
+        stats['outliers'][column] = \
+            columns['sample_name'][get_outliers(values, k=k)].tolist()
+    if 'pct_n_bases' in columns and 'ct' in columns:
+        stats['n_vs_ct'] = get_correlation(get_values(columns, 'pct_n_bases'),
+                                           get_values(columns, 'ct'))
+    return stats
+
+
+def get_date_stats(columns):
+    '''
+    Calculate the statistics for each collection date.
+
+    Arguments:
+        * columns:  dictionary of NumPy arrays from load_run_summary()
+
+    Return Value:
+        Returns a list of dictionaries ordered by date with the keys date,
+        samples, qc_pass, pass_rate and median_<column> for each column in
+        STATS_COLUMNS
+    '''
+    import numpy as np
+    dates, groups = np.unique(columns['date'], return_inverse=True)
+    groups = groups.ravel()
+    samples = np.bincount(groups, minlength=dates.size)
+    passed = np.bincount(groups, weights=columns['qc_pass'] == 'TRUE',
+                         minlength=dates.size)
+    medians = {column : get_group_medians(groups, get_values(columns, column),
+                                          dates.size)
+               for column in STATS_COLUMNS if column in columns}
+    date_stats = []
+    for i, date in enumerate(dates.tolist()):
+        row = {'date' : date,
+               'samples' : int(samples[i]),
+               'qc_pass' : int(passed[i]),
+               'pass_rate' : float(passed[i] / samples[i])}
+        for column, values in medians.items():
+            row['median_' + column] = None if np.isnan(values[i]) else float(values[i])
+        date_stats.append(row)
+    return date_stats
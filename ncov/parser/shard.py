@@ -0,0 +1,68 @@
+'''
+Deterministic assignment of the samples of a run to shards, so a run can be
+split across nodes and every rerun processes the same samples on each node.
+Samples are identified by the sample_name of their <sample>.qc.csv file, the
+name written in the summary, in both the single sample and run scripts.
+'''
+
+import zlib
+from ncov.parser.fileio import get_file_key
+from ncov.parser.qc import get_qc_data
+
+_SAMPLE_NAME_CACHE = {}
+
+
+def parse_shard(shard):
+    '''
+    Parse a shard given as "i/N", the i-th of N shards counting from 0.
+
+    Arguments:
+        * shard:    string of the form "i/N"
+
+    Return Value:
+        Returns a tuple (i, N), raises ValueError for an invalid shard
+    '''
+    try:
+        index, count = (int(value) for value in shard.split('/'))
+    except ValueError:
+        raise ValueError('shard must be of the form i/N: %s' % shard)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError('shard must have 0 <= i < N: %s' % shard)
+    return index, count
+
+
+def get_sample_name(qc_file, default=None):
+    '''
+    Return the sample_name of a <sample>.qc.csv file, the shard and sort key
+    of a sample, cached until the file changes.
+
+    Arguments:
+        * qc_file:  full path to the <sample>.qc.csv file
+        * default:  name returned when the file cannot be read
+                    (default: None)
+    '''
+    try:
+        key = get_file_key(qc_file)
+        name = _SAMPLE_NAME_CACHE.get(key)
+        if name is None:
+            name = _SAMPLE_NAME_CACHE[key] = get_qc_data(file=qc_file)['sample_name']
+    except Exception:
+        return default
+    return name
+
+
+def is_sample_in_shard(sample, shard):
+    '''
+    Return True when a sample belongs to a shard.  Samples are assigned by the
+    CRC-32 of their name, so the assignment is the same on every node and
+    rerun, unlike hash() which is randomized per process.
+
+    Arguments:
+        * sample:   name of the sample, see get_sample_name()
+        * shard:    tuple (i, N) as returned by parse_shard(), None for all
+                    samples
+    '''
+    if shard is None:
+        return True
+    index, count = shard
+    return zlib.crc32(sample.encode()) % count == index
@@ -0,0 +1,224 @@
+'''
+A typed record for the QC summary of a sample.  Each column of the summary
+file is stored in a slot converted to its column type, missing values are
+None and written as 'NA'.  Numbers keep their source text and text that is
+not a number, for example a ct of 'Undetermined', is kept as is.  The record supports the dictionary interface so
+code written for the previous dictionary summaries keeps working.
+'''
+
+from collections.abc import Mapping
+
+# columns of the QC summary file in output order
+QC_SUMMARY_COLUMNS = ['sample_name',
+                      'pct_n_bases',
+                      'pct_covered_bases',
+                      'total_variants',
+                      'total_snv',
+                      'total_snv_masked',
+                      'total_indel',
+                      'total_indel_masked',
+                      'total_indel_triplet',
+                      'total_n',
+                      'total_iupac',
+                      'mean_depth',
+                      'median_depth',
+                      'ct',
+                      'date',
+                      'qc_pass',
+                      'pct_depth_1x',
+                      'pct_depth_10x',
+                      'pct_depth_20x',
+                      'pct_depth_100x',
+                      'low_coverage_regions',
+                      'total_low_coverage_regions',
+                      'total_variant_primer_site',
+                      'total_variant_amplicon_overlap']
+
+# type of each column, float columns also hold ints so integral values are
+# written unchanged
+COLUMN_TYPES = {'sample_name' : str,
+                'pct_n_bases' : float,
+                'pct_covered_bases' : float,
+                'total_variants' : int,
+                'total_snv' : int,
+                'total_snv_masked' : int,
+                'total_indel' : int,
+                'total_indel_masked' : int,
+                'total_indel_triplet' : int,
+                'total_n' : int,
+                'total_iupac' : int,
+                'mean_depth' : float,
+                'median_depth' : float,
+                'ct' : float,
+                'date' : str,
+                'qc_pass' : str,
+                'pct_depth_1x' : float,
+                'pct_depth_10x' : float,
+                'pct_depth_20x' : float,
+                'pct_depth_100x' : float,
+                'low_coverage_regions' : str,
+                'total_low_coverage_regions' : int,
+                'total_variant_primer_site' : int,
+                'total_variant_amplicon_overlap' : int}
+
+MISSING = 'NA'
+
+
+def to_column_type(value, column_type):
+    '''
+    Convert a value to a column type.  'NA', None and values that cannot be
+    converted are missing.  Numbers in float columns keep an int type when
+    they are integral ints or int strings.
+
+    Arguments:
+        * value:        the value to convert
+        * column_type:  one of str, int or float
+
+    Return Value:
+        Returns the converted value or None
+    '''
+    if value is None or value == MISSING:
+        return None
+    if column_type is str:
+        return str(value)
+    if type(value) is not int and type(value) is not float:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None
+    if value != value:
+        return None
+    if column_type is int and type(value) is float:
+        return int(value) if value.is_integer() else None
+    return value
+
+
+class _TextFloat(float):
+    '''
+    A float read from text, written back with the same text so a summary
+    file row or a qc.csv value is unchanged, for example '68.010'.
+    '''
+    __slots__ = ('text',)
+
+    def __new__(cls, value, text):
+        number = super().__new__(cls, value)
+        number.text = text
+        return number
+
+    def __getnewargs__(self):
+        return float(self), self.text
+
+    def __str__(self):
+        return self.text
+
+
+def to_summary_value(value, column_type):
+    '''
+    Convert a value to the value stored in a summary.  As to_column_type()
+    but floats converted from text keep the text, for example '31.290', and
+    text that cannot be converted is kept unchanged rather than missing.
+
+    Arguments:
+        * value:        the value to convert
+        * column_type:  one of str, int or float
+
+    Return Value:
+        Returns the converted value, the text or None
+    '''
+    converted = to_column_type(value, column_type)
+    if not isinstance(value, str):
+        return converted
+    if converted is None:
+        return None if value == MISSING else value
+    if type(converted) is float and str(converted) != value:
+        return _TextFloat(converted, value)
+    return converted
+
+
+def format_value(value):
+    '''
+    Return the summary file text of a value, None is written as 'NA'.
+    '''
+    return MISSING if value is None else str(value)
+
+
+class QCSummary(Mapping):
+    '''
+    The QC summary of a sample.  Columns are converted to their type from
+    COLUMN_TYPES when set, keys that are not summary columns (for example
+    genome_length or amplicon_depth) are kept in the extra dictionary.
+
+    Arguments:
+        * data: optional mapping of initial values
+    '''
+    __slots__ = tuple(QC_SUMMARY_COLUMNS) + ('extra',)
+
+    def __init__(self, data=None):
+        for column in QC_SUMMARY_COLUMNS:
+            setattr(self, column, None)
+        self.extra = None
+        if data is not None:
+            self.update(data)
+
+    def __setitem__(self, key, value):
+        column_type = COLUMN_TYPES.get(key)
+        if column_type is None:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+        else:
+            setattr(self, key, to_summary_value(value, column_type))
+
+    def __getitem__(self, key):
+        if key in COLUMN_TYPES:
+            return getattr(self, key)
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __iter__(self):
+        yield from QC_SUMMARY_COLUMNS
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return len(QC_SUMMARY_COLUMNS) + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self):
+        return 'QCSummary(%r)' % dict(self.items())
+
+    def __getstate__(self):
+        return [getattr(self, column) for column in self.__slots__]
+
+    def __setstate__(self, state):
+        for column, value in zip(self.__slots__, state):
+            setattr(self, column, value)
+
+    def update(self, data):
+        '''
+        Set the values of a mapping, as dict.update().
+        '''
+        for key, value in data.items():
+            self[key] = value
+
+    def to_row(self):
+        '''
+        Return the summary columns as a list of strings in output order.
+        '''
+        return [format_value(getattr(self, column))
+                for column in QC_SUMMARY_COLUMNS]
+
+    @classmethod
+    def from_row(cls, row):
+        '''
+        Create a summary from a list of column values in output order, for
+        example a summary file line split on tabs.  Missing trailing columns
+        are None, values keep their text so to_row() returns the same values.
+        '''
+        summary = cls()
+        for column, text in zip(QC_SUMMARY_COLUMNS, row):
+            setattr(summary, column, to_summary_value(text, COLUMN_TYPES[column]))
+        return summary
@@ -0,0 +1,130 @@
+'''
+Suite of tests for the ncov.parser.cache module
+'''
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from ncov.parser.cache import ResultCache, get_result_cache
+from ncov.parser.qc import create_qc_summary_line
+
+class TestCache(unittest.TestCase):
+    '''
+    A unittest class for the cache module
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmpdir.name, 'cache')
+        self.meta_file = os.path.join(self.tmpdir.name, 'metadata.tsv')
+        shutil.copy('data/metadata.tsv', self.meta_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def summarize(self, cache, fasta='data/tester.fa'):
+        '''
+        Create the summary of sampleA with a cache.
+        '''
+        return create_qc_summary_line(var_file='data/sampleA.variants.tsv',
+                                      qc_file='data/sampleA.qc.csv',
+                                      cov_file='data/sampleA.per_base_coverage.bed',
+                                      meta_file=self.meta_file,
+                                      fasta=fasta,
+                                      reference='data/tester.fa',
+                                      amplicons=True,
+                                      meta_index=False,
+                                      cache=cache)
+
+    def test_rerun_hits(self):
+        '''
+        A method to test a rerun reads every stage from the cache and gives
+        the same summary.
+        '''
+        expected = self.summarize(cache=None)
+        cache = ResultCache(self.cache_dir)
+        self.assertEqual(self.summarize(cache).to_row(), expected.to_row())
+        self.assertEqual(cache.get_totals(), {'hits' : 0, 'misses' : 5, 'evictions' : 0})
+        cache = ResultCache(self.cache_dir)
+        summary = self.summarize(cache)
+        self.assertEqual(summary.to_row(), expected.to_row())
+        self.assertEqual(summary['amplicon_depth'], expected['amplicon_depth'])
+        self.assertEqual(cache.get_totals(), {'hits' : 5, 'misses' : 0, 'evictions' : 0})
+
+    def test_changed_input_misses(self):
+        '''
+        A method to test that only the stages of a changed file or parameter
+        are recomputed.
+        '''
+        self.summarize(ResultCache(self.cache_dir))
+        with open(self.meta_file, 'a') as file_p:
+            file_p.write('\n')
+        cache = ResultCache(self.cache_dir)
+        self.summarize(cache)
+        self.assertEqual(cache.stats['metadata'], {'hits' : 0, 'misses' : 1})
+        self.assertEqual(cache.stats['variants'], {'hits' : 1, 'misses' : 0})
+        key = cache.get_key('variants', ['data/sampleA.variants.tsv'], {'indel' : True})
+        self.assertNotEqual(key, cache.get_key('variants', ['data/sampleA.variants.tsv'],
+                                               {'indel' : False}))
+
+    def test_missing_input(self):
+        '''
+        A method to test a missing optional input gives the same summary with
+        and without the cache.
+        '''
+        fasta = os.path.join(self.tmpdir.name, 'missing.fa')
+        expected = self.summarize(cache=None, fasta=fasta)
+        for hash_content in [False, True]:
+            cache = ResultCache(self.cache_dir, hash_content=hash_content)
+            self.assertEqual(self.summarize(cache, fasta=fasta).to_row(),
+                             expected.to_row())
+        shutil.copy('data/tester.fa', fasta)
+        self.assertEqual(self.summarize(ResultCache(self.cache_dir), fasta=fasta).to_row(),
+                         self.summarize(cache=None, fasta=fasta).to_row(),
+                         'the result for the missing file is not reused')
+
+    def test_hash_content(self):
+        '''
+        A method to test files identified by content hit after being copied.
+        '''
+        copy = os.path.join(self.tmpdir.name, 'copy.tsv')
+        shutil.copy('data/sampleA.variants.tsv', copy)
+        cache = ResultCache(self.cache_dir, hash_content=True)
+        self.assertEqual(cache.get_key('variants', ['data/sampleA.variants.tsv'], {}),
+                         cache.get_key('variants', [copy], {}))
+        cache = ResultCache(self.cache_dir)
+        self.assertNotEqual(cache.get_key('variants', ['data/sampleA.variants.tsv'], {}),
+                            cache.get_key('variants', [copy], {}))
+
+    def test_evict(self):
+        '''
+        A method to test the least recently used entries are removed when
+        the cache is over its size limit.
+        '''
+        cache = ResultCache(self.cache_dir, max_bytes=300)
+        keys = [cache.get_key('stage', [], {'i' : i}) for i in range(5)]
+        for i, key in enumerate(keys[:4]):
+            cache.put(key, {'value' : 'x' * 50, 'i' : i})
+            os.utime(cache._get_entry_file(key), ns=(i * 10 ** 9, i * 10 ** 9))
+        self.assertIsNotNone(cache.get('stage', keys[0]), 'entry 0 is used')
+        cache.put(keys[4], {'value' : 'x' * 50, 'i' : 4})
+        self.assertEqual(cache.evictions, 2)
+        self.assertIsNone(cache.get('stage', keys[1]), 'least recently used')
+        self.assertIsNone(cache.get('stage', keys[2]))
+        self.assertIsNotNone(cache.get('stage', keys[0]))
+        self.assertIsNotNone(cache.get('stage', keys[4]))
+
+    def test_pickle_and_stats(self):
+        '''
+        A method to test worker copies start without counts and their counts
+        can be added back.
+        '''
+        cache = ResultCache(self.cache_dir)
+        cache.get('stage', '00')
+        worker = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(worker.stats, {})
+        worker.get('stage', '00')
+        cache.add_stats(worker.pop_stats())
+        self.assertEqual(cache.stats['stage'], {'hits' : 0, 'misses' : 2})
+        self.assertEqual(worker.stats, {})
+        self.assertIsNone(get_result_cache(cache_dir=''))
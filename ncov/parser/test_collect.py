@@ -0,0 +1,125 @@
+'''
+Suite of tests for the ncov.parser.collect module
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from ncov.parser.collect import update_qc_summary, read_summary_rows, \
+    merge_qc_summaries
+from ncov.parser.qc import collect_qc_summary_data
+from ncov.parser.summary import QC_SUMMARY_COLUMNS
+
+class TestCollect(unittest.TestCase):
+    '''
+    A unittest class for the collect module
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        for sample in ['sampleA', 'sampleB', 'sampleC']:
+            shutil.copy('data/%s.summary.qc.tsv' % sample, self.tmpdir)
+        self.output = os.path.join(self.tmpdir, 'run.summary.qc.tsv')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def get_output_rows(self):
+        '''
+        Return the aggregate output as a dictionary keyed by sample name.
+        '''
+        return dict(read_summary_rows(self.output))
+
+    def test_update_qc_summary(self):
+        '''
+        A method to test the update_qc_summary function only reads new or
+        changed files and removes rows for deleted files.
+        '''
+        stats = update_qc_summary(path=self.tmpdir, output=self.output)
+        self.assertEqual(stats['added'], 3, '3 files added')
+        self.assertEqual(sorted(self.get_output_rows()), ['sampleA', 'sampleB', 'sampleC'])
+        with open(self.output) as file_p:
+            self.assertTrue(file_p.readline().startswith('sample_name\tpct_n_bases'))
+
+        with mock.patch('ncov.parser.collect.read_summary_rows',
+                        wraps=read_summary_rows) as reader:
+            stats = update_qc_summary(path=self.tmpdir, output=self.output)
+            self.assertEqual(reader.call_count, 1, 'only the aggregate is read')
+        self.assertEqual(stats['unchanged'], 3, '3 files unchanged')
+
+        sample_b = os.path.join(self.tmpdir, 'sampleB.summary.qc.tsv')
+        with open(sample_b) as file_p:
+            lines = file_p.readlines()
+        with open(sample_b, 'w') as file_p:
+            file_p.write(lines[0] + lines[1].replace('FALSE', 'TRUE'))
+        os.utime(sample_b, ns=(0, 1))
+        os.remove(os.path.join(self.tmpdir, 'sampleC.summary.qc.tsv'))
+        with open(os.path.join(self.tmpdir, 'sampleD.summary.qc.tsv'), 'w') as file_p:
+            file_p.write(lines[0] + lines[1].replace('sampleB', 'sampleD'))
+        stats = update_qc_summary(path=self.tmpdir, output=self.output)
+        self.assertEqual(stats, {'added' : 1, 'updated' : 1, 'removed' : 1,
+                                 'unchanged' : 1})
+        rows = self.get_output_rows()
+        self.assertEqual(sorted(rows), ['sampleA', 'sampleB', 'sampleD'])
+        self.assertTrue(rows['sampleB'].endswith('TRUE'), 'changed row is updated')
+        self.assertEqual(list(rows), ['sampleA', 'sampleB', 'sampleD'],
+                         'rows are written in sample order')
+
+    def test_update_qc_summary_duplicate_sample(self):
+        '''
+        A method to test rows of the same sample in two files are both kept
+        and removing one file keeps the other row.
+        '''
+        with open(os.path.join(self.tmpdir, 'sampleB.summary.qc.tsv')) as file_p:
+            lines = file_p.readlines()
+        rerun = os.path.join(self.tmpdir, 'sampleB_rerun.summary.qc.tsv')
+        with open(rerun, 'w') as file_p:
+            file_p.write(lines[0] + lines[1].replace('FALSE', 'TRUE'))
+        update_qc_summary(path=self.tmpdir, output=self.output)
+        samples = [sample for sample, _ in read_summary_rows(self.output)]
+        self.assertEqual(samples, ['sampleA', 'sampleB', 'sampleB', 'sampleC'])
+        os.remove(os.path.join(self.tmpdir, 'sampleB.summary.qc.tsv'))
+        stats = update_qc_summary(path=self.tmpdir, output=self.output)
+        self.assertEqual(stats['removed'], 1)
+        rows = read_summary_rows(self.output)
+        self.assertEqual([sample for sample, _ in rows], ['sampleA', 'sampleB', 'sampleC'])
+        self.assertTrue(rows[1][1].endswith('TRUE'), 'the other file keeps its row')
+
+    def test_collect_qc_summary_data_order(self):
+        '''
+        A method to test sample files are read in name order.
+        '''
+        samples = [line.split('\t', 1)[0] for line in
+                   collect_qc_summary_data(path=self.tmpdir)]
+        self.assertEqual(samples, ['sampleA', 'sampleB', 'sampleC'])
+
+    def write_shard(self, name, samples):
+        '''
+        Write a run summary with a row for each sample.
+        '''
+        shard = os.path.join(self.tmpdir, name)
+        with open(shard, 'w') as file_p:
+            file_p.write('\t'.join(QC_SUMMARY_COLUMNS) + '\n')
+            for sample in samples:
+                file_p.write(sample + '\t1' * (len(QC_SUMMARY_COLUMNS) - 1) + '\n')
+        return shard
+
+    def test_merge_qc_summaries(self):
+        '''
+        A method to test the k-way merge of sorted shard summaries.
+        '''
+        shards = [self.write_shard('shard0.tsv', ['s1', 's4', 's7']),
+                  self.write_shard('shard1.tsv', ['s2', 's5']),
+                  self.write_shard('shard2.tsv', [])]
+        merged = list(merge_qc_summaries(shards))
+        self.assertEqual([line.split('\t', 1)[0] for line in merged],
+                         ['s1', 's2', 's4', 's5', 's7'])
+        unsorted = self.write_shard('unsorted.tsv', ['s3', 's1'])
+        with self.assertRaises(ValueError):
+            list(merge_qc_summaries(shards + [unsorted]))
+        with self.assertRaises(ValueError, msg='different columns'):
+            list(merge_qc_summaries([os.path.join(self.tmpdir, 'sampleA.summary.qc.tsv')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
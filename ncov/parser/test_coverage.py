@@ -0,0 +1,247 @@
+'''
+Suite of tests for the ncov.parser.coverage module
+'''
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from ncov.parser.qc import get_coverage_stats
+from ncov.parser.coverage import DepthHistogram, load_depth_histogram, \
+    write_amplicon_depth, AMPLICON_DEPTH_COLUMNS, GenomeCoverage
+from ncov.parser.summary import QC_SUMMARY_COLUMNS, format_value
+
+def write_coverage_file(file, depths):
+    '''
+    Write a minimal <sample>.per_base_coverage.bed file with the given depths.
+    '''
+    with open(file, 'w') as file_p:
+        file_p.write('reference_name\tstart\tend\tamplicon_id\tpool\tstrand\tposition\tdepth\n')
+        for position, depth in enumerate(depths, start=1):
+            file_p.write('ref\t0\t100\t1\tamp_1\t+\t%d\t%d\n' % (position, depth))
+
+def get_summary_text(stats):
+    '''
+    Return the summary file text of the coverage statistics.
+    '''
+    return [format_value(stats[column]) for column in QC_SUMMARY_COLUMNS
+            if column in stats]
+
+class TestCoverage(unittest.TestCase):
+    '''
+    A unittest class for the coverage module
+    '''
+    def test_histogram_backend_matches_list(self):
+        '''
+        A method to test the histogram backend returns the same results as
+        the list backend, including depths above the dense array cap.
+        '''
+        covfile = 'data/sampleA.per_base_coverage.bed'
+        self.assertEqual(get_coverage_stats(file=covfile, backend='histogram'),
+                         get_coverage_stats(file=covfile))
+        rand = random.Random(42)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for total in [1, 2, 999, 1000]:
+                covfile = os.path.join(tmpdir, 'sample.per_base_coverage.bed')
+                write_coverage_file(covfile, [rand.randint(0, 20000) for _ in range(total)])
+                self.assertEqual(get_coverage_stats(file=covfile, backend='histogram'),
+                                 get_coverage_stats(file=covfile, backend='list'))
+
+    def test_numpy_backend_matches_list(self):
+        '''
+        A method to test the numpy and histogram backends write the same
+        summary text as the list backend for odd and even numbers of positions
+        and an integral mean.
+        '''
+        rand = random.Random(3)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            covfile = os.path.join(tmpdir, 'sample.per_base_coverage.bed')
+            for depths in [[rand.randint(0, 5000) for _ in range(total)]
+                           for total in [7, 1000, 1001]] + [[10, 20, 30]]:
+                write_coverage_file(covfile, depths)
+                stats = {backend : get_coverage_stats(file=covfile, backend=backend)
+                         for backend in ['list', 'histogram', 'numpy']}
+                self.assertEqual(stats['numpy'], stats['list'])
+                for backend in ['histogram', 'numpy']:
+                    self.assertEqual(get_summary_text(stats[backend]),
+                                     get_summary_text(stats['list']),
+                                     'the summary text of %s matches' % backend)
+        self.assertEqual(get_summary_text(stats['list'])[:2], ['20', '20'],
+                         'an integral mean is written as an int')
+
+    def test_backend_environment_variable(self):
+        '''
+        A method to test the backend is selected by the environment variable
+        and that the numpy backend falls back when NumPy is not installed.
+        '''
+        covfile = 'data/sampleA.per_base_coverage.bed'
+        with mock.patch.dict(os.environ, {'NCOV_PARSER_COVERAGE_BACKEND': 'numpy'}):
+            self.assertEqual(get_coverage_stats(file=covfile)['median_depth'], 682)
+            with mock.patch.dict(sys.modules, {'numpy': None}):
+                self.assertEqual(get_coverage_stats(file=covfile)['mean_depth'], 679.4)
+        with mock.patch.dict(os.environ, {'NCOV_PARSER_COVERAGE_BACKEND': 'unknown'}):
+            with self.assertRaises(ValueError):
+                get_coverage_stats(file=covfile)
+
+    def test_histogram_percentile(self):
+        '''
+        A method to test the DepthHistogram percentile and median methods.
+        '''
+        rand = random.Random(7)
+        depths = [rand.randint(0, 50) for _ in range(503)] + [100000, 250000]
+        histogram = DepthHistogram(cap=40)
+        for depth in depths:
+            histogram.add(depth)
+        depths.sort()
+        self.assertEqual(histogram.median(), statistics.median(depths))
+        self.assertEqual(histogram.mean(), statistics.mean(depths))
+        self.assertEqual(histogram.percentile(0), depths[0])
+        self.assertEqual(histogram.percentile(100), depths[-1])
+        self.assertEqual(histogram.percentile(25), depths[(len(depths) - 1) // 4])
+
+    def test_load_depth_histogram(self):
+        '''
+        A method to test the load_depth_histogram function.
+        '''
+        histogram = load_depth_histogram(file='data/sampleA.per_base_coverage.bed')
+        self.assertEqual(histogram.count, 7, '7 positions')
+        self.assertEqual(histogram.median(), 682, 'median depth is 682')
+
+    def test_amplicon_depth(self):
+        '''
+        A method to test the per amplicon and per pool depth is the same for
+        every backend and that low depth amplicons are flagged.
+        '''
+        rand = random.Random(11)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            covfile = os.path.join(tmpdir, 'sample.per_base_coverage.bed')
+            with open(covfile, 'w') as file_p:
+                file_p.write('reference_name\tstart\tend\tamplicon_id\tpool\tstrand\tposition\tdepth\n')
+                for position in range(1, 1001):
+                    amplicon = (position - 1) // 100 + 1
+                    depth = 5 if amplicon == 3 else rand.randint(50, 500)
+                    file_p.write('ref\t0\t100\t%d\tamp_%d\t+\t%d\t%d\n' % (
+                        amplicon, 2 - amplicon % 2, position, depth))
+            stats = {backend : get_coverage_stats(file=covfile, backend=backend,
+                                                  amplicons=True)
+                     for backend in ['list', 'histogram', 'numpy']}
+            plain_stats = get_coverage_stats(file=covfile)
+        self.assertEqual(stats['list'], stats['histogram'])
+        self.assertEqual(stats['list'], stats['numpy'])
+        self.assertEqual(plain_stats['mean_depth'], stats['list']['mean_depth'])
+        self.assertNotIn('amplicon_depth', plain_stats)
+        amplicons = stats['list']['amplicon_depth']['amplicons']
+        self.assertEqual([row['amplicon_id'] for row in amplicons],
+                         [str(i) for i in range(1, 11)], 'amplicons in file order')
+        self.assertEqual(amplicons[2]['mean_depth'], 5)
+        self.assertEqual([row['low_depth_amplicons'] for row in amplicons],
+                         [0, 0, 1, 0, 0, 0, 0, 0, 0, 0])
+        pools = stats['list']['amplicon_depth']['pools']
+        self.assertEqual([(row['pool'], row['positions'], row['low_depth_amplicons'])
+                          for row in pools], [('amp_1', 500, 1), ('amp_2', 500, 0)])
+
+    def test_coverage_breadth(self):
+        '''
+        A method to test the breadth of coverage and low coverage regions are
+        the same for every backend, including regions split by a gap in the
+        positions.
+        '''
+        depths = [0, 0, 5, 30, 120, 120, 19, 10, 25, 1, 1, 1, 200, 0]
+        positions = list(range(1, 11)) + [21, 22, 23, 24]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            covfile = os.path.join(tmpdir, 'sample.per_base_coverage.bed')
+            with open(covfile, 'w') as file_p:
+                file_p.write('reference_name\tstart\tend\tamplicon_id\tpool\tstrand\tposition\tdepth\n')
+                for position, depth in zip(positions, depths):
+                    file_p.write('ref\t0\t100\t1\tamp_1\t+\t%d\t%d\n' % (position, depth))
+            stats = {backend : get_coverage_stats(file=covfile, backend=backend)
+                     for backend in ['list', 'histogram', 'numpy']}
+        self.assertEqual(stats['list'], stats['histogram'])
+        self.assertEqual(stats['list'], stats['numpy'])
+        self.assertEqual(stats['list']['pct_depth_1x'], round(100 * 11 / 14, 2))
+        self.assertEqual(stats['list']['pct_depth_10x'], round(100 * 7 / 14, 2))
+        self.assertEqual(stats['list']['pct_depth_20x'], round(100 * 5 / 14, 2))
+        self.assertEqual(stats['list']['pct_depth_100x'], round(100 * 3 / 14, 2))
+        self.assertEqual(stats['list']['low_coverage_regions'], '1-3;7-8;10-10;21-22;24-24')
+        self.assertEqual(stats['list']['total_low_coverage_regions'], 5)
+
+    def test_coverage_breadth_overlapping_amplicons(self):
+        '''
+        A method to test genome positions are start + position and a position
+        covered by two amplicons is counted once with its largest depth.
+        '''
+        rows = [('1', 100, position, depth) for position, depth in
+                zip(range(1, 11), [5, 5, 5] + [50] * 7)]
+        rows += [('2', 105, position, depth) for position, depth in
+                 zip(range(1, 11), [8, 50, 50, 50, 50, 10, 10, 40, 40, 40])]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            covfile = os.path.join(tmpdir, 'sample.per_base_coverage.bed')
+            with open(covfile, 'w') as file_p:
+                file_p.write('reference_name\tstart\tend\tamplicon_id\tpool\tstrand\tposition\tdepth\n')
+                for amplicon_id, start, position, depth in rows:
+                    file_p.write('ref\t%d\t%d\t%s\tamp_%s\t+\t%d\t%d\n'
+                                 % (start, start + 10, amplicon_id, amplicon_id,
+                                    position, depth))
+            stats = {backend : get_coverage_stats(file=covfile, backend=backend)
+                     for backend in ['list', 'histogram', 'numpy']}
+        self.assertEqual(stats['list'], stats['histogram'])
+        self.assertEqual(stats['list'], stats['numpy'])
+        self.assertEqual(stats['list']['low_coverage_regions'], '101-103;111-112')
+        self.assertEqual(stats['list']['pct_depth_1x'], 100)
+        self.assertEqual(stats['list']['pct_depth_20x'], round(100 * 10 / 15, 2),
+                         '15 genome positions, 106 has the largest depth')
+
+    def test_genome_coverage_window(self):
+        '''
+        A method to test random overlapping amplicons with gaps give the
+        breadth of the largest depth of each position and only the positions
+        after the current start are kept.
+        '''
+        rand = random.Random(5)
+        coverage = GenomeCoverage(min_depth=20)
+        depths = {}
+        window = 0
+        for start in range(0, 3000, 70):
+            length = rand.randint(60, 100)
+            for position in range(1, length + 1):
+                if rand.random() < 0.05:
+                    continue
+                depth = rand.choice([0, 5, 19, 20, 50, 150])
+                coverage.add(start, position, [depth])
+                depths[start + position] = max(depth, depths.get(start + position, -1))
+            window = max(window, len(coverage.window))
+        coverage.close()
+        self.assertLessEqual(window, 100, 'bounded by the amplicon length')
+        self.assertEqual(coverage.total, len(depths))
+        self.assertEqual(coverage.counts[20],
+                         len([depth for depth in depths.values() if depth >= 20]))
+        low = sorted(position for position, depth in depths.items() if depth < 20)
+        regions = []
+        for position in low:
+            if regions and regions[-1][1] == position - 1:
+                regions[-1][1] = position
+            else:
+                regions.append([position, position])
+        self.assertEqual(coverage.regions, [tuple(region) for region in regions])
+
+    def test_write_amplicon_depth(self):
+        '''
+        A method to test the write_amplicon_depth function.
+        '''
+        stats = get_coverage_stats(file='data/sampleA.per_base_coverage.bed',
+                                   amplicons=True, min_amplicon_depth=1000)
+        output = io.StringIO()
+        write_amplicon_depth(sample='sampleA', amplicon_depth=stats['amplicon_depth'],
+                             file_p=output)
+        rows = [dict(zip(AMPLICON_DEPTH_COLUMNS, line.split('\t')))
+                for line in output.getvalue().splitlines()]
+        self.assertEqual([row['level'] for row in rows], ['amplicon', 'pool'])
+        self.assertEqual(rows[0]['median_depth'], '682')
+        self.assertEqual(rows[1]['low_depth_amplicons'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
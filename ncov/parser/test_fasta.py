@@ -0,0 +1,106 @@
+'''
+Suite of tests for the ncov.parser.fasta module
+'''
+import gzip
+import os
+import re
+import tempfile
+import unittest
+from ncov.parser.fasta import read_fasta, count_bases, count_fasta_composition, \
+    build_fasta_index, read_fasta_index, get_indexed_fasta, \
+    clear_indexed_fasta_cache
+from ncov.parser.qc import count_iupac_in_fasta, get_fasta_sequence_length
+
+class TestFasta(unittest.TestCase):
+    '''
+    A unittest class for the fasta module
+    '''
+    def test_count_bases(self):
+        '''
+        A method to test the count_bases function against regular expression
+        counts.
+        '''
+        sequence = [seq for _, seq in read_fasta('data/tester.fa')][0]
+        composition = count_bases(sequence)
+        self.assertEqual(composition['length'], 129, 'length is correct')
+        self.assertEqual(composition['N'], 13, 'N count is correct')
+        self.assertEqual(composition['A'], len(re.findall(b'A', sequence)))
+        self.assertEqual(composition['other'], 0, 'no unknown characters')
+        self.assertEqual(count_bases(b'acgtnnrX-')['n'], 2, 'lower case n counted')
+        self.assertEqual(count_bases(b'acgtnnrX-')['other'], 2, 'X and - are other')
+
+    def test_count_fasta_composition(self):
+        '''
+        A method to test the count_fasta_composition function reports each
+        record and the total across records.
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fasta = os.path.join(tmpdir, 'multi.fa')
+            with open(fasta, 'w') as file_p:
+                file_p.write('>sample1 description\nACGTN\nNRy\n>sample2\nnnAK\n')
+            composition = count_fasta_composition(fasta)
+            self.assertEqual([name for name, _ in composition['records']],
+                             ['sample1', 'sample2'])
+            self.assertEqual(composition['records'][0][1]['length'], 8)
+            self.assertEqual(composition['total']['N'], 2, 'upper case N total')
+            self.assertEqual(composition['total']['n'], 2, 'lower case n total')
+            self.assertEqual(composition['total']['length'], 12)
+            iupac_count = count_iupac_in_fasta(fasta=fasta)
+            self.assertEqual(iupac_count['total_n'], 4, 'N count is summed across records')
+            self.assertEqual(iupac_count['total_iupac'], 2, 'only upper case IUPAC codes')
+
+    def test_count_iupac_in_fasta_missing(self):
+        '''
+        A method to test count_iupac_in_fasta returns NA without a FASTA file.
+        '''
+        self.assertEqual(count_iupac_in_fasta(fasta=None)['total_n'], 'NA')
+
+    def test_build_fasta_index(self):
+        '''
+        A method to test the .fai index matches the samtools faidx columns.
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fasta = os.path.join(tmpdir, 'run.fa')
+            with open(fasta, 'w') as file_p:
+                file_p.write('>sample1 description\nACGT\nNR\n>sample2\nnnAK\n')
+            self.assertEqual(build_fasta_index(fasta),
+                             [('sample1', 6, 21, 4, 5), ('sample2', 4, 38, 4, 5)])
+            records = read_fasta_index(fasta)
+            self.assertTrue(os.path.exists(fasta + '.fai'), 'index is written')
+            with open(fasta + '.fai') as file_p:
+                self.assertEqual(file_p.readline(), 'sample1\t6\t21\t4\t5\n')
+            self.assertEqual(read_fasta_index(fasta), records, 'index is read back')
+
+    def test_indexed_fasta(self):
+        '''
+        A method to test reading single records of a multi-FASTA file through
+        the index.
+        '''
+        clear_indexed_fasta_cache()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fasta = os.path.join(tmpdir, 'run.fa')
+            with open(fasta, 'w') as file_p:
+                file_p.write('>sample1 description\nACGTN\nNRy\n>sample2\nnnAK\nNN\n')
+            indexed = get_indexed_fasta(fasta)
+            self.assertIs(get_indexed_fasta(fasta), indexed, 'cached per file')
+            self.assertIn('sample2', indexed)
+            self.assertEqual(indexed.get_sequence('sample1'), b'ACGTNNRy')
+            self.assertEqual(indexed.get_sequence('sample2'), b'nnAKNN')
+            iupac_count = count_iupac_in_fasta(fasta=fasta, record='sample2')
+            self.assertEqual(iupac_count['total_n'], 4, 'only the sample2 record')
+            self.assertEqual(iupac_count['total_iupac'], 1)
+            self.assertEqual(iupac_count['consensus_length'], 6)
+            self.assertEqual(get_fasta_sequence_length(fasta=fasta, record='sample1'),
+                             {'genome_length' : 8})
+            self.assertEqual(count_iupac_in_fasta(fasta=fasta, record='sample3')['total_n'],
+                             'NA', 'unknown record')
+            compressed = os.path.join(tmpdir, 'run.fa.gz')
+            with open(fasta, 'rb') as file_p, gzip.open(compressed, 'wb') as gzip_p:
+                gzip_p.write(file_p.read())
+            self.assertEqual(count_iupac_in_fasta(fasta=compressed, record='sample2'),
+                             iupac_count, 'compressed files are scanned')
+        clear_indexed_fasta_cache()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+'''
+Suite of tests for the ncov.parser.fileio module
+'''
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from ncov.parser.fileio import open_input, find_input
+from ncov.parser.qc import create_qc_summary_line, collect_qc_summary_data
+from ncov.parser.run import find_sample_files
+from ncov.parser.coverage import get_coverage_stats_numpy
+
+class TestFileio(unittest.TestCase):
+    '''
+    A unittest class for the fileio module
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def compress(self, file, suffix='.gz', blocks=1):
+        '''
+        Write a gzip copy of a file to the temporary directory, more than one
+        block writes a multi-member file like bgzip.
+        '''
+        with open(file, 'rb') as file_p:
+            data = file_p.read()
+        output = os.path.join(self.tmpdir, os.path.basename(file) + suffix)
+        size = len(data) // blocks + 1
+        with open(output, 'wb') as file_p:
+            for i in range(0, len(data), size):
+                file_p.write(gzip.compress(data[i:i + size]))
+        return output
+
+    def test_open_input(self):
+        '''
+        A method to test the open_input function with plain, gzip and
+        multi-member gzip files.
+        '''
+        with open('data/sampleA.variants.tsv') as file_p:
+            expected = file_p.read()
+        for file in ['data/sampleA.variants.tsv',
+                     self.compress('data/sampleA.variants.tsv'),
+                     self.compress('data/sampleA.variants.tsv', '.bgz', blocks=4)]:
+            with open_input(file) as file_p:
+                self.assertEqual(file_p.read(), expected, file)
+            with open_input(file, 'rb') as file_p:
+                self.assertEqual(file_p.read(), expected.encode(), file)
+        with mock.patch.dict(os.environ, {'NCOV_PARSER_DECOMPRESS_THREADS' : '4'}), \
+                mock.patch('shutil.which', return_value=None):
+            with open_input(self.compress('data/sampleA.variants.tsv')) as file_p:
+                self.assertEqual(file_p.read(), expected, 'falls back to gzip')
+        self.assertRaises(ValueError, open_input('data/tester.fa', 'w').__enter__)
+
+    @unittest.skipUnless(shutil.which('pigz'), 'pigz is not installed')
+    def test_open_input_pigz(self):
+        '''
+        A method to test decompressing with pigz.
+        '''
+        with open('data/sampleA.variants.tsv') as file_p:
+            expected = file_p.read()
+        with open_input(self.compress('data/sampleA.variants.tsv'),
+                        threads=2) as file_p:
+            self.assertEqual(file_p.read(), expected)
+
+    def test_compressed_qc_summary_line(self):
+        '''
+        A method to test the summary of compressed inputs matches the summary
+        of the plain files.
+        '''
+        files = {'var_file' : 'data/sampleA.variants.tsv',
+                 'qc_file' : 'data/sampleA.qc.csv',
+                 'cov_file' : 'data/sampleA.per_base_coverage.bed',
+                 'fasta' : 'data/tester.fa'}
+        expected = create_qc_summary_line(**files, meta_file='data/metadata.tsv',
+                                          reference='data/tester.fa')
+        compressed = {key : self.compress(file, blocks=2)
+                      for key, file in files.items()}
+        self.assertEqual(create_qc_summary_line(**compressed,
+                                                meta_file='data/metadata.tsv',
+                                                reference='data/tester.fa'),
+                         expected)
+        self.assertEqual(get_coverage_stats_numpy(file=compressed['cov_file']),
+                         get_coverage_stats_numpy(file=files['cov_file']))
+        samples = find_sample_files(path=self.tmpdir)
+        self.assertEqual(samples['sampleA'], dict(compressed, fasta=None),
+                         'tester.fa is not a sampleA consensus')
+        self.assertEqual(find_input(os.path.join(self.tmpdir, 'tester.fa')),
+                         compressed['fasta'])
+
+    def test_collect_compressed(self):
+        '''
+        A method to test collecting compressed summary files.
+        '''
+        expected = collect_qc_summary_data(path='data')
+        for sample in ['sampleA', 'sampleB', 'sampleC']:
+            self.compress('data/%s.summary.qc.tsv' % sample)
+        self.assertEqual(sorted(collect_qc_summary_data(path=self.tmpdir)),
+                         sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+'''
+Suite of tests for the ncov.parser.mask module
+'''
+import os
+import tempfile
+import unittest
+from ncov.parser.mask import read_mask_intervals, get_mask_source_name, \
+    compile_mask, clear_mask_cache, PositionMask
+from ncov.parser.qc import get_total_variants
+
+class TestMask(unittest.TestCase):
+    '''
+    A unittest class for the mask module
+    '''
+    def setUp(self):
+        clear_mask_cache()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.bed = os.path.join(self.tmpdir.name, 'problematic_sites.bed')
+        with open(self.bed, 'w') as file_p:
+            file_p.write('track name=sites\n')
+            file_p.write('MN908947.3\t365\t366\n')
+            file_p.write('MN908947.3\t430\t441\n')
+        self.vcf = os.path.join(self.tmpdir.name, 'primers.vcf')
+        with open(self.vcf, 'w') as file_p:
+            file_p.write('##fileformat=VCFv4.2\n')
+            file_p.write('#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n')
+            file_p.write('MN908947.3\t403\t.\tTA\t.\t.\tmask\t.\n')
+            file_p.write('MN908947.3\t441\t.\tG\t.\t.\tmask\t.\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        clear_mask_cache()
+
+    def test_read_mask_intervals(self):
+        '''
+        A method to test reading BED and VCF mask files as 1-based intervals.
+        '''
+        self.assertEqual(read_mask_intervals(self.bed), [(366, 366), (431, 441)])
+        self.assertEqual(read_mask_intervals(self.vcf), [(403, 404), (441, 441)])
+        self.assertEqual(get_mask_source_name(self.bed), 'problematic_sites')
+        self.assertEqual(get_mask_source_name('primers.vcf.gz'), 'primers')
+
+    def test_compile_mask(self):
+        '''
+        A method to test the position bitmap of the ends and mask files.
+        '''
+        mask = compile_mask(reference='data/tester.fa', mask_start=10,
+                            mask_end=10, mask_files=[self.bed, self.vcf])
+        self.assertEqual(mask.sources, ['ends', 'problematic_sites', 'primers'])
+        self.assertEqual(mask.get_sources(mask.get(5)), ['ends'])
+        self.assertEqual(mask.get(50), 0)
+        self.assertEqual(mask.get_sources(mask.get(441)),
+                         ['ends', 'problematic_sites', 'primers'])
+        self.assertEqual(mask.get_sources(mask.get(100000)), ['ends'])
+        self.assertIs(compile_mask(reference='data/tester.fa', mask_start=10,
+                                   mask_end=10, mask_files=[self.bed, self.vcf]),
+                      mask, 'cached per reference and mask files')
+        self.assertEqual(compile_mask(mask_files=[self.bed, self.bed]).sources,
+                         ['ends', 'problematic_sites', 'problematic_sites_2'])
+
+    def test_position_mask_sources(self):
+        '''
+        A method to test the bitmap holds a bit for up to 64 sources.
+        '''
+        for total, itemsize in [(8, 1), (9, 2), (33, 8), (64, 8)]:
+            mask = PositionMask(10, ['source%d' % i for i in range(total)])
+            self.assertEqual(mask.bits.itemsize, itemsize)
+            mask.add('source%d' % (total - 1), 3, 3)
+            self.assertEqual(mask.get_sources(mask.get(3)), ['source%d' % (total - 1)])
+        with self.assertRaises(ValueError):
+            PositionMask(10, ['source%d' % i for i in range(65)])
+
+    def test_get_total_variants_masked_by_source(self):
+        '''
+        A method to test the masked variant counts of each mask source.
+        '''
+        variants = get_total_variants(file='data/sampleA.variants.tsv',
+                                      reference=None,
+                                      indel=True,
+                                      mask_files=[self.bed, self.vcf])
+        self.assertEqual(variants['total_snv_masked'], 9)
+        self.assertEqual(variants['total_indel_masked'], 1)
+        self.assertEqual(variants['masked_by_source'],
+                         {'ends' : {'snv' : 0, 'indel' : 0},
+                          'problematic_sites' : {'snv' : 8, 'indel' : 1},
+                          'primers' : {'snv' : 8, 'indel' : 0}})
+        unmasked = get_total_variants(file='data/sampleA.variants.tsv',
+                                      reference='data/tester.fa',
+                                      indel=True)
+        self.assertEqual(unmasked['total_snv_masked'], 9)
+        self.assertEqual(unmasked['masked_by_source'],
+                         {'ends' : {'snv' : 9, 'indel' : 1}})
@@ -0,0 +1,69 @@
+'''
+Suite of tests for the ncov.parser.matrix module
+'''
+import io
+import os
+import tempfile
+import unittest
+from ncov.parser.matrix import build_variant_matrix, read_sample_variants, \
+    write_recurrent_variants
+
+class TestMatrix(unittest.TestCase):
+    '''
+    A unittest class for the matrix module
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.sampleB = os.path.join(self.tmpdir.name, 'sampleB.variants.tsv')
+        with open(self.sampleB, 'w') as file_p:
+            file_p.write('REGION\tPOS\tREF\tALT\tALT_FREQ\n')
+            file_p.write('region1\t366\tC\tT\t0.9\n')
+            file_p.write('region1\t500\tA\tG\t0.1\n')
+        self.matrix = build_variant_matrix({'sampleA' : 'data/sampleA.variants.tsv',
+                                            'sampleB' : self.sampleB,
+                                            'sampleC' : 'data/missing.variants.tsv'})
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_read_sample_variants(self):
+        '''
+        A method to test reading the distinct variants of a sample.
+        '''
+        variants = read_sample_variants('data/sampleA.variants.tsv')
+        self.assertEqual(len(variants), 8, 'repeated variants are read once')
+        self.assertAlmostEqual(variants[(366, 'C', 'T')], 0.535632)
+        self.assertIn((431, 'G', '+TTG'), variants)
+        self.assertNotIn((431, 'G', '+TTG'),
+                         read_sample_variants('data/sampleA.variants.tsv', indel=False))
+
+    def test_build_variant_matrix(self):
+        '''
+        A method to test the CSR arrays of the variant matrix.
+        '''
+        self.assertEqual(self.matrix.samples, ['sampleA', 'sampleB'],
+                         'unreadable files are skipped')
+        self.assertEqual(self.matrix.shape, (2, 9))
+        self.assertEqual(list(self.matrix.indptr), [0, 8, 10])
+        self.assertEqual(list(self.matrix.indices[8:]), [0, 8])
+        self.assertAlmostEqual(self.matrix.data[9], 0.1, places=6)
+        self.assertEqual(self.matrix.get_sample_variants('sampleB'),
+                         [(366, 'C', 'T'), (500, 'A', 'G')])
+
+    def test_queries(self):
+        '''
+        A method to test the site counts, shared and unique variants.
+        '''
+        self.assertEqual(self.matrix.get_site_counts()[0], 2)
+        self.assertEqual(self.matrix.get_variant_samples(366, 'C', 'T'),
+                         ['sampleA', 'sampleB'])
+        self.assertEqual(self.matrix.get_variant_samples(1, 'A', 'T'), [])
+        self.assertEqual(self.matrix.get_recurrent_variants(),
+                         [((366, 'C', 'T'), 2)])
+        unique = self.matrix.get_unique_variants()
+        self.assertEqual(unique['sampleB'], [(500, 'A', 'G')])
+        self.assertEqual(len(unique['sampleA']), 7)
+        output = io.StringIO()
+        write_recurrent_variants(self.matrix, file_p=output)
+        self.assertEqual(output.getvalue().splitlines()[1],
+                         '366\tC\tT\t2\tsampleA,sampleB')
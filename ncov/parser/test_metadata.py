@@ -0,0 +1,62 @@
+'''
+Suite of tests for the ncov.parser.metadata module
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from ncov.parser.metadata import load_metadata, build_metadata_index, \
+    get_sample_metadata, clear_metadata_cache
+
+class TestMetadata(unittest.TestCase):
+    '''
+    A unittest class for the metadata module
+    '''
+    def setUp(self):
+        clear_metadata_cache()
+        self.tmpdir = tempfile.mkdtemp()
+        self.metafile = os.path.join(self.tmpdir, 'metadata.tsv')
+        shutil.copy('data/metadata.tsv', self.metafile)
+
+    def tearDown(self):
+        clear_metadata_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def test_load_metadata(self):
+        '''
+        A method to test the load_metadata function is memoized until the file
+        changes.
+        '''
+        meta_data = load_metadata(file=self.metafile)
+        self.assertEqual(meta_data['sampleA'], {'ct' : '17.4', 'date' : '2020-03-02'})
+        with mock.patch('ncov.parser.metadata._read_metadata') as reader:
+            load_metadata(file=self.metafile)
+            self.assertFalse(reader.called, 'metadata is not read again')
+        with open(self.metafile, 'a') as file_p:
+            file_p.write('sampleC\t25.1\t2020-06-01\n')
+        self.assertEqual(load_metadata(file=self.metafile)['sampleC']['ct'], '25.1')
+
+    def test_get_sample_metadata_index(self):
+        '''
+        A method to test the SQLite index is used when up to date and ignored
+        once the metadata file changes.
+        '''
+        index_file = build_metadata_index(file=self.metafile)
+        self.assertTrue(os.path.exists(index_file), 'index file created')
+        with mock.patch('ncov.parser.metadata.load_metadata') as loader:
+            meta_data = get_sample_metadata(file=self.metafile, sample='sampleB')
+            self.assertFalse(loader.called, 'metadata lookup uses the index')
+        self.assertEqual(meta_data, {'ct' : '18.4', 'date' : '2020-05-03'})
+        with self.assertRaises(KeyError):
+            get_sample_metadata(file=self.metafile, sample='sampleZ')
+        with open(self.metafile, 'a') as file_p:
+            file_p.write('sampleC\t25.1\t2020-06-01\n')
+        self.assertEqual(get_sample_metadata(file=self.metafile, sample='sampleC')['ct'],
+                         '25.1', 'stale index is not used')
+        self.assertEqual(get_sample_metadata(file=self.metafile, sample='sampleC',
+                                             index=True)['date'], '2020-06-01')
+
+
+if __name__ == '__main__':
+    unittest.main()
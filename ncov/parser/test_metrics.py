@@ -0,0 +1,111 @@
+'''
+Suite of tests for the ncov.parser.metrics module
+'''
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from ncov.parser.qc import create_qc_summary_line
+from ncov.parser.cache import ResultCache
+from ncov.parser.fileio import count_io, open_input
+from ncov.parser.metadata import clear_metadata_cache
+from ncov.parser.metrics import MetricsCollector
+from ncov.parser.reference import clear_reference_cache
+from ncov.parser.run import find_sample_files, create_run_qc_summary
+
+class TestMetrics(unittest.TestCase):
+    '''
+    A unittest class for the metrics module
+    '''
+    def setUp(self):
+        clear_reference_cache()
+        clear_metadata_cache()
+        self.files = {'var_file' : 'data/sampleA.variants.tsv',
+                      'qc_file' : 'data/sampleA.qc.csv',
+                      'cov_file' : 'data/sampleA.per_base_coverage.bed',
+                      'meta_file' : 'data/metadata.tsv',
+                      'fasta' : 'data/tester.fa',
+                      'reference' : 'data/tester.fa',
+                      'meta_index' : False}
+
+    def get_records(self, **kwargs):
+        '''
+        Return the stage records of the sampleA summary keyed by stage.
+        '''
+        metrics = MetricsCollector()
+        create_qc_summary_line(**dict(self.files, **kwargs), metrics=metrics)
+        return {record['stage'] : record for record in metrics.records}
+
+    def test_count_io(self):
+        '''
+        A method to test the bytes and lines read through open_input are
+        counted, after decompression for gzip files.
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            gz_file = os.path.join(tmpdir, 'sampleA.per_base_coverage.bed.gz')
+            with open(self.files['cov_file'], 'rb') as in_p, \
+                    gzip.open(gz_file, 'wb') as out_p:
+                shutil.copyfileobj(in_p, out_p)
+            for file in [self.files['cov_file'], gz_file]:
+                with count_io() as counter:
+                    with open_input(file) as file_p:
+                        self.assertEqual(len(file_p.readlines()), 8)
+                self.assertEqual((counter.bytes_read, counter.rows),
+                                 (os.path.getsize(self.files['cov_file']), 8))
+        with open_input(self.files['cov_file']) as file_p:
+            self.assertEqual(file_p.readline()[:14], 'reference_name',
+                             'not counted outside count_io()')
+
+    def test_create_qc_summary_line_metrics(self):
+        '''
+        A method to test the stage metrics of create_qc_summary_line.
+        '''
+        records = self.get_records()
+        self.assertEqual(list(records),
+                         ['variants', 'qc', 'coverage', 'fasta', 'metadata'])
+        self.assertEqual(records['coverage']['rows'], 8, 'lines read')
+        self.assertEqual(records['coverage']['bytes_read'],
+                         os.path.getsize(self.files['cov_file']))
+        for record in records.values():
+            self.assertEqual(record['sample'], 'sampleA')
+            self.assertGreaterEqual(record['seconds'], 0)
+        records = self.get_records()
+        self.assertEqual(records['variants']['bytes_read'],
+                         os.path.getsize(self.files['var_file']),
+                         'the reference is read once per process')
+
+    def test_cache_hit_metrics(self):
+        '''
+        A method to test stages served from the result cache read nothing.
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.get_records(cache=ResultCache(tmpdir))
+            records = self.get_records(cache=ResultCache(tmpdir))
+        for record in records.values():
+            self.assertEqual((record['bytes_read'], record['rows']), (0, 0))
+        self.assertEqual(self.get_records()['qc']['rows'], 2)
+
+    def test_create_run_qc_summary_metrics(self):
+        '''
+        A method to test the stage metrics are returned from the worker
+        processes and written to a JSON file.
+        '''
+        samples = find_sample_files(path='data')
+        metrics = MetricsCollector()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'summary.tsv'), 'w') as file_p:
+                create_run_qc_summary(samples=samples, file_p=file_p,
+                                      meta_file='data/metadata.tsv',
+                                      reference='data/tester.fa',
+                                      workers=2, metrics=metrics)
+            metrics.write_json(os.path.join(tmpdir, 'metrics.json'))
+            with open(os.path.join(tmpdir, 'metrics.json')) as file_p:
+                data = json.load(file_p)
+        self.assertEqual(len(data['records']), 5, 'one record per stage')
+        self.assertEqual(data['totals']['coverage']['rows'], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
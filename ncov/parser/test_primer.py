@@ -0,0 +1,81 @@
+'''
+Suite of tests for the ncov.parser.primer module
+'''
+import os
+import tempfile
+import unittest
+from ncov.parser.primer import read_primer_scheme, load_primer_index, \
+    get_amplicon_overlaps, clear_primer_cache
+from ncov.parser.qc import get_total_variants
+
+class TestPrimer(unittest.TestCase):
+    '''
+    A unittest class for the primer module
+    '''
+    def setUp(self):
+        clear_primer_cache()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.scheme = os.path.join(self.tmpdir.name, 'nCoV-2019.primer.bed')
+        with open(self.scheme, 'w') as file_p:
+            file_p.write('MN908947.3\t340\t370\tnCoV-2019_1_LEFT\tnCoV-2019_1\t+\n')
+            file_p.write('MN908947.3\t442\t460\tnCoV-2019_1_RIGHT\tnCoV-2019_1\t-\n')
+            file_p.write('MN908947.3\t400\t420\tnCoV-2019_2_LEFT\tnCoV-2019_2\t+\n')
+            file_p.write('MN908947.3\t395\t420\tnCoV-2019_2_LEFT_alt1\tnCoV-2019_2\t+\n')
+            file_p.write('MN908947.3\t500\t520\tnCoV-2019_2_RIGHT\tnCoV-2019_2\t-\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        clear_primer_cache()
+
+    def test_read_primer_scheme(self):
+        '''
+        A method to test reading the primers and their amplicons.
+        '''
+        primers = read_primer_scheme(self.scheme)
+        self.assertEqual(len(primers), 5)
+        self.assertEqual(primers[0]['start'], 341)
+        self.assertEqual(primers[0]['end'], 370)
+        self.assertEqual(primers[3]['amplicon'], 'nCoV-2019_2')
+        self.assertEqual(primers[3]['side'], 'LEFT')
+
+    def test_get_amplicon_overlaps(self):
+        '''
+        A method to test the regions covered by more than one amplicon.
+        '''
+        self.assertEqual(get_amplicon_overlaps([(1, 100), (90, 200), (150, 300)]),
+                         [(90, 100), (150, 200)])
+        self.assertEqual(get_amplicon_overlaps([(1, 100), (101, 200)]), [])
+
+    def test_primer_index(self):
+        '''
+        A method to test the primer site and amplicon overlap lookups.
+        '''
+        index = load_primer_index(self.scheme)
+        self.assertEqual(index.primer_starts, [341, 396, 443, 501])
+        self.assertEqual(index.primer_ends, [370, 420, 460, 520])
+        self.assertEqual(index.overlap_starts, [396])
+        self.assertEqual(index.overlap_ends, [460])
+        self.assertTrue(index.in_primer_site(341))
+        self.assertFalse(index.in_primer_site(340))
+        self.assertFalse(index.in_primer_site(430))
+        self.assertTrue(index.in_amplicon_overlap(460))
+        self.assertFalse(index.in_amplicon_overlap(461))
+        self.assertIs(load_primer_index(self.scheme), index, 'cached per scheme')
+
+    def test_get_total_variants_primer_scheme(self):
+        '''
+        A method to test the primer site and amplicon overlap variant counts.
+        '''
+        variants = get_total_variants(file='data/sampleA.variants.tsv',
+                                      reference=None,
+                                      indel=True,
+                                      primer_scheme=self.scheme)
+        self.assertEqual(variants['total_variant_primer_site'], 2)
+        self.assertEqual(variants['total_variant_amplicon_overlap'], 9)
+        variants = get_total_variants(file='data/sampleA.variants.tsv',
+                                      reference=None,
+                                      primer_scheme=self.scheme)
+        self.assertEqual(variants['total_variant_amplicon_overlap'], 8)
+        self.assertNotIn('total_variant_primer_site',
+                         get_total_variants(file='data/sampleA.variants.tsv',
+                                            reference=None))
@@ -1,11 +1,16 @@
 '''
 Suite of tests for test for the ncov.parser.qc module
 '''
+import os
+import random
+import tempfile
 import unittest
+from ncov.parser.matrix import read_sample_variants
 from ncov.parser.qc import is_indel, get_total_variants, is_variant_n, \
     get_qc_data, import_ct_data, create_qc_summary_line, \
     count_iupac_in_fasta, get_fasta_sequence_length, is_base_masked, \
-    is_indel_triplet
+    is_indel_triplet, is_variant_iupac, collect_qc_summary_data, \
+    iter_qc_summary_data
 
 class TestQc(unittest.TestCase):
     '''
@@ -45,6 +50,59 @@ class TestQc(unittest.TestCase):
                          10,
                          '10 variants')
 
+    def test_count_variants_classification(self):
+        '''
+        A method to test the get_total_variants function counts match a row by
+        row classification using is_base_masked and is_indel_triplet.
+        '''
+        rand = random.Random(11)
+        alts = ['A', 'C', 'N', 'R', '+A', '-AT', '+TTG', '-ACGTAC', '+NRA']
+        rows = [(rand.randint(1, 129), rand.choice(alts)) for _ in range(500)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            var_file = os.path.join(tmpdir, 'sample.variants.tsv')
+            with open(var_file, 'w') as file_p:
+                file_p.write('REGION\tPOS\tREF\tALT\tREF_DP\n')
+                for pos, alt in rows:
+                    file_p.write('ref\t%d\tA\t%s\t10\n' % (pos, alt))
+            for indel in [True, False]:
+                counted = [(pos, alt) for pos, alt in rows if len(alt) == 1 or indel]
+                masked = [(pos, alt) for pos, alt in counted
+                          if is_base_masked(pos=pos, end=129, mask_start=10, mask_end=10)]
+                total_variants = get_total_variants(file=var_file,
+                                                    reference='data/tester.fa',
+                                                    mask_start=10, mask_end=10,
+                                                    indel=indel)
+                self.assertEqual(total_variants['total_variants'], len(counted))
+                self.assertEqual(total_variants['total_snv_masked'],
+                                 len([alt for _, alt in masked if len(alt) == 1]))
+                self.assertEqual(total_variants['total_indel_masked'],
+                                 len([alt for _, alt in masked if len(alt) > 1]))
+                self.assertEqual(total_variants['total_indel_triplet'],
+                                 len([alt for _, alt in counted
+                                      if len(alt) > 1 and is_indel_triplet(alt)]))
+                self.assertEqual(total_variants['total_variant_n'],
+                                 len([alt for _, alt in counted if is_variant_n(alt)]))
+                self.assertEqual(total_variants['total_variant_iupac'],
+                                 len([alt for _, alt in counted if is_variant_iupac(alt)]))
+
+    def test_count_variants_empty_file(self):
+        '''
+        A method to test an empty variants file or one without a POS column
+        has no variants.
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            var_file = os.path.join(tmpdir, 'sample.variants.tsv')
+            for text in ['', 'REGION\tREF\tALT\n']:
+                with open(var_file, 'w') as file_p:
+                    file_p.write(text)
+                total_variants = get_total_variants(file=var_file,
+                                                    reference='data/tester.fa',
+                                                    indel=True)
+                self.assertEqual(total_variants['total_variants'], 0)
+                self.assertEqual(total_variants['total_snv'], 0)
+                self.assertEqual(total_variants['genome_length'], 129)
+                self.assertEqual(read_sample_variants(var_file), {})
+
     def test_is_variant_n_success(self):
         '''
         A method to test the is_variant_n function, should pass.
@@ -95,8 +153,8 @@ class TestQc(unittest.TestCase):
                                             fasta=fasta)
         self.assertEqual(qc_summary['sample_name'], 'sampleA', 'Sample name correctly identified \
                          as: sampleA')
-        self.assertEqual(qc_summary['pct_n_bases'], '31.29', 'pct_n_bases is 31.29')
-        self.assertEqual(qc_summary['pct_covered_bases'], '68.01', 'pct_covered_bases is 68.01')
+        self.assertEqual(qc_summary['pct_n_bases'], 31.29, 'pct_n_bases is 31.29')
+        self.assertEqual(qc_summary['pct_covered_bases'], 68.01, 'pct_covered_bases is 68.01')
         self.assertEqual(qc_summary['total_variants'], 10, 'total_variants is correct')
         self.assertEqual(qc_summary['total_snv'], 9, 'total_snv is correct')
         self.assertEqual(qc_summary['total_indel'], 1, 'total_indel is correct')
@@ -104,7 +162,7 @@ class TestQc(unittest.TestCase):
         self.assertEqual(qc_summary['total_iupac'], 9, 'total_iupac is correct')
         self.assertEqual(qc_summary['mean_depth'], 679.4, 'mean_depth is correct')
         self.assertEqual(qc_summary['median_depth'], 682, 'median_depth is correct')
-        self.assertEqual(qc_summary['ct'], '17.4', 'ct value is correct')
+        self.assertEqual(qc_summary['ct'], 17.4, 'ct value is correct')
         self.assertEqual(qc_summary['date'], '2020-03-02', 'ct value is correct')
         self.assertEqual(qc_summary['qc_pass'], 'FALSE', 'qc_pass is correct')
 
@@ -123,8 +181,8 @@ class TestQc(unittest.TestCase):
                                             fasta=fasta)
         self.assertEqual(qc_summary['sample_name'], 'sampleA', \
                                     'Sample name correctly identified as: sampleA')
-        self.assertEqual(qc_summary['pct_n_bases'], '31.29', 'pct_n_bases is 31.29')
-        self.assertEqual(qc_summary['pct_covered_bases'], '68.01', \
+        self.assertEqual(qc_summary['pct_n_bases'], 31.29, 'pct_n_bases is 31.29')
+        self.assertEqual(qc_summary['pct_covered_bases'], 68.01, \
                                     'pct_covered_bases is 68.01')
         self.assertEqual(qc_summary['total_variants'], 10, 'total_variants is correct')
         self.assertEqual(qc_summary['total_snv'], 9, 'total_snv is correct')
@@ -133,7 +191,7 @@ class TestQc(unittest.TestCase):
         self.assertEqual(qc_summary['total_iupac'], 9, 'total_iupac is correct')
         self.assertEqual(qc_summary['mean_depth'], 679.4, 'mean_depth is correct')
         self.assertEqual(qc_summary['median_depth'], 682, 'median_depth is correct')
-        self.assertEqual(qc_summary['ct'], 'NA', 'ct value is correct')
+        self.assertIsNone(qc_summary['ct'], 'ct value is missing')
         self.assertEqual(qc_summary['qc_pass'], 'FALSE', 'qc_pass is correct')
 
     def test_count_iupac_in_fasta(self):
@@ -184,6 +242,20 @@ class TestQc(unittest.TestCase):
         self.assertFalse(is_indel_triplet(variant_fail), 'variant is not a triplet')
         self.assertTrue(is_indel_triplet(variant_succeed), 'variant is a triplet')
 
+    def test_collect_qc_summary_data(self):
+        '''
+        A method to test the collect_qc_summary_data function, with and without
+        threads.
+        '''
+        data = collect_qc_summary_data(path='data')
+        self.assertEqual(len(data), 3, '3 sample summary lines')
+        self.assertFalse([line for line in data if line.startswith('sample_name')],
+                         'headers are skipped')
+        self.assertEqual(sorted(collect_qc_summary_data(path='data', threads=2)),
+                         sorted(data))
+        summary_data = iter_qc_summary_data(path='data')
+        self.assertTrue(next(summary_data).startswith('sample'), 'lines are streamed')
+
 
 if __name__ == '__main__':
     unittest.main()
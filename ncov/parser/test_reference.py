@@ -0,0 +1,63 @@
+'''
+Suite of tests for the ncov.parser.reference module
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from ncov.parser.reference import get_reference_info, clear_reference_cache
+from ncov.parser.fasta import get_record_lengths
+
+class TestReference(unittest.TestCase):
+    '''
+    A unittest class for the reference module
+    '''
+    def setUp(self):
+        clear_reference_cache()
+
+    def test_get_record_lengths(self):
+        '''
+        A method to test the get_record_lengths function.
+        '''
+        self.assertEqual(get_record_lengths('data/tester.fa'), [('tester', 129)])
+
+    def test_get_reference_info(self):
+        '''
+        A method to test the get_reference_info function and that repeated
+        lookups are served from the in-process cache.
+        '''
+        info = get_reference_info(reference='data/tester.fa', mask_start=10,
+                                  mask_end=10)
+        self.assertEqual(info['genome_length'], 129, 'genome_length is correct')
+        self.assertEqual(info['mask_boundaries'], (11, 119), 'mask boundaries are correct')
+        with mock.patch('ncov.parser.reference.get_record_lengths') as parser:
+            info = get_reference_info(reference='data/tester.fa')
+            self.assertFalse(parser.called, 'reference is not parsed again')
+        self.assertEqual(info['mask_boundaries'], (101, 79))
+
+    def test_reference_sidecar(self):
+        '''
+        A method to test the on-disk sidecar is reused by a new process and
+        invalidated when the reference changes.
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reference = os.path.join(tmpdir, 'reference.fa')
+            cache_dir = os.path.join(tmpdir, 'cache')
+            shutil.copy('data/tester.fa', reference)
+            get_reference_info(reference=reference, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1, 'sidecar file written')
+            clear_reference_cache()
+            with mock.patch('ncov.parser.reference.get_record_lengths') as parser:
+                info = get_reference_info(reference=reference, cache_dir=cache_dir)
+                self.assertFalse(parser.called, 'sidecar is used')
+            self.assertEqual(info['record_lengths'], [('tester', 129)])
+            clear_reference_cache()
+            with open(reference, 'a') as file_p:
+                file_p.write('ACGT\n')
+            info = get_reference_info(reference=reference, cache_dir=cache_dir)
+            self.assertEqual(info['genome_length'], 133, 'stale sidecar is ignored')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+'''
+Suite of tests for the ncov.parser.run module
+'''
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from ncov.parser.qc import create_qc_summary_line, write_qc_summary, \
+    write_qc_summary_header
+from ncov.parser.run import find_sample_files, create_run_qc_summary
+from ncov.parser.shard import parse_shard, is_sample_in_shard, get_sample_name
+
+class TestRun(unittest.TestCase):
+    '''
+    A unittest class for the run module
+    '''
+    def test_find_sample_files(self):
+        '''
+        A method to test the find_sample_files function.
+        '''
+        samples = find_sample_files(path='data')
+        self.assertEqual(list(samples.keys()), ['sampleA'], 'only sampleA is complete')
+        self.assertEqual(samples['sampleA']['cov_file'],
+                         'data/sampleA.per_base_coverage.bed')
+        self.assertIsNone(samples['sampleA']['fasta'], 'no consensus FASTA')
+        samples = find_sample_files(path='data', qc_dir='missing', require_qc=False)
+        self.assertEqual(list(samples.keys()), ['sampleA'])
+        self.assertIsNone(samples['sampleA']['qc_file'])
+
+    def test_shard(self):
+        '''
+        A method to test samples are assigned to exactly one shard.
+        '''
+        self.assertEqual(parse_shard('1/4'), (1, 4))
+        for shard in ['4/4', '1', 'a/b', '0/0']:
+            with self.assertRaises(ValueError):
+                parse_shard(shard)
+        samples = ['sample%d' % i for i in range(100)]
+        shards = [[sample for sample in samples if is_sample_in_shard(sample, (i, 4))]
+                  for i in range(4)]
+        self.assertEqual(sorted(sum(shards, [])), sorted(samples))
+        self.assertTrue(all(shards), 'every shard has samples')
+        self.assertEqual(len([shard for shard in range(4)
+                              if find_sample_files(path='data', shard=(shard, 4))]), 1)
+
+    def test_sample_name_key(self):
+        '''
+        A method to test samples are sharded and ordered by the sample_name of
+        their QC file rather than the file name prefix.
+        '''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for prefix, sample_name in [('a', 'sample2'), ('b', 'sample1')]:
+                for suffix in ['.variants.tsv', '.per_base_coverage.bed']:
+                    shutil.copy('data/sampleA' + suffix, os.path.join(tmpdir, prefix + suffix))
+                with open(os.path.join(tmpdir, prefix + '.qc.csv'), 'w') as file_p:
+                    file_p.write('sample_name,pct_N_bases,pct_covered_bases,qc_pass\n')
+                    file_p.write('%s,1.0,99.0,TRUE\n' % sample_name)
+            self.assertEqual(list(find_sample_files(path=tmpdir)), ['b', 'a'])
+            shard = (zlib.crc32(b'sample2') % 5, 5)
+            self.assertNotEqual(shard[0], zlib.crc32(b'a') % 5)
+            self.assertEqual(list(find_sample_files(path=tmpdir, shard=shard)), ['a'])
+            self.assertEqual(get_sample_name(os.path.join(tmpdir, 'a.qc.csv')), 'sample2')
+            self.assertEqual(get_sample_name(os.path.join(tmpdir, 'c.qc.csv'), 'c'), 'c')
+
+    def test_create_run_qc_summary(self):
+        '''
+        A method to test the create_run_qc_summary function matches the
+        single sample output, both in process and with a worker pool.
+        '''
+        expected = io.StringIO()
+        write_qc_summary_header(file_p=expected)
+        write_qc_summary(summary=create_qc_summary_line(
+            var_file='data/sampleA.variants.tsv',
+            qc_file='data/sampleA.qc.csv',
+            cov_file='data/sampleA.per_base_coverage.bed',
+            meta_file='data/metadata.tsv',
+            reference='data/tester.fa'), file_p=expected)
+        samples = find_sample_files(path='data')
+        for workers in [1, 2]:
+            output = io.StringIO()
+            total = create_run_qc_summary(samples=samples,
+                                          file_p=output,
+                                          meta_file='data/metadata.tsv',
+                                          reference='data/tester.fa',
+                                          workers=workers)
+            self.assertEqual(total, 1, '1 sample written')
+            self.assertEqual(output.getvalue(), expected.getvalue())
+
+    def test_create_run_qc_summary_consensus(self):
+        '''
+        A method to test reading each sample from a multi-FASTA consensus file
+        of the run.
+        '''
+        expected = io.StringIO()
+        write_qc_summary_header(file_p=expected)
+        write_qc_summary(summary=create_qc_summary_line(
+            var_file='data/sampleA.variants.tsv',
+            qc_file='data/sampleA.qc.csv',
+            cov_file='data/sampleA.per_base_coverage.bed',
+            fasta='data/tester.fa'), file_p=expected)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            consensus = os.path.join(tmpdir, 'run.consensus.fa')
+            with open('data/tester.fa') as tester_p, open(consensus, 'w') as file_p:
+                file_p.write('>sampleB\nNNNNRYRY\n>sampleA\n')
+                file_p.writelines(tester_p.readlines()[1:])
+            output = io.StringIO()
+            create_run_qc_summary(samples=find_sample_files(path='data'),
+                                  file_p=output,
+                                  workers=1,
+                                  consensus_fasta=consensus)
+        self.assertEqual(output.getvalue(), expected.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
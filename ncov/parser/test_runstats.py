@@ -0,0 +1,83 @@
+'''
+Suite of tests for the ncov.parser.runstats module
+'''
+import os
+import statistics
+import tempfile
+import unittest
+import numpy as np
+from ncov.parser.qc import write_qc_summary, write_qc_summary_header
+from ncov.parser.runstats import load_run_summary, get_run_stats, \
+    get_date_stats, get_outliers, get_rank, get_correlation
+
+class TestRunstats(unittest.TestCase):
+    '''
+    A unittest class for the runstats module
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.tmpdir.name, 'run.summary.qc.tsv')
+        self.mean_depth = [100, 110, 120, 130, 140, 150, 160, 170, 180, 5000]
+        with open(self.file, 'w') as file_p:
+            write_qc_summary_header(file_p=file_p)
+            for i, mean_depth in enumerate(self.mean_depth):
+                write_qc_summary({'sample_name' : 'sample%d' % i,
+                                  'pct_n_bases' : i * 2.5,
+                                  'mean_depth' : mean_depth,
+                                  'ct' : 'NA' if i == 0 else 15 + i,
+                                  'date' : '2020-03-0%d' % (1 + i % 2),
+                                  'qc_pass' : 'TRUE' if i < 7 else 'FALSE'},
+                                 file_p=file_p)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_run_stats(self):
+        '''
+        A method to test the get_run_stats function.
+        '''
+        stats = get_run_stats(load_run_summary(self.file))
+        self.assertEqual(stats['samples'], 10)
+        self.assertEqual(stats['qc_pass'], 7)
+        self.assertEqual(stats['pass_rate'], 0.7)
+        mean_depth = stats['columns']['mean_depth']
+        self.assertEqual(mean_depth['median'], statistics.median(self.mean_depth))
+        self.assertEqual(mean_depth['max'], 5000)
+        self.assertEqual(stats['columns']['ct']['n'], 9, 'missing ct is ignored')
+        self.assertIsNone(stats['columns']['total_n']['mean'], 'no values')
+        self.assertEqual(stats['outliers']['mean_depth'], ['sample9'])
+        self.assertAlmostEqual(stats['n_vs_ct']['pearson'], 1)
+        self.assertAlmostEqual(stats['n_vs_ct']['spearman'], 1)
+
+    def test_get_date_stats(self):
+        '''
+        A method to test the get_date_stats function.
+        '''
+        date_stats = get_date_stats(load_run_summary(self.file))
+        self.assertEqual([row['date'] for row in date_stats],
+                         ['2020-03-01', '2020-03-02'])
+        self.assertEqual(date_stats[0]['samples'], 5)
+        self.assertEqual(date_stats[0]['qc_pass'], 4)
+        self.assertEqual(date_stats[0]['median_mean_depth'],
+                         statistics.median(self.mean_depth[0::2]))
+        self.assertEqual(date_stats[1]['median_mean_depth'],
+                         statistics.median(self.mean_depth[1::2]))
+        self.assertEqual(date_stats[0]['median_ct'], 20, 'missing ct is ignored')
+        self.assertIsNone(date_stats[0]['median_total_n'])
+
+    def test_helpers(self):
+        '''
+        A method to test the outlier, rank and correlation functions.
+        '''
+        values = np.array([1, 2, 3, 4, np.nan, 100], dtype=np.float64)
+        self.assertEqual(get_outliers(values).tolist(),
+                         [False, False, False, False, False, True])
+        self.assertEqual(get_rank(np.array([3.0, 1.0, 3.0, 2.0])).tolist(),
+                         [2.5, 0.0, 2.5, 1.0])
+        correlation = get_correlation(np.array([1.0, 2.0, 3.0]),
+                                      np.array([5.0, 5.0, 5.0]))
+        self.assertIsNone(correlation['pearson'], 'constant column')
+
+
+if __name__ == '__main__':
+    unittest.main()
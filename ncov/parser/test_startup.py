@@ -0,0 +1,77 @@
+'''
+Suite of tests for the cold start import cost of the bin scripts
+'''
+import os
+import subprocess
+import sys
+import unittest
+
+# total import time allowed for a script invocation in microseconds, importing
+# Biopython alone takes longer than this
+IMPORT_BUDGET = 150000
+HEAVY_MODULES = ['Bio', 'numpy', 'concurrent.futures']
+
+def get_import_times(args):
+    '''
+    Run a bin script with "python -X importtime" and return a dictionary of
+    the cumulative import time of each module in microseconds.  Names keep
+    their indentation, two spaces per level, so top level modules have none.
+    '''
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=root)
+    env.pop('NCOV_PARSER_COVERAGE_BACKEND', None)
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                             cwd=root, env=env, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True,
+                             check=True)
+    import_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        cumulative, name = line.split('|')[1:3]
+        # drop the single space separating the name from the "|"
+        import_times[name.rstrip()[1:]] = int(cumulative)
+    return import_times
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime requires Python 3.7')
+class TestStartup(unittest.TestCase):
+    '''
+    A unittest class for the import time of the bin scripts
+    '''
+    def assert_import_light(self, import_times):
+        '''
+        Check that no heavy modules were imported and the total import time is
+        within budget.
+        '''
+        for name in import_times:
+            module = name.strip()
+            for heavy_module in HEAVY_MODULES:
+                self.assertFalse(module == heavy_module or
+                                 module.startswith(heavy_module + '.'),
+                                 '%s should not be imported' % module)
+        top_level = [cumulative for name, cumulative in import_times.items()
+                     if not name.startswith(' ')]
+        self.assertTrue(top_level, 'top level modules were found')
+        total = sum(top_level)
+        self.assertLess(total, IMPORT_BUDGET, 'import time is within budget')
+
+    def test_get_qc_summary_help(self):
+        '''
+        A method to test the import cost of get_qc_summary.py --help.
+        '''
+        self.assert_import_light(get_import_times(['bin/get_qc_summary.py', '--help']))
+
+    def test_get_qc_summary_coverage_only(self):
+        '''
+        A method to test the import cost of get_qc_summary.py without FASTA
+        files.
+        '''
+        self.assert_import_light(get_import_times([
+            'bin/get_qc_summary.py',
+            '--qc', 'data/sampleA.qc.csv',
+            '--variants', 'data/sampleA.variants.tsv',
+            '--coverage', 'data/sampleA.per_base_coverage.bed']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+'''
+Suite of tests for the ncov.parser.summary module
+'''
+import io
+import os
+import pickle
+import tempfile
+import unittest
+from ncov.parser.qc import create_qc_summary_line, write_qc_summary
+from ncov.parser.summary import QCSummary, QC_SUMMARY_COLUMNS, to_column_type
+
+class TestSummary(unittest.TestCase):
+    '''
+    A unittest class for the summary module
+    '''
+    def setUp(self):
+        self.summary = create_qc_summary_line(var_file='data/sampleA.variants.tsv',
+                                              qc_file='data/sampleA.qc.csv',
+                                              cov_file='data/sampleA.per_base_coverage.bed',
+                                              meta_file='data/metadata.tsv',
+                                              fasta='data/tester.fa',
+                                              reference='data/tester.fa')
+
+    def test_to_column_type(self):
+        '''
+        A method to test the to_column_type function.
+        '''
+        self.assertEqual(to_column_type('31.29', float), 31.29)
+        self.assertIs(type(to_column_type('682', float)), int, 'integral text stays an int')
+        self.assertIs(type(to_column_type(1666.0, float)), float)
+        self.assertEqual(to_column_type('3.0', int), 3)
+        self.assertIsNone(to_column_type(3.5, int), 'no truncation')
+        self.assertIsNone(to_column_type('679.4', int), 'non-integral text is missing')
+        self.assertIsNone(to_column_type('NA', float))
+        self.assertIsNone(to_column_type('x', int))
+        self.assertIsNone(to_column_type(float('nan'), float))
+        self.assertEqual(to_column_type(5, str), '5')
+
+    def test_qc_summary(self):
+        '''
+        A method to test the QCSummary record types and mapping interface.
+        '''
+        summary = self.summary
+        self.assertIsInstance(summary, QCSummary)
+        self.assertFalse(hasattr(summary, '__dict__'), 'slots only')
+        self.assertEqual(summary.pct_n_bases, 31.29)
+        self.assertEqual(summary['total_variants'], 10)
+        self.assertEqual(summary['genome_length'], 129, 'extra keys are kept')
+        self.assertEqual(list(summary)[:len(QC_SUMMARY_COLUMNS)], QC_SUMMARY_COLUMNS)
+        self.assertEqual(summary.get('unknown', 'NA'), 'NA')
+        self.assertIn('ct', summary)
+        self.assertEqual(dict(summary)['date'], '2020-03-02')
+        summary['ct'] = 'NA'
+        self.assertIsNone(summary.ct)
+        self.assertEqual(summary.to_row()[QC_SUMMARY_COLUMNS.index('ct')], 'NA')
+
+    def test_to_row_from_row(self):
+        '''
+        A method to test converting a summary to and from a row.
+        '''
+        row = self.summary.to_row()
+        self.assertEqual(len(row), len(QC_SUMMARY_COLUMNS))
+        self.assertEqual(row[:3], ['sampleA', '31.29', '68.01'])
+        summary = QCSummary.from_row(row)
+        self.assertEqual(summary.to_row(), row)
+        row[1:3] = ['31.290', '6.801e1']
+        summary = QCSummary.from_row(row)
+        self.assertEqual(summary.pct_n_bases, 31.29)
+        self.assertEqual(summary.to_row(), row, 'float text is kept')
+        self.assertEqual(pickle.loads(pickle.dumps(summary)).to_row(), row)
+        self.assertEqual(QCSummary.from_row(row[:16]).pct_depth_1x, None,
+                         'missing trailing columns')
+        copy = pickle.loads(pickle.dumps(self.summary))
+        self.assertEqual(copy, self.summary, 'pickled summaries are equal')
+
+    def test_source_text(self):
+        '''
+        A method to test the qc.csv and metadata text is written unchanged,
+        including a ct that is not a number.
+        '''
+        with tempfile.TemporaryDirectory() as tmp:
+            qc_file = os.path.join(tmp, 'sampleA.qc.csv')
+            meta_file = os.path.join(tmp, 'metadata.tsv')
+            with open('data/sampleA.qc.csv') as file_p:
+                text = file_p.read().replace('31.29,68.01', '31.290,68.10')
+            with open(qc_file, 'w') as file_p:
+                file_p.write(text)
+            for ct in ['17.40', 'Undetermined']:
+                with open(meta_file, 'w') as file_p:
+                    file_p.write('sample\tct\tdate\nsampleA\t%s\t2020-03-02\n' % ct)
+                summary = create_qc_summary_line(var_file='data/sampleA.variants.tsv',
+                                                 qc_file=qc_file,
+                                                 cov_file='data/sampleA.per_base_coverage.bed',
+                                                 meta_file=meta_file,
+                                                 fasta='data/tester.fa',
+                                                 reference='data/tester.fa')
+                output = io.StringIO()
+                write_qc_summary(summary, file_p=output)
+                row = output.getvalue().rstrip('\n').split('\t')
+                self.assertEqual(row[1:3], ['31.290', '68.10'])
+                self.assertEqual(row[QC_SUMMARY_COLUMNS.index('ct')], ct)
+                self.assertEqual(QCSummary.from_row(row).to_row(), row)
+        self.assertEqual(summary.pct_n_bases, 31.29)
+
+    def test_summary_text(self):
+        '''
+        A method to test setting text keeps the text.
+        '''
+        summary = QCSummary({'ct' : '17.40', 'mean_depth' : '20'})
+        self.assertEqual(summary.ct, 17.4)
+        self.assertEqual(summary.to_row()[QC_SUMMARY_COLUMNS.index('ct')], '17.40')
+        summary['ct'] = 'Undetermined'
+        self.assertEqual(summary.ct, 'Undetermined')
+        self.assertIs(type(summary.mean_depth), int)
+
+
+if __name__ == '__main__':
+    unittest.main()
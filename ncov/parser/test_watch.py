@@ -0,0 +1,72 @@
+'''
+Suite of tests for the ncov.parser.watch module
+'''
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from ncov.parser.collect import read_summary_rows
+from ncov.parser.watch import RunWatcher
+
+class TestWatch(unittest.TestCase):
+    '''
+    A unittest class for the watch module
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmpdir, 'run.summary.qc.tsv')
+        self.watcher = RunWatcher(path=self.tmpdir, output=self.output, settle=30,
+                                  options={'meta_file' : 'data/metadata.tsv',
+                                           'reference' : 'data/tester.fa'})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def add_sample(self, sample, files=('variants.tsv', 'qc.csv', 'per_base_coverage.bed')):
+        '''
+        Copy the sampleA files to the run directory under a new sample name.
+        '''
+        for suffix in files:
+            shutil.copy('data/sampleA.%s' % suffix,
+                        os.path.join(self.tmpdir, '%s.%s' % (sample, suffix)))
+
+    def test_poll(self):
+        '''
+        A method to test samples are summarized once their files settle and
+        the run summary is updated when samples change or are removed.
+        '''
+        self.add_sample('sample1', files=('variants.tsv', 'qc.csv'))
+        changes = self.watcher.poll(now=time.time() + 60)
+        self.assertEqual(changes['updated'], [], 'incomplete sample is skipped')
+        self.assertTrue(os.path.exists(self.output), 'empty summary is written')
+        self.add_sample('sample1')
+        changes = self.watcher.poll()
+        self.assertEqual(changes['pending'], ['sample1'], 'files have not settled')
+        self.assertEqual(self.watcher.poll(now=time.time() + 60)['updated'], ['sample1'])
+        self.assertEqual(self.watcher.poll(now=time.time() + 60)['updated'], [],
+                         'unchanged samples are not summarized again')
+        self.add_sample('sample2')
+        self.assertEqual(self.watcher.poll(now=time.time() + 60)['updated'], ['sample2'])
+        rows = dict(read_summary_rows(self.output))
+        self.assertEqual(sorted(rows), ['sampleA'], 'sample name from the qc file')
+        self.assertEqual(len(self.watcher.summaries), 2)
+        os.remove(os.path.join(self.tmpdir, 'sample1.qc.csv'))
+        self.assertEqual(self.watcher.poll(now=time.time() + 60)['removed'], ['sample1'])
+        self.assertEqual(sorted(self.watcher.summaries), ['sample2'])
+
+    def test_run(self):
+        '''
+        A method to test the run method with a single iteration.
+        '''
+        self.watcher.settle = 0
+        self.add_sample('sample1')
+        self.watcher.run(interval=0, iterations=1)
+        with open(self.output) as file_p:
+            lines = file_p.readlines()
+        self.assertEqual(len(lines), 2, 'header and one sample')
+        self.assertTrue(lines[1].startswith('sampleA\t31.29'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+'''
+Suite of tests for the ncov.parser.writer module
+'''
+import math
+import os
+import tempfile
+import unittest
+from ncov.parser.qc import create_qc_summary_line
+from ncov.parser.writer import get_summary_writer, get_output_format, \
+    read_summary, MISSING_INT
+
+try:
+    import pyarrow
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+class TestWriter(unittest.TestCase):
+    '''
+    A unittest class for the writer module
+    '''
+    def setUp(self):
+        self.summary = create_qc_summary_line(
+            var_file='data/sampleA.variants.tsv',
+            qc_file='data/sampleA.qc.csv',
+            cov_file='data/sampleA.per_base_coverage.bed',
+            meta_file='data/metadata.tsv',
+            fasta='data/tester.fa')
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def check_columns(self, columns):
+        '''
+        Check the typed columns read back from a summary file.
+        '''
+        self.assertEqual(list(columns['sample_name']), ['sampleA', 'sampleA'])
+        self.assertEqual(columns['pct_n_bases'][0], 31.29, 'pct_n_bases is a float')
+        self.assertEqual(columns['total_variants'][0], 10, 'total_variants is correct')
+        self.assertEqual(columns['median_depth'][1], 682.0, 'median_depth is correct')
+        self.assertEqual(columns['ct'][0], 17.4, 'ct is a float')
+        self.assertTrue(math.isnan(columns['ct'][1]), 'missing ct is NaN')
+        self.assertEqual(columns['date'][0], '2020-03-02', 'date is correct')
+
+    def write_summaries(self, output, output_format=None):
+        '''
+        Write the sample summary twice, the second time without metadata.
+        '''
+        with get_summary_writer(output=output, output_format=output_format) as writer:
+            writer.write(self.summary)
+            writer.write(dict(self.summary, ct='NA', date='NA'))
+
+    def test_tsv_writer(self):
+        '''
+        A method to test the TSV writer output is read back into typed columns.
+        '''
+        output = os.path.join(self.tmpdir.name, 'run.summary.qc.tsv')
+        self.write_summaries(output)
+        self.check_columns(read_summary(output))
+
+    def test_npz_writer(self):
+        '''
+        A method to test the .npz writer.
+        '''
+        output = os.path.join(self.tmpdir.name, 'run.summary.qc.npz')
+        self.write_summaries(output)
+        columns = read_summary(output)
+        self.check_columns(columns)
+        self.assertEqual(columns['total_snv'].dtype.kind, 'i', 'integer column')
+
+    @unittest.skipUnless(HAS_PYARROW, 'requires pyarrow')
+    def test_parquet_writer(self):
+        '''
+        A method to test the Parquet writer.
+        '''
+        output = os.path.join(self.tmpdir.name, 'run.summary.qc.parquet')
+        self.write_summaries(output)
+        self.check_columns(read_summary(output))
+
+    def test_get_output_format(self):
+        '''
+        A method to test the output format is determined from the extension.
+        '''
+        self.assertEqual(get_output_format('run.tsv'), 'tsv')
+        self.assertEqual(get_output_format('run.npz'), 'npz')
+        self.assertEqual(get_output_format('run.parquet'), 'parquet')
+        self.assertEqual(get_output_format('run', 'columnar'),
+                         'parquet' if HAS_PYARROW else 'npz')
+        with self.assertRaises(ValueError):
+            get_summary_writer(output=None, output_format='npz')
+
+    def test_missing_int(self):
+        '''
+        A method to test missing integers are not confused with zero counts.
+        '''
+        self.assertNotEqual(MISSING_INT, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+'''
+Keep the run QC summary up to date while the samples of a run are written.
+The run directories are polled, or watched with inotify when the
+inotify_simple package is installed, for complete sets of sample files.  Each
+sample is summarized once with create_qc_summary_line() in the long running
+process, so the reference and metadata caches stay warm, and the run summary
+is replaced atomically after every change.
+'''
+
+import os
+import sys
+import time
+from ncov.parser.fileio import get_file_key, write_atomic
+from ncov.parser.qc import create_qc_summary_line, write_qc_summary, \
+    write_qc_summary_header
+from ncov.parser.run import find_sample_files
+
+
+def get_sample_key(sample_files, shared_files=()):
+    '''
+    Return the key identifying the current version of the files of a sample.
+
+    Arguments:
+        * sample_files: dictionary of sample files as returned by
+                        find_sample_files()
+        * shared_files: files used by every sample, for example the metadata
+                        file, a change summarizes every sample again
+
+    Return Value:
+        Returns a tuple of file keys, see get_file_key(), or None when a file
+        was removed
+    '''
+    files = [file for file in list(sample_files.values()) + list(shared_files)
+             if file is not None]
+    try:
+        return tuple(get_file_key(file) for file in sorted(files))
+    except FileNotFoundError:
+        return None
+
+
+class RunWatcher:
+    '''
+    Summarize new and changed samples of a run and rewrite the run summary.
+
+    Arguments:
+        * path:         directory containing the <sample>.variants.tsv files
+        * output:       full path to the run summary file
+        * settle:       number of seconds the files of a sample must be
+                        unchanged before it is read, so files still being
+                        written are skipped (default: 30)
+        * find_options: dictionary of extra arguments to find_sample_files()
+        * options:      dictionary of arguments to create_qc_summary_line(),
+                        for example meta_file and reference
+    '''
+    def __init__(self, path, output, settle=30, find_options=None,
+                 options=None):
+        self.path = path
+        self.output = output
+        self.settle = settle
+        self.find_options = find_options or {}
+        self.options = options or {}
+        self.shared_files = [self.options[key] for key in
+                             ['meta_file', 'reference', 'primer_scheme']
+                             if self.options.get(key) is not None] + \
+            list(self.options.get('mask_files') or ())
+        self.keys = {}
+        self.summaries = {}
+        self._inotify = None
+
+    def get_directories(self):
+        '''
+        Return the directories containing the sample files.
+        '''
+        directories = [self.path] + [self.find_options.get(key) for key in
+                                     ['qc_dir', 'coverage_dir', 'fasta_dir']]
+        return sorted(set(directory for directory in directories
+                          if directory is not None))
+
+    def poll(self, now=None):
+        '''
+        Summarize the new and changed samples whose files have settled and
+        rewrite the run summary when any sample changed.
+
+        Arguments:
+            * now:  current time in seconds since the epoch (default:
+                    time.time())
+
+        Return Value:
+            Returns a dictionary with the keys updated (list of samples
+            summarized), removed (list of samples whose files are gone) and
+            pending (list of samples waiting for their files to settle)
+        '''
+        now = time.time() if now is None else now
+        samples = find_sample_files(path=self.path, **self.find_options)
+        changes = {'updated' : [], 'removed' : [], 'pending' : []}
+        for sample in list(self.keys):
+            if sample not in samples:
+                del self.keys[sample]
+                self.summaries.pop(sample, None)
+                changes['removed'].append(sample)
+        for sample, sample_files in samples.items():
+            key = get_sample_key(sample_files, self.shared_files)
+            if key is None or key == self.keys.get(sample):
+                continue
+            if now - max(file_key[2] for file_key in key) / 1e9 < self.settle:
+                changes['pending'].append(sample)
+                continue
+            self.keys[sample] = key
+            try:
+                self.summaries[sample] = create_qc_summary_line(**sample_files,
+                                                                **self.options)
+            except Exception as err:
+                print('Unable to process sample %s: %s' % (sample, err),
+                      file=sys.stderr)
+                self.summaries.pop(sample, None)
+                continue
+            changes['updated'].append(sample)
+        if changes['updated'] or changes['removed'] or \
+                not os.path.exists(self.output):
+            self.write()
+        return changes
+
+    def write(self):
+        '''
+        Atomically replace the run summary, samples are in name order.
+        '''
+        def write_output(file_p):
+            write_qc_summary_header(file_p=file_p)
+            for sample in sorted(self.summaries):
+                write_qc_summary(summary=self.summaries[sample], file_p=file_p)
+        write_atomic(self.output, write_output)
+
+    def wait(self, timeout):
+        '''
+        Wait for up to timeout seconds, returning early when a file changes
+        in a sample directory and inotify is available.
+        '''
+        try:
+            import inotify_simple
+        except ImportError:
+            time.sleep(timeout)
+            return
+        if self._inotify is None:
+            flags = inotify_simple.flags
+            self._inotify = inotify_simple.INotify()
+            for directory in self.get_directories():
+                self._inotify.add_watch(directory, flags.CLOSE_WRITE |
+                                        flags.MOVED_TO | flags.CREATE |
+                                        flags.DELETE | flags.MOVED_FROM)
+        self._inotify.read(timeout=int(timeout * 1000))
+
+    def run(self, interval=10, iterations=None):
+        '''
+        Poll the run until interrupted.  While samples are waiting for their
+        files to settle the run is polled again once they can be read.
+
+        Arguments:
+            * interval:     maximum number of seconds between polls
+                            (default: 10)
+            * iterations:   number of polls, None to run until interrupted
+        '''
+        count = 0
+        while iterations is None or count < iterations:
+            changes = self.poll()
+            count += 1
+            for state in ['updated', 'removed']:
+                for sample in changes[state]:
+                    print('%s %s' % (state, sample), file=sys.stderr)
+            if iterations is not None and count >= iterations:
+                break
+            timeout = interval
+            if changes['pending']:
+                timeout = min(interval, self.settle)
+            self.wait(timeout)
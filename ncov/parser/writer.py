@@ -0,0 +1,264 @@
+'''
+Writers for the QC summary data.  In addition to the tab-separated text
+format, summaries can be written to a typed columnar format so downstream
+tools can bulk load a run without parsing and inferring types from text.
+Parquet is used when pyarrow is installed, otherwise each column is stored as
+a NumPy array in a single .npz file.
+'''
+
+import math
+import sys
+from ncov.parser.fileio import open_input
+from ncov.parser.qc import write_qc_summary, write_qc_summary_header
+from ncov.parser.summary import QC_SUMMARY_COLUMNS, COLUMN_TYPES, to_column_type
+
+# integer columns use this value for missing data in the .npz format, Parquet
+# files use nulls
+MISSING_INT = -1
+FORMATS = ['tsv', 'parquet', 'npz', 'columnar']
+
+
+class SummaryWriter:
+    '''
+    Base class for the summary writers, supports use as a context manager.
+    '''
+    def write(self, summary):
+        '''
+        Write a summary dictionary.
+        '''
+        raise NotImplementedError
+
+    def write_line(self, line):
+        '''
+        Write a tab-separated summary line.
+        '''
+        raise NotImplementedError
+
+    def close(self):
+        '''
+        Complete the output file.
+        '''
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TsvSummaryWriter(SummaryWriter):
+    '''
+    Write QC summary data as tab-separated text with a header line.
+
+    Arguments:
+        * output:   full path to the output file (default: stdout)
+    '''
+    def __init__(self, output=None):
+        self.output = output
+        if output is None:
+            self.file_p = sys.stdout
+        else:
+            self.file_p = open(output, 'w', buffering=1 << 20)
+        write_qc_summary_header(file_p=self.file_p)
+
+    def write(self, summary):
+        write_qc_summary(summary=summary, file_p=self.file_p)
+
+    def write_line(self, line):
+        self.file_p.write(line + '\n')
+
+    def close(self):
+        if self.output is None:
+            self.file_p.flush()
+        else:
+            self.file_p.close()
+
+
+class ColumnarSummaryWriter(SummaryWriter):
+    '''
+    Base class for the columnar writers, summaries are collected into typed
+    columns which are written when the writer is closed.
+
+    Arguments:
+        * output:   full path to the output file
+    '''
+    def __init__(self, output):
+        self.output = output
+        self.columns = {column : [] for column in QC_SUMMARY_COLUMNS}
+
+    def write(self, summary):
+        for column in QC_SUMMARY_COLUMNS:
+            self.columns[column].append(to_column_type(summary.get(column),
+                                                       COLUMN_TYPES[column]))
+
+    def write_line(self, line):
+        self.write(dict(zip(QC_SUMMARY_COLUMNS, line.split('\t'))))
+
+    def close(self):
+        self.save()
+
+    def to_arrays(self):
+        '''
+        Return the collected columns as NumPy arrays.  Missing values are NaN
+        in float columns, MISSING_INT in integer columns and 'NA' in string
+        columns.
+        '''
+        import numpy as np
+        arrays = {}
+        for column in QC_SUMMARY_COLUMNS:
+            column_type = COLUMN_TYPES[column]
+            values = self.columns[column]
+            if column_type is int:
+                arrays[column] = np.array(
+                    [MISSING_INT if value is None else value for value in values],
+                    dtype=np.int64)
+            elif column_type is float:
+                arrays[column] = np.array(
+                    [math.nan if value is None else value for value in values],
+                    dtype=np.float64)
+            else:
+                arrays[column] = np.array(
+                    ['NA' if value is None else value for value in values],
+                    dtype=str)
+        return arrays
+
+    def save(self):
+        '''
+        Write the collected columns to the output file.
+        '''
+        raise NotImplementedError
+
+
+class ParquetSummaryWriter(ColumnarSummaryWriter):
+    '''
+    Write QC summary data to a Parquet file, requires pyarrow.
+    '''
+    def save(self):
+        import pyarrow
+        import pyarrow.parquet
+        types = {str : pyarrow.string(), int : pyarrow.int64(),
+                 float : pyarrow.float64()}
+        table = pyarrow.table({column : pyarrow.array(
+            self.columns[column], type=types[COLUMN_TYPES[column]])
+                               for column in QC_SUMMARY_COLUMNS})
+        pyarrow.parquet.write_table(table, self.output)
+
+
+class NpzSummaryWriter(ColumnarSummaryWriter):
+    '''
+    Write QC summary data to a NumPy .npz file with one array per column,
+    see ColumnarSummaryWriter.to_arrays() for the missing values.
+    '''
+    def save(self):
+        import numpy as np
+        with open(self.output, 'wb') as file_p:
+            np.savez(file_p, **self.to_arrays())
+
+
+def get_output_format(output=None, output_format=None):
+    '''
+    Return the output format, determined from the file extension when a
+    format is not given.  The 'columnar' format is Parquet when pyarrow is
+    installed, otherwise .npz.
+
+    Arguments:
+        * output:           full path to the output file
+        * output_format:    one of 'tsv', 'parquet', 'npz' or 'columnar'
+
+    Return Value:
+        Returns one of 'tsv', 'parquet' or 'npz'
+    '''
+    if output_format is None:
+        if output is not None and output.endswith('.parquet'):
+            output_format = 'parquet'
+        elif output is not None and output.endswith('.npz'):
+            output_format = 'npz'
+        else:
+            output_format = 'tsv'
+    if output_format == 'columnar':
+        try:
+            import pyarrow.parquet
+            output_format = 'parquet'
+        except ImportError:
+            output_format = 'npz'
+    if output_format not in FORMATS:
+        raise ValueError('unknown output format: %s' % output_format)
+    return output_format
+
+
+def get_summary_writer(output=None, output_format=None):
+    '''
+    Return a summary writer for the output format.
+
+    Arguments:
+        * output:           full path to the output file, the columnar formats
+                            require an output file (default: stdout)
+        * output_format:    one of 'tsv', 'parquet', 'npz' or 'columnar'
+                            (default: determined from the file extension)
+
+    Return Value:
+        Returns a writer object with write(), write_line() and close() methods
+    '''
+    output_format = get_output_format(output, output_format)
+    if output_format == 'tsv':
+        return TsvSummaryWriter(output)
+    if output is None:
+        raise ValueError('the %s format requires an output file' % output_format)
+    if output_format == 'parquet':
+        return ParquetSummaryWriter(output)
+    return NpzSummaryWriter(output)
+
+
+def read_summary(file):
+    '''
+    Read a QC summary file in any of the supported formats into columns.
+
+    Arguments:
+        * file: full path to the .tsv, .parquet or .npz summary file
+
+    Return Value:
+        Returns a dictionary of NumPy arrays keyed by column name
+    '''
+    import numpy as np
+    if file.endswith('.npz'):
+        with np.load(file) as data:
+            return {column : data[column] for column in data.files}
+    if file.endswith('.parquet'):
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(file)
+        return {column : table.column(column).to_numpy(zero_copy_only=False)
+                for column in table.column_names}
+    with open_input(file) as file_p:
+        header = file_p.readline().rstrip('\r\n').split('\t')
+        rows = [line.rstrip('\r\n').split('\t') for line in file_p
+                if line.strip()]
+    # rows written before columns were added are padded with missing values
+    if any(len(row) != len(header) for row in rows):
+        rows = [(row + ['NA'] * len(header))[:len(header)] for row in rows]
+    values = dict(zip(header, zip(*rows))) if rows else \
+        {column : () for column in header}
+    return {column : _to_array(values[column], COLUMN_TYPES[column])
+            for column in header if column in COLUMN_TYPES}
+
+
+def _to_array(values, column_type):
+    '''
+    Convert the text values of a column to a NumPy array, missing values are
+    encoded as in ColumnarSummaryWriter.to_arrays().
+    '''
+    import numpy as np
+    if column_type is str:
+        return np.array(values, dtype=str)
+    try:
+        numbers = np.fromiter([math.nan if value in ('NA', '') else float(value)
+                               for value in values],
+                              dtype=np.float64, count=len(values))
+    except ValueError:
+        numbers = np.array([to_column_type(value, float) for value in values],
+                           dtype=np.float64)
+    if column_type is float:
+        return numbers
+    invalid = ~np.isfinite(numbers) | (numbers != np.round(numbers))
+    numbers[invalid] = MISSING_INT
+    return numbers.astype(np.int64)
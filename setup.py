@@ -24,5 +24,9 @@ setuptools.setup(
     python_requires='>=3.6',
     scripts=['bin/get_qc_summary.py',
              'bin/collect_qc_summary.py',
-             'bin/create_sample_qc_summary.py']
+             'bin/create_sample_qc_summary.py',
+             'bin/get_run_qc_summary.py',
+             'bin/get_run_stats.py',
+             'bin/get_run_variant_matrix.py',
+             'bin/watch_run_qc_summary.py']
 )